@@ -0,0 +1,231 @@
+"""Offline fixtures for the benchmarks: NASA POWER responses, Landsat GeoTIFFs and STAC items.
+
+By default the benchmarks run on a deterministic synthetic year: generated NASA POWER data
+and acquisition dates. They can instead run on recordings of the real APIs for the
+benchmark polygon (run_benchmarks.py --recorded), written to fixtures/ by
+run_benchmarks.py --record:
+- power_<year>.json: the NASA POWER daily response
+- stac_<year>.json: the Landsat STAC search results, without their assets
+
+Landsat pixels are never recorded: the acquisitions (dates, scenes per date) point to small
+generated GeoTIFFs with the same data type, scaling and QA_PIXEL encoding as Landsat
+Collection 2 Level-2. Timings on recorded and synthetic inputs are not comparable.
+"""
+
+import json
+import math
+import os
+import random
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Tuple
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+# Small urban plot in Munich as (lat, lon) tuples, like PolygonInput.coordinates
+POLYGON_COORDINATES = [
+    (48.12978723465923, 11.567817614315333),
+    (48.12976197492467, 11.56856190677253),
+    (48.12927361761428, 11.568536676519743),
+    (48.12923993762861, 11.567767153809761),
+    (48.12978723465923, 11.567817614315333)
+]
+POLYGON_CENTER = (48.1295, 11.5682)
+
+# Landsat Collection 2 scaling of the surface temperature band
+LANDSAT_SCALE = 0.00341802
+LANDSAT_OFFSET = 149
+
+# QA_PIXEL values of a clear land pixel and of a cloudy pixel
+QA_CLEAR = 21824
+QA_CLOUD = 22280
+
+
+def power_fixture_path(year: int) -> str:
+    """Path of the recorded NASA POWER response for a year."""
+    return os.path.join(FIXTURES_DIR, f"power_{year}.json")
+
+
+def stac_fixture_path(year: int) -> str:
+    """Path of the recorded Landsat STAC search results for a year."""
+    return os.path.join(FIXTURES_DIR, f"stac_{year}.json")
+
+
+def _load_recording(path: str) -> Dict:
+    if not os.path.exists(path):
+        raise FileNotFoundError(
+            f"{path} is not recorded. Record it with --record (needs network), "
+            f"or run without --recorded to use the synthetic inputs."
+        )
+    with open(path) as f:
+        return json.load(f)
+
+
+def generate_power_data(year: int, seed: int = 0) -> Dict:
+    """
+    Generate a deterministic NASA POWER daily point response for a mid-latitude city.
+
+    Args:
+        year: Year of the daily series
+        seed: Seed of the day-to-day noise
+
+    Returns:
+        Dict with the structure of the NASA POWER API response
+    """
+    rng = random.Random(seed)
+    parameters = {"ALLSKY_SFC_SW_DWN": {}, "T2M_MAX": {}, "T2M_MIN": {}, "PRECTOTCORR": {}}
+
+    day = date(year, 1, 1)
+    while day.year == year:
+        season = math.sin(2 * math.pi * (day.timetuple().tm_yday - 105) / 365)
+        key = day.strftime("%Y%m%d")
+        tmax = 14 + 12 * season + rng.gauss(0, 3)
+        parameters["T2M_MAX"][key] = round(tmax, 2)
+        parameters["T2M_MIN"][key] = round(tmax - 8 - rng.random() * 4, 2)
+        parameters["ALLSKY_SFC_SW_DWN"][key] = round(max(0.5, 12 + 10 * season + rng.gauss(0, 3)), 2)
+        parameters["PRECTOTCORR"][key] = round(max(0.0, rng.expovariate(0.4) - 1.5), 2)
+        day += timedelta(days=1)
+
+    return {
+        "type": "Feature",
+        "geometry": {"type": "Point", "coordinates": [POLYGON_CENTER[1], POLYGON_CENTER[0], 520.0]},
+        "properties": {"parameter": parameters},
+        "header": {"title": "Synthetic NASA POWER fixture", "start": f"{year}0101", "end": f"{year}1231"}
+    }
+
+
+def load_power_data(year: int, recorded: bool = False) -> Dict:
+    """
+    Generate a synthetic NASA POWER response for a year, or load the recorded one.
+
+    Raises:
+        FileNotFoundError: If recorded is True and the year is not recorded
+    """
+    if recorded:
+        return _load_recording(power_fixture_path(year))
+    return generate_power_data(year)
+
+
+def synthetic_acquisitions(year: int, dates: int = 24) -> List[datetime]:
+    """Acquisition times spread over the year, every twelfth date with two scenes (mosaic path)."""
+    acquisitions = []
+    for i in range(dates):
+        acquired = datetime(year, 1, 1, 10, 30, tzinfo=timezone.utc) + timedelta(days=i * 365 // dates)
+        acquisitions.extend([acquired] * (2 if i % 12 == 11 else 1))
+    return acquisitions
+
+
+def load_acquisitions(year: int, recorded: bool = False) -> List[datetime]:
+    """
+    Acquisition times of the Landsat scenes for the benchmark polygon, one per scene.
+
+    Synthetic by default, or those of the recorded STAC search when recorded is True.
+
+    Raises:
+        FileNotFoundError: If recorded is True and the year is not recorded
+    """
+    if not recorded:
+        return synthetic_acquisitions(year)
+    recording = _load_recording(stac_fixture_path(year))
+    return sorted(datetime.fromisoformat(feature["properties"]["datetime"].replace("Z", "+00:00"))
+                  for feature in recording["features"])
+
+
+def strip_stac_items(item_collection_dict: Dict) -> Dict:
+    """Keep only the fields of recorded STAC items the benchmarks use (assets hold expiring signed URLs)."""
+    return {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "id": feature["id"],
+                "bbox": feature.get("bbox"),
+                "geometry": feature["geometry"],
+                "properties": {key: feature["properties"][key] for key in ("datetime", "eo:cloud_cover")
+                               if key in feature["properties"]}
+            }
+            for feature in item_collection_dict["features"]
+        ]
+    }
+
+
+def write_landsat_scenes(directory: str, count: int = 3, size: int = 64, seed: int = 0) -> List[Tuple[str, str]]:
+    """
+    Write small Landsat-like GeoTIFF scenes (surface temperature and QA_PIXEL) around the polygon.
+
+    Args:
+        directory: Directory to write the files in
+        count: Number of distinct scenes
+        size: Width and height of the scenes in pixels (30 m pixels)
+        seed: Seed of the generated values
+
+    Returns:
+        List of (surface temperature path, QA_PIXEL path) tuples
+    """
+    import numpy as np
+    import rasterio
+    from rasterio.transform import from_origin
+    from rasterio.warp import transform
+
+    rng = np.random.default_rng(seed)
+
+    # Scene grid in UTM 32N centred on the polygon
+    (x,), (y,) = transform("EPSG:4326", "EPSG:32632", [POLYGON_CENTER[1]], [POLYGON_CENTER[0]])
+    grid_transform = from_origin(x - size * 15, y + size * 15, 30, 30)
+    profile = {
+        "driver": "GTiff", "width": size, "height": size, "count": 1, "dtype": "uint16",
+        "crs": "EPSG:32632", "transform": grid_transform, "tiled": True, "blockxsize": 16, "blockysize": 16
+    }
+
+    scenes = []
+    for i in range(count):
+        temperature_c = 15 + 10 * rng.random() + rng.normal(0, 2, (size, size))
+        lwir = np.round((temperature_c + 273.15 - LANDSAT_OFFSET) / LANDSAT_SCALE).astype("uint16")
+        qa = np.where(rng.random((size, size)) < 0.1, QA_CLOUD, QA_CLEAR).astype("uint16")
+
+        lwir_path = os.path.join(directory, f"scene_{i}_lwir.tif")
+        qa_path = os.path.join(directory, f"scene_{i}_qa_pixel.tif")
+        with rasterio.open(lwir_path, "w", nodata=0, **profile) as dst:
+            dst.write(lwir, 1)
+        with rasterio.open(qa_path, "w", nodata=1, **profile) as dst:
+            dst.write(qa, 1)
+        scenes.append((lwir_path, qa_path))
+
+    return scenes
+
+
+def build_stac_items(scenes: List[Tuple[str, str]], acquisitions: List[datetime],
+                     bbox: Tuple[float, float, float, float] | None = None):
+    """
+    Build a STAC item collection over the local scenes, as returned by the Landsat search.
+
+    Scenes acquired at the same date are mosaicked by the Landsat reader (merge path).
+
+    Args:
+        scenes: (surface temperature href, QA_PIXEL href) tuples, e.g. from write_landsat_scenes
+        acquisitions: Acquisition time of each item, e.g. from load_acquisitions
+        bbox: Footprint of the items as (west, south, east, north), defaults to 1 degree around the polygon
+
+    Returns:
+        pystac.ItemCollection
+    """
+    import pystac
+
+    if bbox is None:
+        lon, lat = POLYGON_CENTER[1], POLYGON_CENTER[0]
+        bbox = (lon - 1, lat - 1, lon + 1, lat + 1)
+    west, south, east, north = bbox
+    geometry = {"type": "Polygon", "coordinates": [[
+        [west, south], [east, south], [east, north], [west, north], [west, south]
+    ]]}
+
+    items = []
+    for i, acquired in enumerate(acquisitions):
+        lwir_path, qa_path = scenes[i % len(scenes)]
+        item = pystac.Item(
+            id=f"fixture_{i}", geometry=geometry, bbox=list(bbox),
+            datetime=acquired, properties={"eo:cloud_cover": 5}, collection="landsat-c2-l2"
+        )
+        item.add_asset("lwir", pystac.Asset(href=lwir_path, media_type=pystac.MediaType.COG))
+        item.add_asset("qa_pixel", pystac.Asset(href=qa_path, media_type=pystac.MediaType.COG))
+        items.append(item)
+
+    return pystac.ItemCollection(items)
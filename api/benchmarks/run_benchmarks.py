@@ -0,0 +1,229 @@
+"""Offline benchmarks of the recommendation pipeline hot paths.
+
+Runs without network on the fixtures of benchmarks/fixtures.py (synthetic by default) and
+reports, per function, the time per call and the peak memory allocated during one call.
+
+Usage (from the api directory):
+    uv run python -m benchmarks.run_benchmarks
+    uv run python -m benchmarks.run_benchmarks --output results.json
+    uv run python -m benchmarks.run_benchmarks --compare results.json --threshold 1.25
+    uv run python -m benchmarks.run_benchmarks --record     # needs network, records NASA POWER and STAC
+    uv run python -m benchmarks.run_benchmarks --recorded   # the recordings instead of generated inputs
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+from benchmarks.fixtures import (FIXTURES_DIR, POLYGON_CENTER, POLYGON_COORDINATES, build_stac_items,
+                                 load_acquisitions, load_power_data, power_fixture_path, stac_fixture_path,
+                                 strip_stac_items, write_landsat_scenes)
+
+BENCHMARK_YEAR = 2023
+
+
+def measure(function: Callable, min_time_s: float, min_rounds: int) -> Dict:
+    """
+    Time a function and measure the peak memory allocated by one call.
+
+    Args:
+        function: Function without arguments to measure
+        min_time_s: Keep calling the function at least this long
+        min_rounds: Keep calling the function at least this many times
+
+    Returns:
+        Dictionary with rounds, mean/median/p95/min time in milliseconds and peak memory in KiB
+    """
+    # Warm up caches and lazy imports
+    function()
+
+    durations = []
+    start = time.perf_counter()
+    while len(durations) < min_rounds or time.perf_counter() - start < min_time_s:
+        call_start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - call_start)
+
+    # Separate call for memory, tracemalloc slows the code down
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    durations.sort()
+    return {
+        "rounds": len(durations),
+        "mean_ms": statistics.mean(durations) * 1000,
+        "median_ms": statistics.median(durations) * 1000,
+        "p95_ms": durations[min(len(durations) - 1, int(len(durations) * 0.95))] * 1000,
+        "min_ms": durations[0] * 1000,
+        "peak_memory_kib": peak / 1024
+    }
+
+
+def build_benchmarks(workdir: str, recorded: bool = False) -> Dict[str, Callable]:
+    """
+    Build the benchmarked calls on the fixtures.
+
+    Args:
+        workdir: Directory for the generated GeoTIFF scenes
+        recorded: Use the recorded NASA POWER data and acquisitions instead of generated ones
+
+    Returns:
+        Dictionary mapping benchmark names to functions without arguments
+    """
+    import main
+    from crop_database import CROP_DATABASE
+
+    power_data = load_power_data(BENCHMARK_YEAR, recorded)
+    polygon = main.PolygonInput(coordinates=POLYGON_COORDINATES)
+    stac_items = build_stac_items(write_landsat_scenes(workdir), load_acquisitions(BENCHMARK_YEAR, recorded))
+
+    climate_analysis = main.analyze_climate_data(power_data)
+    climate_data = {
+        "primary_year_data": power_data,
+        "climate_analysis": climate_analysis,
+        "monthly_averages": None,
+        "years_analyzed": [BENCHMARK_YEAR]
+    }
+    landsat_df = main.calculate_surface_temperature_landsat(stac_items, "lwir", polygon)
+    area_m2 = main.calculate_polygon_area_m2(POLYGON_COORDINATES)
+    tomatoes = CROP_DATABASE["tomatoes"]
+    crop_climate = main.precompute_crop_climate(power_data)
+
+    # Suitable area fractions of a uniform plot and of a plot shaded from one side (9 sunshine levels)
+    uniform_samples = main.calculate_shade_samples(polygon)
+    uniform_results = main.process_crop_recommendations(
+        climate_data, main.calculate_sunshine_factor(polygon, uniform_samples), area_m2, 50.0, crop_climate
+    )
+    shaded_polygon = main.PolygonInput(coordinates=POLYGON_COORDINATES, sunshine_duration=[0.1, 0.9, 0.9, 0.1, 0.1])
+    shaded_samples = main.calculate_shade_samples(shaded_polygon)
+
+    return {
+        "calculate_crop_suitability": lambda: main.calculate_crop_suitability(
+            tomatoes, climate_analysis, power_data, 0.7, area_m2
+        ),
+        "process_crop_recommendations": lambda: main.process_crop_recommendations(
+            climate_data, 0.7, area_m2, 50.0
+        ),
+        "precompute_crop_climate": lambda: main.precompute_crop_climate(power_data),
+        "suitable_area_fractions_uniform": lambda: main.calculate_suitable_area_fractions(
+            climate_data, crop_climate, uniform_samples, 50.0, uniform_results
+        ),
+        "suitable_area_fractions_shaded": lambda: main.calculate_suitable_area_fractions(
+            climate_data, crop_climate, shaded_samples, 50.0
+        ),
+        "analyze_climate_data": lambda: main.analyze_climate_data(power_data),
+        "calculate_monthly_averages": lambda: main.calculate_monthly_averages([power_data]),
+        "merge_climate_data": lambda: main.merge_climate_data(power_data, landsat_df, BENCHMARK_YEAR),
+        "calculate_surface_temperature_landsat": lambda: main.calculate_surface_temperature_landsat(
+            stac_items, "lwir", polygon
+        )
+    }
+
+
+def print_results(results: Dict[str, Dict], baseline: Dict[str, Dict] | None = None):
+    """Print the results as a table, with the ratio to the baseline median when given."""
+    header = f"{'benchmark':<40}{'rounds':>8}{'median ms':>12}{'p95 ms':>10}{'peak KiB':>11}"
+    if baseline:
+        header += f"{'vs base':>9}"
+    print(header)
+    print("-" * len(header))
+    for name, result in results.items():
+        line = (f"{name:<40}{result['rounds']:>8}{result['median_ms']:>12.3f}"
+                f"{result['p95_ms']:>10.3f}{result['peak_memory_kib']:>11.1f}")
+        if baseline and name in baseline:
+            line += f"{result['median_ms'] / baseline[name]['median_ms']:>8.2f}x"
+        print(line)
+
+
+def find_regressions(results: Dict[str, Dict], baseline: Dict[str, Dict], threshold: float) -> List[str]:
+    """Names of the benchmarks whose median time grew more than threshold times the baseline."""
+    return [
+        name for name, result in results.items()
+        if name in baseline and result["median_ms"] > baseline[name]["median_ms"] * threshold
+    ]
+
+
+def record_fixtures():
+    """Record the NASA POWER response and Landsat STAC search used by the benchmarks. Needs network access."""
+    import main
+
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    power_data = asyncio.run(main.fetch_nasa_power_data(POLYGON_CENTER[0], POLYGON_CENTER[1], BENCHMARK_YEAR))
+    with open(power_fixture_path(BENCHMARK_YEAR), "w") as f:
+        json.dump(power_data, f)
+    print(f"Recorded {power_fixture_path(BENCHMARK_YEAR)}")
+
+    stac_items = main.query_planetary_stac(
+        main.MICROSOFT_PLANETARY_API_URL,
+        "landsat-c2-l2",
+        main.PolygonInput(coordinates=POLYGON_COORDINATES),
+        f"{BENCHMARK_YEAR}-01-01/{BENCHMARK_YEAR}-12-31",
+        main.LANDSAT_MAX_CLOUD_COVER
+    )
+    if stac_items is None:
+        raise RuntimeError("The Landsat STAC search failed")
+    with open(stac_fixture_path(BENCHMARK_YEAR), "w") as f:
+        json.dump(strip_stac_items(stac_items.to_dict()), f, indent=1)
+    print(f"Recorded {stac_fixture_path(BENCHMARK_YEAR)} ({len(stac_items)} scenes)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filter", default="", help="Only run benchmarks whose name contains this text")
+    parser.add_argument("--min-time", type=float, default=1.0, help="Minimum time per benchmark in seconds")
+    parser.add_argument("--min-rounds", type=int, default=5, help="Minimum calls per benchmark")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Baseline JSON file written by --output")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="Fail when a median time exceeds the baseline by this factor")
+    parser.add_argument("--record", action="store_true", help="Record the NASA POWER and STAC fixtures and exit")
+    parser.add_argument("--recorded", action="store_true",
+                        help="Use the fixtures recorded with --record instead of generated inputs "
+                             "(timings not comparable)")
+    args = parser.parse_args()
+
+    if args.record:
+        record_fixtures()
+        return 0
+
+    with tempfile.TemporaryDirectory() as workdir:
+        try:
+            benchmarks = build_benchmarks(workdir, args.recorded)
+        except FileNotFoundError as e:
+            parser.error(str(e))
+        results = {
+            name: measure(function, args.min_time, args.min_rounds)
+            for name, function in benchmarks.items()
+            if args.filter in name
+        }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    print_results(results, baseline)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if baseline:
+        regressions = find_regressions(results, baseline, args.threshold)
+        if regressions:
+            print(f"\nRegressions over {args.threshold}x the baseline: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
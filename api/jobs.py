@@ -0,0 +1,278 @@
+"""Persistent queue of long-running analysis jobs.
+
+Jobs and their results are stored in a local SQLite database, so they survive restarts:
+a job that was running when the server stopped is queued again on the next start and
+resumes after its last completed unit. A job is split into units (for example one
+polygon and year each) whose results are stored as soon as they are computed.
+
+A job id is derived from its parameters, so submitting the same job twice returns the
+existing job instead of running it again. Resubmitting a failed job, or a done job with
+failed units, queues it again to retry its failed units.
+
+The workers run in the event loop of the server. With several server processes, only
+one of them should run workers (JOB_WORKERS=0 on the others), otherwise a restarting
+process would queue again the jobs running in the other ones.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Dict, Iterator, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    params TEXT NOT NULL,
+    units_total INTEGER NOT NULL,
+    units_done INTEGER NOT NULL DEFAULT 0,
+    units_failed INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);
+CREATE TABLE IF NOT EXISTS job_results (
+    job_id TEXT NOT NULL,
+    unit INTEGER NOT NULL,
+    failed INTEGER NOT NULL,
+    result TEXT NOT NULL,
+    PRIMARY KEY (job_id, unit)
+);
+"""
+
+_JOB_COLUMNS = "id, status, params, units_total, units_done, units_failed, error, created_at, started_at, finished_at"
+
+
+def job_id_for(params: Dict) -> str:
+    """Identifier of a job: hash of its parameters in canonical JSON form."""
+    canonical = json.dumps(params, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()[:32]
+
+
+class JobStore:
+    """
+    SQLite storage of the jobs and their unit results.
+
+    Methods are blocking, call them from a worker thread (asyncio.to_thread) in async
+    code. Each call uses its own connection, so the store can be used from any thread.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with self._connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # Autocommit mode, transactions are explicit. Closing an open transaction rolls it back.
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        try:
+            yield connection
+        finally:
+            connection.close()
+
+    @staticmethod
+    def _job(row: Optional[sqlite3.Row]) -> Optional[Dict]:
+        if row is None:
+            return None
+        job = dict(row)
+        job["params"] = json.loads(job["params"])
+        return job
+
+    def submit(self, params: Dict, units_total: int) -> Tuple[Dict, bool]:
+        """
+        Add a job, unless the same job already exists.
+
+        Args:
+            params: Parameters of the job, JSON serializable
+            units_total: Number of units of the job
+
+        Returns:
+            Tuple of (job, created). created is False when an identical job already
+            existed. A failed identical job, or a done one with failed units, is queued
+            again: it keeps its successful units and retries the failed ones.
+        """
+        job_id = job_id_for(params)
+        with self._connect() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            created = connection.execute(
+                "INSERT OR IGNORE INTO jobs (id, status, params, units_total, created_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, JOB_QUEUED, json.dumps(params), units_total, time.time())
+            ).rowcount == 1
+            if not created:
+                requeued = connection.execute(
+                    "UPDATE jobs SET status = ?, error = NULL, finished_at = NULL "
+                    "WHERE id = ? AND (status = ? OR (status = ? AND units_failed > 0))",
+                    (JOB_QUEUED, job_id, JOB_FAILED, JOB_DONE)
+                ).rowcount == 1
+                if requeued:
+                    # Retry the failed units too
+                    connection.execute("DELETE FROM job_results WHERE job_id = ? AND failed = 1", (job_id,))
+                    connection.execute(
+                        "UPDATE jobs SET units_done = units_done - units_failed, units_failed = 0 WHERE id = ?",
+                        (job_id,)
+                    )
+            connection.execute("COMMIT")
+        return self.get(job_id), created
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Job with its status and progress, None if unknown."""
+        with self._connect() as connection:
+            row = connection.execute(f"SELECT {_JOB_COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._job(row)
+
+    def claim_next(self) -> Optional[Dict]:
+        """Mark the oldest queued job as running and return it, None if the queue is empty."""
+        with self._connect() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            row = connection.execute(
+                f"SELECT {_JOB_COLUMNS} FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (JOB_QUEUED,)
+            ).fetchone()
+            if row is not None:
+                connection.execute(
+                    "UPDATE jobs SET status = ?, started_at = ? WHERE id = ?", (JOB_RUNNING, time.time(), row["id"])
+                )
+            connection.execute("COMMIT")
+        job = self._job(row)
+        if job is not None:
+            job["status"] = JOB_RUNNING
+        return job
+
+    def requeue_running(self) -> int:
+        """Queue again the jobs left running by a stopped server. Returns their number."""
+        with self._connect() as connection:
+            return connection.execute(
+                "UPDATE jobs SET status = ? WHERE status = ?", (JOB_QUEUED, JOB_RUNNING)
+            ).rowcount
+
+    def completed_units(self, job_id: str) -> Set[int]:
+        """Units of a job whose result is already stored."""
+        with self._connect() as connection:
+            return {row[0] for row in connection.execute("SELECT unit FROM job_results WHERE job_id = ?", (job_id,))}
+
+    def save_unit(self, job_id: str, unit: int, result: Dict, failed: bool = False):
+        """Store the result of a unit and update the progress of its job."""
+        with self._connect() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            inserted = connection.execute(
+                "INSERT OR IGNORE INTO job_results (job_id, unit, failed, result) VALUES (?, ?, ?, ?)",
+                (job_id, unit, int(failed), json.dumps(result))
+            ).rowcount == 1
+            if inserted:
+                connection.execute(
+                    "UPDATE jobs SET units_done = units_done + 1, units_failed = units_failed + ? WHERE id = ?",
+                    (int(failed), job_id)
+                )
+            connection.execute("COMMIT")
+
+    def finish(self, job_id: str, error: Optional[str] = None):
+        """Mark a job as done, or as failed with an error message."""
+        with self._connect() as connection:
+            connection.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+                (JOB_DONE if error is None else JOB_FAILED, error, time.time(), job_id)
+            )
+
+    def iter_results(self, job_id: str, page_size: int = 100) -> Iterator[str]:
+        """Stored unit results of a job as JSON strings, in unit order, read page by page."""
+        last_unit = -1
+        while True:
+            with self._connect() as connection:
+                rows = connection.execute(
+                    "SELECT unit, result FROM job_results WHERE job_id = ? AND unit > ? ORDER BY unit LIMIT ?",
+                    (job_id, last_unit, page_size)
+                ).fetchall()
+            if not rows:
+                return
+            for _, result in rows:
+                yield result
+            last_unit = rows[-1][0]
+
+
+# Function running a job: receives the job, the units already completed and an async
+# callback storing the result of a unit (unit, result, failed).
+JobRunner = Callable[[Dict, Set[int], Callable[[int, Dict, bool], Awaitable[None]]], Awaitable[None]]
+
+
+class JobQueue:
+    """
+    Pool of workers running the queued jobs of a JobStore.
+
+    Attributes:
+        store: Storage of the jobs
+        runner: Function running one job
+        workers: Number of jobs run at the same time
+        poll_interval_s: Time between two checks of an empty queue
+    """
+
+    def __init__(self, store: JobStore, runner: JobRunner, workers: int = 1, poll_interval_s: float = 5.0):
+        self.store = store
+        self.runner = runner
+        self.workers = workers
+        self.poll_interval_s = poll_interval_s
+        self._tasks = []
+        self._wakeup = asyncio.Event()
+
+    def start(self):
+        """Queue again the interrupted jobs and start the workers."""
+        if self.workers <= 0 or self._tasks:
+            return
+        requeued = self.store.requeue_running()
+        if requeued:
+            logger.info("Resuming %d interrupted jobs", requeued)
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self):
+        """Stop the workers. Running jobs stay running in the store and resume on the next start."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self):
+        """Wake the idle workers up after a submission."""
+        self._wakeup.set()
+
+    async def _work(self):
+        while True:
+            self._wakeup.clear()
+            job = await asyncio.to_thread(self.store.claim_next)
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval_s)
+                except TimeoutError:
+                    pass
+                continue
+            await self._run(job)
+
+    async def _run(self, job: Dict):
+        job_id = job["id"]
+
+        async def save_unit(unit: int, result: Dict, failed: bool = False):
+            await asyncio.to_thread(self.store.save_unit, job_id, unit, result, failed)
+
+        completed = await asyncio.to_thread(self.store.completed_units, job_id)
+        logger.info("Running job %s (%d/%d units already done)", job_id, len(completed), job["units_total"])
+        try:
+            await self.runner(job, completed, save_unit)
+        except Exception as e:
+            logger.exception("Job %s failed", job_id)
+            await asyncio.to_thread(self.store.finish, job_id, str(e) or type(e).__name__)
+            return
+        await asyncio.to_thread(self.store.finish, job_id)
+        logger.info("Job %s done", job_id)
@@ -0,0 +1,240 @@
+"""Load generator for the recommendation API.
+
+Replays a corpus of polygons against /recommendations/polygon (and /crops) and reports
+throughput, latency percentiles, error rates and the cache hit ratios read from /metrics.
+
+Two modes:
+- open loop (--rate): requests start on a Poisson arrival schedule whatever the response
+  times, so queueing in the server shows up in the latencies
+- closed loop (--concurrency): a fixed number of clients, each sending its next request
+  when the previous one is answered
+
+Usage (from the api directory):
+    uv run python -m loadtest.driver --url http://127.0.0.1:8000 --rate 5 --duration 60
+    uv run python -m loadtest.driver --concurrency 20 --requests 500 --corpus polygons.jsonl
+
+The corpus is a JSONL file with one polygon per line, as sent to /recommendations/polygon:
+    {"coordinates": [[48.1297, 11.5678], ...], "sunshine_duration": [0.8, ...]}
+Without a corpus, small random plots are drawn around --center, with a share of them
+repeated so that caches see realistic reuse.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import re
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+import httpx
+
+CACHE_METRIC_PATTERN = re.compile(r'homegrown_cache_requests_total\{cache="([^"]*)",result="([^"]*)"\} ([0-9.eE+-]+)')
+
+
+def random_polygon(rng: random.Random, center_lat: float, center_lon: float, radius_m: float) -> Dict:
+    """
+    Draw a random plot of 10 to 100 m across within radius_m of the center.
+
+    Args:
+        rng: Random generator
+        center_lat: Latitude of the center of the area
+        center_lon: Longitude of the center of the area
+        radius_m: Radius of the area in meters
+
+    Returns:
+        Polygon request body
+    """
+    meters_per_deg_lat = 111_320
+    meters_per_deg_lon = 111_320 * math.cos(math.radians(center_lat))
+
+    distance = radius_m * math.sqrt(rng.random())
+    angle = rng.random() * 2 * math.pi
+    lat = center_lat + distance * math.sin(angle) / meters_per_deg_lat
+    lon = center_lon + distance * math.cos(angle) / meters_per_deg_lon
+
+    vertices = rng.randint(4, 8)
+    size_m = rng.uniform(10, 100)
+    coordinates = []
+    for i in range(vertices):
+        vertex_angle = 2 * math.pi * i / vertices
+        vertex_radius = size_m / 2 * rng.uniform(0.7, 1.0)
+        coordinates.append((
+            lat + vertex_radius * math.sin(vertex_angle) / meters_per_deg_lat,
+            lon + vertex_radius * math.cos(vertex_angle) / meters_per_deg_lon
+        ))
+
+    return {
+        "coordinates": coordinates,
+        "sunshine_duration": [round(rng.uniform(0.4, 1.0), 2) for _ in coordinates]
+    }
+
+
+def load_corpus(path: Optional[str], rng: random.Random, size: int, center_lat: float,
+                center_lon: float, radius_m: float) -> List[Dict]:
+    """Read the polygon corpus from a JSONL file, or generate one."""
+    if path:
+        with open(path) as f:
+            return [json.loads(line) for line in f if line.strip()]
+    return [random_polygon(rng, center_lat, center_lon, radius_m) for _ in range(size)]
+
+
+def pick_polygon(rng: random.Random, corpus: List[Dict], repeat_ratio: float, history: List[Dict]) -> Dict:
+    """Pick the next polygon: a previously sent one with probability repeat_ratio, else a corpus entry."""
+    if history and rng.random() < repeat_ratio:
+        return rng.choice(history)
+    polygon = rng.choice(corpus)
+    history.append(polygon)
+    return polygon
+
+
+async def scrape_cache_counters(client: httpx.AsyncClient) -> Counter:
+    """Read the cache hit/miss counters from /metrics, empty if unavailable."""
+    counters = Counter()
+    try:
+        response = await client.get("/metrics")
+        response.raise_for_status()
+    except httpx.HTTPError:
+        return counters
+    for cache, result, value in CACHE_METRIC_PATTERN.findall(response.text):
+        counters[(cache, result)] += float(value)
+    return counters
+
+
+class Results:
+    """Latencies and outcomes of the sent requests, by endpoint."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.outcomes: Dict[str, Counter] = {}
+
+    def record(self, endpoint: str, latency_s: float, outcome: str):
+        self.latencies.setdefault(endpoint, []).append(latency_s)
+        self.outcomes.setdefault(endpoint, Counter())[outcome] += 1
+
+
+async def send_request(client: httpx.AsyncClient, results: Results, endpoint: str, body: Optional[Dict],
+                       params: Dict):
+    """Send one request and record its latency and outcome (status code or exception name)."""
+    start = time.perf_counter()
+    try:
+        if body is None:
+            response = await client.get(endpoint)
+        else:
+            response = await client.post(endpoint, json=body, params=params)
+        outcome = str(response.status_code)
+    except httpx.HTTPError as e:
+        outcome = type(e).__name__
+    results.record(endpoint, time.perf_counter() - start, outcome)
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of sorted values."""
+    index = max(0, math.ceil(q / 100 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def print_report(results: Results, elapsed_s: float, cache_before: Counter, cache_after: Counter):
+    """Print throughput, latency percentiles, error rates and cache hit ratios."""
+    total = sum(len(latencies) for latencies in results.latencies.values())
+    print(f"\n{total} requests in {elapsed_s:.1f}s: {total / elapsed_s:.2f} req/s")
+
+    print(f"\n{'endpoint':<28}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}{'errors':>9}")
+    for endpoint, latencies in results.latencies.items():
+        latencies = sorted(latencies)
+        outcomes = results.outcomes[endpoint]
+        errors = sum(count for outcome, count in outcomes.items() if not outcome.startswith("2"))
+        print(f"{endpoint:<28}{len(latencies):>7}"
+              f"{percentile(latencies, 50) * 1000:>10.1f}{percentile(latencies, 95) * 1000:>10.1f}"
+              f"{percentile(latencies, 99) * 1000:>10.1f}{latencies[-1] * 1000:>10.1f}"
+              f"{errors / len(latencies) * 100:>8.1f}%")
+        print(f"{'':<28}outcomes: {dict(outcomes)}")
+
+    caches = sorted({cache for cache, _ in cache_after})
+    if caches:
+        print("\ncache hit ratio during the run:")
+        for cache in caches:
+            hits = cache_after[(cache, "hit")] - cache_before[(cache, "hit")]
+            nearby = cache_after[(cache, "nearby")] - cache_before[(cache, "nearby")]
+            misses = cache_after[(cache, "miss")] - cache_before[(cache, "miss")]
+            if hits + nearby + misses:
+                print(f"  {cache:<20}{(hits + nearby) / (hits + nearby + misses) * 100:>6.1f}% "
+                      f"({int(hits)} hits, {int(nearby)} nearby, {int(misses)} misses)")
+
+
+async def run(args) -> Results:
+    rng = random.Random(args.seed)
+    corpus = load_corpus(args.corpus, rng, args.corpus_size, args.center[0], args.center[1], args.radius_m)
+    params = {"year": args.year, **({"budget_ms": args.budget_ms} if args.budget_ms else {})}
+    results = Results()
+    history = []
+
+    def next_request():
+        if rng.random() < args.crops_ratio:
+            return "/crops", None
+        return "/recommendations/polygon", pick_polygon(rng, corpus, args.repeat_ratio, history)
+
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=100)
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        cache_before = await scrape_cache_counters(client)
+        start = time.perf_counter()
+
+        if args.rate:
+            # Open loop: Poisson arrivals at the target rate, independent of response times
+            tasks = []
+            next_arrival = start
+            while next_arrival - start < args.duration and (not args.requests or len(tasks) < args.requests):
+                await asyncio.sleep(max(0.0, next_arrival - time.perf_counter()))
+                endpoint, body = next_request()
+                tasks.append(asyncio.create_task(send_request(client, results, endpoint, body, params)))
+                next_arrival += rng.expovariate(args.rate)
+            await asyncio.gather(*tasks)
+        else:
+            # Closed loop: each client waits for its answer before sending the next request
+            remaining = args.requests or math.inf
+
+            async def client_loop():
+                nonlocal remaining
+                while remaining > 0 and time.perf_counter() - start < args.duration:
+                    remaining -= 1
+                    endpoint, body = next_request()
+                    await send_request(client, results, endpoint, body, params)
+
+            await asyncio.gather(*(client_loop() for _ in range(args.concurrency)))
+
+        elapsed = time.perf_counter() - start
+        cache_after = await scrape_cache_counters(client)
+
+    print_report(results, elapsed, cache_before, cache_after)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="Base URL of the API")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--rate", type=float, help="Open loop: mean arrival rate in requests per second")
+    mode.add_argument("--concurrency", type=int, default=10, help="Closed loop: number of concurrent clients")
+    parser.add_argument("--duration", type=float, default=60.0, help="Maximum duration in seconds")
+    parser.add_argument("--requests", type=int, default=0, help="Maximum number of requests (0: no limit)")
+    parser.add_argument("--corpus", help="JSONL file of polygon request bodies")
+    parser.add_argument("--corpus-size", type=int, default=200, help="Generated corpus size without --corpus")
+    parser.add_argument("--center", type=float, nargs=2, default=(48.1295, 11.5682), metavar=("LAT", "LON"),
+                        help="Center of the generated polygons")
+    parser.add_argument("--radius-m", type=float, default=3000.0, help="Radius of the generated polygons area")
+    parser.add_argument("--repeat-ratio", type=float, default=0.3,
+                        help="Share of requests resending an already sent polygon (redraws, revisits)")
+    parser.add_argument("--crops-ratio", type=float, default=0.1, help="Share of requests to /crops")
+    parser.add_argument("--year", type=int, default=2023)
+    parser.add_argument("--budget-ms", type=float, help="budget_ms sent with the polygon requests")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Client timeout in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""Local stand-ins for NASA POWER, the Planetary Computer STAC API and the Landsat COG hosting.
+
+All three are served by one FastAPI app, each with its own injected latency and error rate:
+- /power/api/temporal/daily/point: NASA POWER daily point responses (synthetic, per grid cell)
+- /stac: minimal STAC API (landing page and item search) over generated Landsat scenes
+- /cogs/{name}: the scene GeoTIFFs, with HTTP range requests as used by GDAL
+
+Usage (from the api directory):
+    uv run python -m loadtest.fake_upstreams --port 8100 --power-latency-ms 300 --stac-error-rate 0.05
+
+Then start the API against it:
+    MICROSOFT_PLANETARY_API_URL=http://127.0.0.1:8100/stac \\
+    NASA_POWER_API_URL=http://127.0.0.1:8100/power/api/temporal/daily/point \\
+    GDAL_DISABLE_READDIR_ON_OPEN=EMPTY_DIR \\
+    uv run uvicorn main:app --port 8000
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import re
+import tempfile
+from functools import lru_cache
+from typing import Dict
+
+from fastapi import FastAPI, HTTPException, Request, Response
+
+from benchmarks.fixtures import build_stac_items, generate_power_data, synthetic_acquisitions, write_landsat_scenes
+
+# Scene size in pixels (30 m), large enough to cover the load-test polygon corpus
+SCENE_SIZE = 256
+
+RANGE_PATTERN = re.compile(r"bytes=(\d*)-(\d*)")
+
+
+class UpstreamBehaviour:
+    """
+    Latency and error injection of one stand-in service.
+
+    Attributes:
+        latency_ms: Fixed delay added to every response
+        jitter_ms: Extra random delay, uniform between 0 and jitter_ms
+        error_rate: Probability (0-1) of answering 503 instead of the response
+    """
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+
+    async def apply(self):
+        """Wait for the injected latency, then raise a 503 with the injected probability."""
+        delay_ms = self.latency_ms + random.uniform(0, self.jitter_ms)
+        if delay_ms > 0:
+            await asyncio.sleep(delay_ms / 1000)
+        if random.random() < self.error_rate:
+            raise HTTPException(status_code=503, detail="Injected upstream error")
+
+
+def scene_footprint(path: str):
+    """Footprint of a GeoTIFF as a (west, south, east, north) lon/lat bounding box."""
+    import rasterio
+    from rasterio.warp import transform_bounds
+
+    with rasterio.open(path) as src:
+        return transform_bounds(src.crs, "EPSG:4326", *src.bounds)
+
+
+def geometry_bbox(geometry: Dict):
+    """Bounding box (west, south, east, north) of a GeoJSON geometry."""
+    def points(coordinates):
+        if isinstance(coordinates[0], (int, float)):
+            yield coordinates
+        else:
+            for child in coordinates:
+                yield from points(child)
+
+    lons, lats = zip(*((point[0], point[1]) for point in points(geometry["coordinates"])))
+    return min(lons), min(lats), max(lons), max(lats)
+
+
+def create_app(public_url: str, behaviours: Dict[str, UpstreamBehaviour], scene_dir: str) -> FastAPI:
+    """
+    Build the stand-in app.
+
+    Args:
+        public_url: Base URL clients use to reach the app, used in STAC links and asset hrefs
+        behaviours: UpstreamBehaviour of "power", "stac" and "cogs"
+        scene_dir: Directory for the generated scenes
+
+    Returns:
+        FastAPI app
+    """
+    app = FastAPI(title="Home Grown fake upstreams")
+
+    scenes = write_landsat_scenes(scene_dir, size=SCENE_SIZE)
+    footprint = scene_footprint(scenes[0][0])
+    cog_files = {}
+    for lwir_path, qa_path in scenes:
+        for path in (lwir_path, qa_path):
+            with open(path, "rb") as f:
+                cog_files[os.path.basename(path)] = f.read()
+    scene_hrefs = [
+        (f"{public_url}/cogs/{os.path.basename(lwir_path)}", f"{public_url}/cogs/{os.path.basename(qa_path)}")
+        for lwir_path, qa_path in scenes
+    ]
+
+    @lru_cache(maxsize=64)
+    def power_response(year: int, latitude: float, longitude: float) -> Dict:
+        # Same data for every point of a NASA POWER grid cell, like the real API
+        seed = hash((round(latitude / 0.5), round(longitude / 0.625)))
+        return generate_power_data(year, seed)
+
+    @lru_cache(maxsize=16)
+    def stac_items(year: int):
+        return [item.to_dict() for item in build_stac_items(scene_hrefs, synthetic_acquisitions(year), bbox=footprint)]
+
+    @app.get("/power/api/temporal/daily/point")
+    async def power_daily_point(latitude: float, longitude: float, start: str, end: str):
+        await behaviours["power"].apply()
+        return power_response(int(start[:4]), latitude, longitude)
+
+    @app.get("/stac")
+    @app.get("/stac/")
+    async def stac_landing_page():
+        await behaviours["stac"].apply()
+        return {
+            "type": "Catalog",
+            "id": "fake-stac",
+            "stac_version": "1.0.0",
+            "description": "Local stand-in of the Planetary Computer STAC API",
+            "conformsTo": [
+                "https://api.stacspec.org/v1.0.0/core",
+                "https://api.stacspec.org/v1.0.0/item-search",
+                "https://api.stacspec.org/v1.0.0/item-search#query"
+            ],
+            "links": [
+                {"rel": "self", "href": f"{public_url}/stac", "type": "application/json"},
+                {"rel": "root", "href": f"{public_url}/stac", "type": "application/json"},
+                {"rel": "search", "href": f"{public_url}/stac/search", "type": "application/geo+json", "method": "POST"},
+                {"rel": "search", "href": f"{public_url}/stac/search", "type": "application/geo+json", "method": "GET"}
+            ]
+        }
+
+    @app.api_route("/stac/search", methods=["GET", "POST"])
+    async def stac_search(request: Request):
+        await behaviours["stac"].apply()
+        body = await request.json() if request.method == "POST" else {}
+        datetime_range = body.get("datetime") or request.query_params.get("datetime") or "2023"
+        intersects = body.get("intersects")
+
+        features = stac_items(int(datetime_range[:4]))
+        if intersects is not None:
+            west, south, east, north = geometry_bbox(intersects)
+            if east < footprint[0] or west > footprint[2] or north < footprint[1] or south > footprint[3]:
+                features = []
+
+        return {"type": "FeatureCollection", "features": features, "links": []}
+
+    @app.api_route("/cogs/{name}", methods=["GET", "HEAD"])
+    async def cog(name: str, request: Request):
+        await behaviours["cogs"].apply()
+        data = cog_files.get(name)
+        if data is None:
+            raise HTTPException(status_code=404, detail="Not found")
+
+        headers = {"Accept-Ranges": "bytes", "Content-Type": "image/tiff"}
+        match = RANGE_PATTERN.fullmatch(request.headers.get("range", ""))
+        if match is None:
+            # HEAD answers with the length of the body a GET would return
+            headers["Content-Length"] = str(len(data))
+            return Response(b"" if request.method == "HEAD" else data, headers=headers)
+
+        first, last = match.groups()
+        if first == "" and last == "":
+            raise HTTPException(status_code=416, detail="Range not satisfiable")
+        if first == "":
+            # Suffix range: the last N bytes
+            first, last = max(0, len(data) - int(last)), len(data) - 1
+        else:
+            first, last = int(first), min(int(last) if last else len(data) - 1, len(data) - 1)
+        if first >= len(data) or first > last:
+            raise HTTPException(status_code=416, detail="Range not satisfiable")
+
+        headers["Content-Range"] = f"bytes {first}-{last}/{len(data)}"
+        headers["Content-Length"] = str(last - first + 1)
+        return Response(b"" if request.method == "HEAD" else data[first:last + 1], status_code=206, headers=headers)
+
+    return app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--public-url", help="Base URL used in STAC links, defaults to http://host:port")
+    for service in ("power", "stac", "cogs"):
+        parser.add_argument(f"--{service}-latency-ms", type=float, default=0.0)
+        parser.add_argument(f"--{service}-jitter-ms", type=float, default=0.0)
+        parser.add_argument(f"--{service}-error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    behaviours = {
+        service: UpstreamBehaviour(
+            getattr(args, f"{service}_latency_ms"),
+            getattr(args, f"{service}_jitter_ms"),
+            getattr(args, f"{service}_error_rate")
+        )
+        for service in ("power", "stac", "cogs")
+    }
+
+    with tempfile.TemporaryDirectory() as scene_dir:
+        app = create_app(args.public_url or f"http://{args.host}:{args.port}", behaviours, scene_dir)
+        uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
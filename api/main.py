@@ -1,48 +1,164 @@
 """CROP DATABASE TAKEN FROM https://www.sciencedirect.com/science/article/pii/S037837742500469X"""
 
-from fastapi import FastAPI, HTTPException
+from abc import ABC, abstractmethod
+from fastapi import FastAPI, Header, HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+import hmac
 import httpx
-from typing import Dict, Optional, List, Tuple
+import json
+import logging
+import secrets
+from typing import Callable, Dict, Iterable, Optional, List, Set, Tuple
 import statistics
 
-from summary_gen import generate_crop_summary
+from summary_gen import generate_crop_summary_async
+from logging_config import RequestIdMiddleware, configure_logging, request_id_var
+from profiler import collect_worker_stacks, format_collapsed, sample_stacks, serve_worker_profiling
+from jobs import JOB_DONE, JobQueue, JobStore
+from suitability.grid import SuitabilityGrid, find_grid, grids_signature, load_grids, summarize_cell_scores
+from spatial_cache import SpatialCache
+from shade import shade_distribution, shade_samples
+from metrics import (CACHE_REQUESTS, UPSTREAM_DURATION_SECONDS, UPSTREAM_ERRORS, MetricsMiddleware,
+                     render_prometheus, server_timing_header, start_request_timing, timed_stage, timed_upstream)
 from crop_database import CROP_DATABASE
+from models import PolygonInput
+from routers import batch, map_tiles, rescore
 from pydantic import BaseModel, Field
 import math
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
 import os
 from dotenv import load_dotenv
 
-from datetime import datetime
-import geopandas as gpd
+from datetime import datetime, timezone
+import numpy as np
 import pandas as pd
 import planetary_computer
 from pystac_client import Client
 from pystac_client.exceptions import APIError
 import pystac
 import rasterio
+from rasterio.features import geometry_mask, geometry_window
 from rasterio.merge import merge
-from rasterio.windows import from_bounds
+from rasterio.warp import transform_geom
 from shapely import Polygon, wkt
+from shapely.geometry import mapping, shape
 import shapely
 import asyncio
+import multiprocessing
+import threading
 import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
 
 
 load_dotenv()
+configure_logging()
+
+logger = logging.getLogger(__name__)
+
+# Upstream APIs. Can be pointed at local stand-ins (see loadtest/fake_upstreams.py) for load testing.
+MICROSOFT_PLANETARY_API_URL = os.getenv("MICROSOFT_PLANETARY_API_URL", "https://planetarycomputer.microsoft.com/api/stac/v1")
+NASA_POWER_API_URL = os.getenv("NASA_POWER_API_URL", "https://power.larc.nasa.gov/api/temporal/daily/point")
+
+# Scene-level cloud cover threshold (%) for the Landsat search. Cloudy pixels are
+# removed per pixel with QA_PIXEL, so partly cloudy scenes are still usable.
+LANDSAT_MAX_CLOUD_COVER = 50
+
+# Landsat Collection 2 QA_PIXEL bits rejected before reduction:
+# bit 0 fill, bit 1 dilated cloud, bit 2 cirrus, bit 3 cloud, bit 4 cloud shadow.
+LANDSAT_QA_BAND = "qa_pixel"
+LANDSAT_QA_REJECT_BITS = 0b11111
+
+# Percentiles of the clear pixels used as the daily (tmin, tmax). Less sensitive to
+# single hot roofs or cold shadow pixels than the raw min/max.
+LANDSAT_TEMPERATURE_PERCENTILES = (5, 95)
+
+# Landsat raster decoding runs in a process pool so it uses several cores and does not
+# block the event loop. Past the timeout the request continues with NASA POWER only.
+LANDSAT_PROCESS_WORKERS = int(os.getenv("LANDSAT_PROCESS_WORKERS", os.cpu_count() or 1))
+LANDSAT_PROCESSING_TIMEOUT_S = float(os.getenv("LANDSAT_PROCESSING_TIMEOUT_S", "45"))
+
+# Cancellation flags shared with the Landsat worker processes, one slot per running task.
+# A worker checks its flag between two dates, so a cancelled request stops reading scenes.
+LANDSAT_CANCEL_SLOTS = 1024
+
+_landsat_executor: ProcessPoolExecutor | None = None
+_landsat_cancel_flags = None
+_landsat_free_cancel_slots: List[int] = []
+
+# Profiling sessions of the Landsat workers (see profiler.serve_worker_profiling)
+_landsat_profile_session = None
+_landsat_profile_interval = None
+_landsat_profile_results = None
+
+
+def init_landsat_worker(cancel_flags, profile_session, profile_interval, profile_results):
+    """Initializer of the Landsat worker processes: keep the shared cancellation flags and start the sampler thread."""
+    global _landsat_cancel_flags
+    _landsat_cancel_flags = cancel_flags
+    threading.Thread(
+        target=serve_worker_profiling,
+        args=(profile_session, profile_interval, profile_results, "landsat-worker"),
+        name="profiler",
+        daemon=True
+    ).start()
+
+
+def get_landsat_executor() -> ProcessPoolExecutor:
+    """Return the process pool used for Landsat processing, creating it on first use."""
+    global _landsat_executor, _landsat_cancel_flags, _landsat_free_cancel_slots
+    global _landsat_profile_session, _landsat_profile_interval, _landsat_profile_results
+    if _landsat_executor is None:
+        # spawn rather than fork: the parent runs an event loop and GDAL threads.
+        context = multiprocessing.get_context("spawn")
+        _landsat_cancel_flags = context.RawArray("b", LANDSAT_CANCEL_SLOTS)
+        _landsat_free_cancel_slots = list(range(LANDSAT_CANCEL_SLOTS))
+        _landsat_profile_session = context.RawValue("i", 0)
+        _landsat_profile_interval = context.RawValue("d", 0.005)
+        _landsat_profile_results = context.Queue()
+        _landsat_executor = ProcessPoolExecutor(
+            max_workers=LANDSAT_PROCESS_WORKERS,
+            mp_context=context,
+            initializer=init_landsat_worker,
+            initargs=(_landsat_cancel_flags, _landsat_profile_session, _landsat_profile_interval,
+                      _landsat_profile_results)
+        )
+    return _landsat_executor
+
+
+# Long-running analysis jobs (see jobs.py), kept in a local SQLite database. Set JOB_WORKERS
+# to 0 on all server processes but one.
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", "jobs.sqlite3")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "1"))
+
+_job_queue: JobQueue | None = None
 
-MICROSOFT_PLANETARY_API_URL = "https://planetarycomputer.microsoft.com/api/stac/v1"
 
-class PolygonInput(BaseModel):
-    """Polygon with coordinate points [(lat, lon), ...]"""
-    coordinates: List[Tuple[float, float]] = Field(..., min_length=3,
-                                                   description="List of (latitude, longitude) tuples")
-    sunshine_duration: Optional[List[float]] = Field(None,
-                                                     description="List of sunshine duration factors (0-1) for each point. If not provided, defaults to 0.7")
+def get_job_queue() -> JobQueue:
+    """Return the analysis job queue, opening its database on first use."""
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = JobQueue(JobStore(JOBS_DB_PATH), run_analysis_job, JOB_WORKERS)
+    return _job_queue
 
 
-app = FastAPI(title="Home Grown API", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Run the analysis job workers while the server is up and release the worker processes when it stops."""
+    get_job_queue().start()
+    seeding = asyncio.create_task(map_tiles.seed_tile_cache()) if map_tiles.TILE_SEED_ZOOMS else None
+    yield
+    if seeding is not None:
+        seeding.cancel()
+    await get_job_queue().stop()
+    if _landsat_executor is not None:
+        _landsat_executor.shutdown(wait=False, cancel_futures=True)
+
+
+app = FastAPI(title="Home Grown API", version="1.0.0", lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -56,6 +172,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request counts, latencies and requests in flight for /metrics
+app.add_middleware(MetricsMiddleware)
+
+# Request id attached to every log line (outermost, so it covers the other middlewares)
+app.add_middleware(RequestIdMiddleware)
+
 
 @app.get("/")
 async def root():
@@ -73,6 +195,68 @@ async def health_check():
     return {"status": "ok"}
 
 
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus metrics: request, stage and upstream latencies, upstream errors and cache hit rates"""
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+# Token required by the admin endpoints. They are disabled when it is not set.
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+# Only one profiling session at a time per worker
+_profiling_lock = asyncio.Lock()
+_profiling_sessions = 0
+
+
+def profile_process(seconds: float, interval_s: float) -> Dict[str, int]:
+    """
+    Sample the stacks of this server process and of its Landsat worker processes.
+
+    Blocks for the sampling duration, call it from a worker thread.
+    """
+    global _profiling_sessions
+    if _landsat_executor is None:
+        return sample_stacks(seconds, interval_s)
+
+    _profiling_sessions += 1
+    session = _profiling_sessions
+    _landsat_profile_interval.value = interval_s
+    _landsat_profile_session.value = session
+    try:
+        stacks = sample_stacks(seconds, interval_s)
+    finally:
+        _landsat_profile_session.value = 0
+    stacks.update(collect_worker_stacks(_landsat_profile_results, session, LANDSAT_PROCESS_WORKERS))
+    return stacks
+
+
+@app.get("/admin/profile")
+async def profile_worker(
+        seconds: float = Query(10.0, gt=0, le=60),
+        interval_ms: float = Query(5.0, ge=1, le=100),
+        x_admin_token: Optional[str] = Header(None)
+):
+    """
+    Sample the stacks of this worker for a number of seconds while it serves traffic.
+
+    The Landsat worker processes are sampled too, their stacks start with "landsat-worker".
+    Returns collapsed stacks ("outer;inner;leaf count" per line), ready for flamegraph.pl
+    or speedscope. Requires the ADMIN_TOKEN in the X-Admin-Token header.
+    """
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+    if _profiling_lock.locked():
+        raise HTTPException(status_code=409, detail="A profiling session is already running")
+
+    async with _profiling_lock:
+        stacks = await asyncio.to_thread(profile_process, seconds, interval_ms / 1000)
+
+    return PlainTextResponse(format_collapsed(stacks))
+
+
 @app.get("/api/example")
 async def example_endpoint():
     """Example endpoint demonstrating response structure"""
@@ -401,7 +585,7 @@ async def fetch_nasa_power_data(latitude: float, longitude: float, year: int = 2
         "format": "JSON"
     }
 
-    url = "https://power.larc.nasa.gov/api/temporal/daily/point"
+    url = NASA_POWER_API_URL
 
     headers = {
         "User-Agent": "SpaceAppsChallenge/1.0 (urban-agriculture-recommender)"
@@ -409,8 +593,9 @@ async def fetch_nasa_power_data(latitude: float, longitude: float, year: int = 2
 
     async with httpx.AsyncClient(timeout=60.0, headers=headers) as client:
         try:
-            response = await client.get(url, params=params)
-            response.raise_for_status()
+            with timed_upstream("nasa_power"):
+                response = await client.get(url, params=params)
+                response.raise_for_status()
             return response.json()
         except httpx.HTTPStatusError as e:
             raise HTTPException(
@@ -468,7 +653,7 @@ async def fetch_all_climate_data(latitude: float, longitude: float, year: int,
                 years_fetched.append(y)
             except Exception as e:
                 # Log but continue with available years
-                print(f"Warning: Could not fetch data for year {y}: {e}")
+                logger.warning("Could not fetch data for year %s: %s", y, e)
 
         if nasa_data_multi_year:
             result["monthly_averages"] = calculate_monthly_averages(nasa_data_multi_year)
@@ -651,9 +836,94 @@ def calculate_yield_estimate(crop_data: Dict, suitability_score: float, area_m2:
     }
 
 
+def precompute_crop_climate(nasa_raw_data: Dict, crops: Dict = CROP_DATABASE) -> Dict[str, Dict]:
+    """
+    Calculate the plot-independent climate metrics of many crops at once.
+
+    Growing-season sunshine before shade and total GDD only depend on the daily climate
+    series and the crop temperatures, so they are computed for all crops in one vectorized
+    pass and shared by every plot (and every sunshine factor) with the same climate data.
+    Same rules as calculate_growing_season_sunshine and calculate_gdd.
+
+    Args:
+        nasa_raw_data: Raw NASA POWER data with daily temperature and solar radiation
+        crops: Crops to evaluate, keyed by crop id (default: all crops in the database)
+
+    Returns:
+        Dictionary mapping crop ids to dictionaries containing:
+        - estimated_sun_hours: Average sunshine during growing season (before shade, not rounded)
+        - avg_solar_radiation: Average solar radiation during growing season (MJ/m²/day)
+        - growing_days: Number of days when crop can grow
+        - total_days: Total days in dataset
+        - total_gdd: Growing Degree Days of the year
+    """
+    parameters = nasa_raw_data.get("properties", {}).get("parameter", {})
+    solar_data = parameters.get("ALLSKY_SFC_SW_DWN", {})
+    temp_max_data = parameters.get("T2M_MAX", {})
+    temp_min_data = parameters.get("T2M_MIN", {})
+
+    crop_ids = list(crops)
+    # Crops along the first axis, days along the second
+    base_temps = np.array([crops[crop_id]["base_temp"] for crop_id in crop_ids], dtype=float)[:, None]
+    upper_temps = np.array([crops[crop_id]["upper_temp"] for crop_id in crop_ids], dtype=float)[:, None]
+
+    # Growing-season sunshine: days with solar radiation and both temperatures
+    sun_days = [date_key for date_key in solar_data if date_key in temp_max_data and date_key in temp_min_data]
+    solar = np.array([solar_data[date_key] for date_key in sun_days], dtype=float)
+    avg_temps = np.array([(temp_max_data[date_key] + temp_min_data[date_key]) / 2 for date_key in sun_days],
+                         dtype=float)
+    sunshine_hours = np.clip(solar * 0.278 / 0.35, 0, 16)
+
+    growing = avg_temps[None, :] > base_temps
+    growing_days = growing.sum(axis=1)
+    estimated_hours = np.divide((growing * sunshine_hours).sum(axis=1), growing_days,
+                                out=np.zeros(len(crop_ids)), where=growing_days > 0)
+    avg_solar_rad = np.divide((growing * solar).sum(axis=1), growing_days,
+                              out=np.zeros(len(crop_ids)), where=growing_days > 0)
+
+    # Growing Degree Days: days with both temperatures, clipped to [base, upper] (FAO56rev)
+    gdd_days = [date_key for date_key in temp_max_data if date_key in temp_min_data]
+    temp_max = np.array([temp_max_data[date_key] for date_key in gdd_days], dtype=float)[None, :]
+    temp_min = np.array([temp_min_data[date_key] for date_key in gdd_days], dtype=float)[None, :]
+    adj_avg_temps = (np.clip(temp_max, base_temps, upper_temps) + np.clip(temp_min, base_temps, upper_temps)) / 2
+    total_gdd = (adj_avg_temps - base_temps).sum(axis=1)
+
+    return {
+        crop_id: {
+            "estimated_sun_hours": float(estimated_hours[i]),
+            "avg_solar_radiation": float(avg_solar_rad[i]),
+            "growing_days": int(growing_days[i]),
+            "total_days": len(sun_days),
+            "total_gdd": float(total_gdd[i])
+        }
+        for i, crop_id in enumerate(crop_ids)
+    }
+
+
+def apply_sunshine_factor(crop_climate: Dict, sunshine_factor: float) -> Dict:
+    """
+    Apply a shade factor to the precomputed growing-season sunshine of a crop.
+
+    Args:
+        crop_climate: Metrics of one crop from precompute_crop_climate
+        sunshine_factor: Reduction factor for local shade/obstructions (0-1)
+
+    Returns:
+        Dictionary with the same fields as calculate_growing_season_sunshine
+    """
+    return {
+        "estimated_sun_hours": round(crop_climate["estimated_sun_hours"], 2),
+        "adjusted_sun_hours": round(crop_climate["estimated_sun_hours"] * sunshine_factor, 2),
+        "sunshine_factor": round(sunshine_factor, 2),
+        "growing_days": crop_climate["growing_days"],
+        "total_days": crop_climate["total_days"],
+        "avg_solar_radiation": round(crop_climate["avg_solar_radiation"], 2)
+    }
+
+
 def calculate_crop_suitability(crop_data: Dict, climate_analysis: Dict,
                                nasa_raw_data: Dict, sunshine_factor: float = 1.0,
-                               area_m2: float = None) -> Dict:
+                               area_m2: float = None, crop_climate: Optional[Dict] = None) -> Dict:
     """
     Calculate suitability score for a specific crop based on climate data.
 
@@ -663,6 +933,7 @@ def calculate_crop_suitability(crop_data: Dict, climate_analysis: Dict,
         nasa_raw_data: Raw NASA POWER data (for GDD calculation and growing-season sunshine)
         sunshine_factor: Factor to adjust available sunshine (0-1) for shade/obstructions
         area_m2: Area in square meters (optional, for yield estimation)
+        crop_climate: Metrics of this crop from precompute_crop_climate (computed if not given)
 
     Returns:
         Dictionary with suitability scores, metrics, and optional yield estimate
@@ -672,29 +943,12 @@ def calculate_crop_suitability(crop_data: Dict, climate_analysis: Dict,
     avg_temp_min = climate_analysis["temperature_min"]["mean"]
     annual_precip = climate_analysis["precipitation"]["total_annual"]
 
-    # Calculate sunshine during growing season only (when crop can actually grow)
-    sunshine_data = calculate_growing_season_sunshine(
-        nasa_raw_data,
-        crop_data["base_temp"],
-        sunshine_factor
-    )
+    # Sunshine during growing season only (when crop can actually grow) and total GDD for the year
+    if crop_climate is None:
+        crop_climate = precompute_crop_climate(nasa_raw_data, {"crop": crop_data})["crop"]
+    sunshine_data = apply_sunshine_factor(crop_climate, sunshine_factor)
     adjusted_sun_hours = sunshine_data["adjusted_sun_hours"]
-
-    # Calculate total GDD for the year
-    parameters = nasa_raw_data.get("properties", {}).get("parameter", {})
-    temp_max_data = parameters.get("T2M_MAX", {})
-    temp_min_data = parameters.get("T2M_MIN", {})
-
-    total_gdd = 0
-    for date_key in temp_max_data.keys():
-        if date_key in temp_min_data:
-            gdd = calculate_gdd(
-                temp_max_data[date_key],
-                temp_min_data[date_key],
-                crop_data["base_temp"],
-                crop_data["upper_temp"]
-            )
-            total_gdd += gdd
+    total_gdd = crop_climate["total_gdd"]
 
     # Score components (0-100 each)
     scores = {}
@@ -797,7 +1051,8 @@ def calculate_crop_suitability(crop_data: Dict, climate_analysis: Dict,
 # ============================================================================
 
 def process_crop_recommendations(climate_data: Dict, sunshine_factor: float,
-                                 area_m2: float, min_score: float = 50.0) -> Dict:
+                                 area_m2: float, min_score: float = 50.0,
+                                 crop_climate: Optional[Dict[str, Dict]] = None) -> Dict:
     """
     Process all crops and generate recommendations based on climate suitability.
 
@@ -808,6 +1063,8 @@ def process_crop_recommendations(climate_data: Dict, sunshine_factor: float,
         sunshine_factor: Sunshine adjustment factor for shade/obstructions
         area_m2: Growing area in square meters
         min_score: Minimum suitability score threshold
+        crop_climate: Per-crop metrics from precompute_crop_climate for this climate data.
+                      Computed if not given, pass it to score several plots with the same climate.
 
     Returns:
         Dictionary containing:
@@ -819,23 +1076,23 @@ def process_crop_recommendations(climate_data: Dict, sunshine_factor: float,
     climate_analysis = climate_data["climate_analysis"]
     nasa_raw_data = climate_data["primary_year_data"]
 
+    if crop_climate is None:
+        crop_climate = precompute_crop_climate(nasa_raw_data)
+
     recommendations = []
     filtered_crops = []
 
     for crop_id, crop_data in CROP_DATABASE.items():
-        # Calculate growing-season sunshine for this specific crop
+        # Growing-season sunshine for this specific crop
         # (each crop has different base temp, so growing season differs)
-        sunshine_data = calculate_growing_season_sunshine(
-            nasa_raw_data,
-            crop_data["base_temp"],
-            sunshine_factor
-        )
+        sunshine_data = apply_sunshine_factor(crop_climate[crop_id], sunshine_factor)
         adjusted_sun_hours = sunshine_data["adjusted_sun_hours"]
 
         # Check if crop meets MINIMUM sunlight requirement
         # Use min_sun_hours directly from database (no approximation)
         if adjusted_sun_hours < crop_data["min_sun_hours"]:
-            print(f"Filtered crop {crop_id} due to sunlight adjustment {adjusted_sun_hours}<{crop_data['min_sun_hours']}")
+            logger.debug("Filtered crop %s due to sunlight adjustment %s<%s",
+                         crop_id, adjusted_sun_hours, crop_data["min_sun_hours"])
             # Crop doesn't have enough sunlight - skip it
             filtered_crops.append({
                 "crop_id": crop_id,
@@ -849,7 +1106,7 @@ def process_crop_recommendations(climate_data: Dict, sunshine_factor: float,
 
         # Calculate suitability
         suitability = calculate_crop_suitability(
-            crop_data, climate_analysis, nasa_raw_data, sunshine_factor, area_m2
+            crop_data, climate_analysis, nasa_raw_data, sunshine_factor, area_m2, crop_climate[crop_id]
         )
 
         if suitability["overall_score"] >= min_score:
@@ -932,7 +1189,7 @@ async def get_climate_data(year: int = 2023):
 # DATA MERGING FUNCTION
 # ============================================================================
 
-def merge_climate_data(nasa_data: Dict, landsat_df: pd.DataFrame, year: int) -> Dict:
+def merge_climate_data(nasa_data: Dict, landsat_df: pd.DataFrame, year: int, weight: float = 1.0) -> Dict:
     """
     Merge NASA POWER data with higher-resolution Landsat surface temperature data.
 
@@ -941,63 +1198,63 @@ def merge_climate_data(nasa_data: Dict, landsat_df: pd.DataFrame, year: int) ->
     2. NASA POWER provides complete daily coverage but coarse spatial resolution
     3. Use Landsat data where available, NASA POWER as fallback
 
+    The Landsat series is aligned to the NASA POWER date keys and overlaid in one array
+    operation. The input is left untouched so raw NASA POWER responses can be cached.
+
     Args:
         nasa_data: Raw NASA POWER API response with daily data
         landsat_df: DataFrame with Landsat surface temperatures (columns: tmin, tmax)
                     Index should be datetime
         year: Year of analysis
+        weight: Weight (0-1) of Landsat against NASA POWER on dates where both exist.
+                1.0 replaces NASA POWER temperatures with Landsat ones.
 
     Returns:
-        Modified nasa_data dict with temperatures updated from Landsat where available
+        New NASA POWER style dict with temperatures taken from Landsat where available
     """
-    print(f"\n=== MERGING CLIMATE DATA ===")
-    print(f"NASA POWER data year: {year}")
-    print(f"Landsat data shape: {landsat_df.shape}")
-    print(f"Landsat date range: {landsat_df.index.min()} to {landsat_df.index.max()}")
-
     # Extract NASA POWER temperature data
-    parameters = nasa_data.get("properties", {}).get("parameter", {})
+    properties = nasa_data.get("properties", {})
+    parameters = properties.get("parameter", {})
     nasa_tmax = parameters.get("T2M_MAX", {})
     nasa_tmin = parameters.get("T2M_MIN", {})
 
-    # Track statistics
-    merged_count = 0
-    nasa_only_count = 0
-
-    # Iterate through Landsat data and update NASA where available
-    for date_idx, row in landsat_df.iterrows():
-        # Convert datetime index to NASA format: YYYYMMDD
-        date_key = date_idx.strftime("%Y%m%d")
-
-        # Check if this date exists in NASA data
-        if date_key in nasa_tmax and date_key in nasa_tmin:
-            # Only update if Landsat has valid (non-NaN) data
-            if pd.notna(row['tmax']) and pd.notna(row['tmin']):
-                old_tmax = nasa_tmax[date_key]
-                old_tmin = nasa_tmin[date_key]
-
-                # Update with Landsat data
-                nasa_tmax[date_key] = float(row['tmax'])
-                nasa_tmin[date_key] = float(row['tmin'])
-
-                merged_count += 1
-
-                if merged_count <= 3:  # Show first few merges
-                    print(f"  Merged {date_key}: NASA ({old_tmin:.1f}, {old_tmax:.1f}) -> Landsat ({row['tmin']:.1f}, {row['tmax']:.1f})")
-
-    # Count NASA-only dates
-    nasa_only_count = len(nasa_tmax) - merged_count
-
-    print(f"\nMerge Summary:")
-    print(f"  - Dates with Landsat data: {merged_count}")
-    print(f"  - Dates with NASA POWER only: {nasa_only_count}")
-    print(f"  - Total dates: {len(nasa_tmax)}")
-    print(f"  - Landsat coverage: {merged_count/len(nasa_tmax)*100:.1f}%")
-    print(f"=== MERGE COMPLETE ===\n")
+    # Landsat dates with valid (non-NaN) data, keyed like NASA POWER: YYYYMMDD
+    landsat = landsat_df[["tmin", "tmax"]].dropna()
+    landsat.index = landsat.index.strftime("%Y%m%d")
+    # The last row of a date wins, as when each row overwrote the NASA POWER value in turn
+    landsat = landsat[~landsat.index.duplicated(keep="last")]
+
+    # Align Landsat to the NASA POWER dates, only where NASA has both temperatures
+    nasa_dates = pd.Index(list(nasa_tmax.keys()))
+    nasa_dates = nasa_dates[nasa_dates.isin(list(nasa_tmin.keys()))]
+    landsat = landsat.reindex(nasa_dates)
+    use_landsat = landsat["tmax"].notna().to_numpy()
+
+    merged_dates = nasa_dates[use_landsat]
+    landsat_tmax = landsat["tmax"].to_numpy()[use_landsat]
+    landsat_tmin = landsat["tmin"].to_numpy()[use_landsat]
+    if weight < 1.0:
+        landsat_tmax = weight * landsat_tmax + (1 - weight) * pd.Series(nasa_tmax).reindex(merged_dates).to_numpy()
+        landsat_tmin = weight * landsat_tmin + (1 - weight) * pd.Series(nasa_tmin).reindex(merged_dates).to_numpy()
+    merged_tmax = dict(zip(merged_dates, landsat_tmax.tolist()))
+    merged_tmin = dict(zip(merged_dates, landsat_tmin.tolist()))
+
+    merged_count = len(merged_dates)
+    total_count = len(nasa_tmax)
+    logger.info("Merged Landsat into NASA POWER for %s: %d/%d dates with Landsat data",
+                year, merged_count, total_count)
 
-    # Return the modified NASA data
-    # (modifications were made in-place to the dictionaries)
-    return nasa_data
+    return {
+        **nasa_data,
+        "properties": {
+            **properties,
+            "parameter": {
+                **parameters,
+                "T2M_MAX": {**nasa_tmax, **merged_tmax},
+                "T2M_MIN": {**nasa_tmin, **merged_tmin}
+            }
+        }
+    }
 
 
 # ============================================================================
@@ -1029,29 +1286,32 @@ async def query_planetary_stac_async(api_url: str,
     for attempt in range(max_retries):
         try:
             # Run the synchronous STAC query in a thread pool
-            result = await loop.run_in_executor(
-                None,
-                query_planetary_stac,
-                api_url,
-                collection,
-                polygon,
-                time_range,
-                max_cloud_coverage
-            )
+            with timed_upstream("stac"):
+                result = await loop.run_in_executor(
+                    None,
+                    query_planetary_stac,
+                    api_url,
+                    collection,
+                    polygon,
+                    time_range,
+                    max_cloud_coverage
+                )
             if result is not None:
                 return result
+            UPSTREAM_ERRORS.inc(("stac",))
         except (APIError, Exception) as e:
             if attempt < max_retries - 1:
                 # Exponential backoff: 1s, 2s, 4s
                 wait_time = 2 ** attempt
-                print(f"WARNING: Planetary Computer API timeout (attempt {attempt + 1}/{max_retries}). Retrying in {wait_time}s...")
+                logger.warning("Planetary Computer API timeout (attempt %d/%d). Retrying in %ds...",
+                               attempt + 1, max_retries, wait_time)
                 await asyncio.sleep(wait_time)
             else:
-                print(f"ERROR: Planetary Computer API failed after {max_retries} attempts: {str(e)}")
-                print("WARNING: Continuing without Landsat satellite data")
+                logger.error("Planetary Computer API failed after %d attempts, continuing without Landsat "
+                             "satellite data: %s", max_retries, e)
                 return None
         except Exception as e:
-            print(f"ERROR: Unexpected error querying Planetary Computer: {str(e)}")
+            logger.error("Unexpected error querying Planetary Computer: %s", e)
             return None
 
     return None
@@ -1102,35 +1362,201 @@ def query_planetary_stac(api_url: str,
         # Re-raise APIError so the async wrapper can handle retries
         raise e
     except Exception as e:
-        print(f"ERROR: Unexpected error in query_planetary_stac: {str(e)}")
+        logger.error("Unexpected error in query_planetary_stac: %s", e)
+        return None
+
+
+def polygon_geometry(polygon: PolygonInput) -> Polygon:
+    """Shapely polygon (longitude, latitude) of a PolygonInput."""
+    return Polygon([(lon, lat) for lat, lon in polygon.coordinates])
+
+
+def meters_per_degree(latitude: float) -> Tuple[float, float]:
+    """Approximate (longitude, latitude) meters per degree around a latitude."""
+    return 111_320 * math.cos(math.radians(latitude)), 111_320
+
+
+def outline_distance_m(a: Polygon, b: Polygon, to_meters: Tuple[float, float]) -> float:
+    """Hausdorff distance in meters between two nearby polygons, from meters_per_degree."""
+    return shapely.hausdorff_distance(
+        shapely.transform(a, lambda coords: coords * to_meters),
+        shapely.transform(b, lambda coords: coords * to_meters)
+    )
+
+
+def scene_footprints(stac_items: Optional[pystac.ItemCollection]) -> List[Tuple[pystac.Item, Polygon]]:
+    """STAC items with their footprint geometry."""
+    return [(item, shape(item.geometry)) for item in stac_items or []]
+
+
+def scenes_intersecting(footprints: List[Tuple[pystac.Item, Polygon]], aoi: Polygon) -> pystac.ItemCollection:
+    """Items of scene_footprints whose footprint intersects an area."""
+    return pystac.ItemCollection([item for item, footprint in footprints if footprint.intersects(aoi)])
+
+
+async def search_landsat_area(south: float, west: float, north: float, east: float,
+                              year: int) -> Tuple[Optional[pystac.ItemCollection], List]:
+    """
+    Search the Landsat scenes of a year over a box and keep them for the polygons inside it.
+
+    Returns:
+        Tuple of (search results or None if the search failed, scene_footprints of the results)
+    """
+    area = PolygonInput(coordinates=[(south, west), (south, east), (north, east), (north, west), (south, west)])
+    with timed_stage("stac_search"):
+        stac_items = await query_planetary_stac_async(
+            MICROSOFT_PLANETARY_API_URL,
+            "landsat-c2-l2",
+            area,
+            f"{year}-01-01/{year}-12-31",
+            LANDSAT_MAX_CLOUD_COVER
+        )
+    footprints = scene_footprints(stac_items)
+    if stac_items is not None:
+        _stac_search_cache.put(("stac", year), polygon_geometry(area), footprints)
+    return stac_items, footprints
+
+
+async def search_landsat_items(polygon: PolygonInput, year: int) -> Optional[pystac.ItemCollection]:
+    """
+    Landsat scenes of a year intersecting a polygon.
+
+    Reuses an earlier search whose area contains the polygon. Otherwise searches the
+    polygon bounding box plus STAC_SEARCH_MARGIN_DEG, so that nearby polygons reuse it.
+
+    Returns:
+        The intersecting scenes, or None if the search failed
+    """
+    aoi = polygon_geometry(polygon)
+    found = _stac_search_cache.find(("stac", year), aoi, lambda area: area.contains(aoi))
+    if found is not None:
+        CACHE_REQUESTS.inc(("stac", "hit"))
+        return scenes_intersecting(found[1], aoi)
+    CACHE_REQUESTS.inc(("stac", "miss"))
+
+    west, south, east, north = aoi.bounds
+    stac_items, footprints = await search_landsat_area(
+        south - STAC_SEARCH_MARGIN_DEG, west - STAC_SEARCH_MARGIN_DEG,
+        north + STAC_SEARCH_MARGIN_DEG, east + STAC_SEARCH_MARGIN_DEG, year
+    )
+    if stac_items is None:
         return None
+    return scenes_intersecting(footprints, aoi)
+
+
+def calculate_polygon_pixel_mask(geometry, out_shape: Tuple[int, int], transform) -> np.ndarray:
+    """
+    Rasterize a polygon onto a pixel grid.
+
+    Pixels whose centre falls inside the polygon are kept. Plots smaller than a
+    Landsat pixel may not contain any pixel centre, in which case every pixel
+    touched by the polygon is kept instead.
+
+    Args:
+        geometry: Polygon expressed in the CRS of the grid
+        out_shape: (rows, cols) of the grid
+        transform: Affine transform of the grid
+
+    Returns:
+        Boolean array of shape out_shape, True for pixels inside the polygon
+    """
+    mask = geometry_mask([geometry], out_shape=out_shape, transform=transform, invert=True)
+    if not mask.any():
+        mask = geometry_mask([geometry], out_shape=out_shape, transform=transform,
+                             invert=True, all_touched=True)
+    return mask
+
+
+def calculate_landsat_clear_mask(qa_array: np.ndarray) -> np.ndarray:
+    """
+    Decode a Landsat QA_PIXEL array into a clear-sky mask.
+
+    Args:
+        qa_array: QA_PIXEL values for a window
+
+    Returns:
+        Boolean array, True for pixels that are not fill, cloud, cirrus or cloud shadow
+    """
+    return (qa_array & LANDSAT_QA_REJECT_BITS) == 0
+
+
+# Landsat Collection 2 surface temperature coefficients (raw value to Kelvin), and Kelvin to Celsius
+LANDSAT_ST_SCALE = 0.00341802
+LANDSAT_ST_OFFSET = 149
+KELVIN_TO_CELSIUS = -273.15
+
+
+def reduce_landsat_temperatures(values: np.ndarray, percentiles: Tuple[float, float]) -> Tuple[float, float, float]:
+    """
+    Reduce the raw surface temperature values of the clear polygon pixels of a date.
+
+    Statistics are computed on the raw values and converted to Celsius afterwards. The
+    conversion is linear with a positive scale, so percentiles and mean are preserved.
+
+    Args:
+        values: Raw values of the clear pixels
+        percentiles: Low and high percentiles used as tmin and tmax
+
+    Returns:
+        Tuple of (tmin, tmax, tmean) in Celsius
+    """
+    low, high = np.percentile(values, percentiles)
+    mean = values.mean(dtype=np.float64)
+    tmin, tmax, tmean = np.array([low, high, mean]) * LANDSAT_ST_SCALE + LANDSAT_ST_OFFSET + KELVIN_TO_CELSIUS
+    return float(tmin), float(tmax), float(tmean)
+
+
+class LandsatReadCancelled(Exception):
+    """Raised in a Landsat worker process when the request waiting for its result was cancelled."""
 
 
 def calculate_surface_temperature_landsat(stac_items: pystac.ItemCollection,
                                           band: str,
-                                          polygon_coord: PolygonInput) -> pd.DataFrame:
+                                          polygon_coord: PolygonInput,
+                                          percentiles: Tuple[float, float] = LANDSAT_TEMPERATURE_PERCENTILES,
+                                          should_stop: Optional[Callable[[], bool]] = None
+                                          ) -> Optional[pd.DataFrame]:
     """Calculates the surface temperature in Celsius and generate a daily min and max temperature.
 
+    Only the clear-sky pixels (according to the QA_PIXEL band) covered by the polygon are used.
+    The reprojected polygon, its pixel window and its mask are computed once per scene grid
+    (CRS and transform) and reused for every date on that grid, since a year of scenes only
+    spans one or two UTM zones.
+
+    Each date is reduced with reduce_landsat_temperatures.
+
     Args:
         stac_items: Items fetched from the STAC api query.
         band: Name of the band to be used to extract the relevant data from the catalog
         polygon_coord: Geometry of the aoi
+        percentiles: Low and high percentiles of the clear pixels used as tmin and tmax
+        should_stop: Checked before reading each date, the reading stops when it returns True
 
     Returns:
-        Dataframe with a daily minimum and maximum temperature.
+        Dataframe with a daily minimum and maximum temperature, the mean temperature, and the
+        per-date quality (valid_pixels, valid_fraction of the polygon pixels). Days between
+        observations are forward filled for temperatures and left empty for quality columns.
+        None if no date has a clear pixel inside the polygon, as when no scene was found.
+
+    Raises:
+        LandsatReadCancelled: If should_stop returned True
     """
-    # Coefficient to use to convert the data to the real values
-    scale = 0.00341802
-    offset = 149
+    polygon = mapping(Polygon([(lon, lat) for lat, lon in polygon_coord.coordinates]))
+
+    # Polygon reprojected to each scene CRS, keyed by CRS.
+    polygons_reproj = {}
+
+    # Pixel window and window transform covering the polygon, keyed by (crs, transform, width, height) of the scene.
+    scene_windows = {}
 
-    # Factor to convert K to C.
-    kelvin_to_celsius = -273.15
+    # Polygon masks already rasterized, keyed by (crs, transform, shape) of the window.
+    polygon_masks = {}
 
     # Used to store the images URL of the same dates together. This is used to merge the same date scenes together.
     date_with_scene_dict = {}
     for i in stac_items:
         if band not in i.assets:
-            print(f"WARNING: Skipping item from {i.datetime} - band '{band}' not available")
+            logger.warning("Skipping item from %s - band '%s' not available", i.datetime, band)
             continue
         # Format the date
         date = i.datetime.strftime("%Y-%m-%d")
@@ -1138,62 +1564,115 @@ def calculate_surface_temperature_landsat(stac_items: pystac.ItemCollection,
         if date not in date_with_scene_dict:
             date_with_scene_dict[date] = []
 
-        # Store the band/image/scene URL to its corresponding date.
-        date_with_scene_dict[date].append(i.assets[band].href)
+        # Store the band/image/scene URL and its QA_PIXEL URL (if any) to its corresponding date.
+        qa_asset = i.assets.get(LANDSAT_QA_BAND)
+        date_with_scene_dict[date].append((i.assets[band].href, qa_asset.href if qa_asset else None))
 
-    date_with_daily_temperature = {"date": [], "tmin": [], "tmax": []}
+    date_with_daily_temperature = {"date": [], "tmin": [], "tmax": [], "tmean": [],
+                                   "valid_pixels": [], "valid_fraction": []}
+
+    # Time spent reading the COG windows of each date. Returned in df.attrs since this
+    # function runs in a worker process whose metrics are not exported.
+    cog_read_seconds = []
 
     # Fetch the image in an numpy array. The array corresponds to the areas of the aoi.
-    for date, urls in date_with_scene_dict.items():
+    for date, scenes in date_with_scene_dict.items():
+        if should_stop is not None and should_stop():
+            raise LandsatReadCancelled(f"Cancelled before reading {date}")
+
+        urls = [url for url, _ in scenes]
+        qa_urls = [qa_url for _, qa_url in scenes]
+        read_start = time.perf_counter()
 
         # Means that there are at least 2 scenes of the same date.
         if len(urls) > 1:
             datasets = [rasterio.open(url) for url in urls]
 
-            polygon = Polygon([(lon, lat) for lat, lon in polygon_coord.coordinates])
-
             # Make sure that the crs of the polygon is the same as the image.
-            polygon_reproj = gpd.GeoSeries(polygon).set_crs(4326).to_crs(datasets[0].crs).geometry[0]
-
-            # Get the bounding box of the polygon
-            minx, miny, maxx, maxy = polygon_reproj.bounds
-
-            # Merging the scenes of the same date together.
-            array, out_transform = merge(sources=datasets, bounds=(minx, miny, maxx, maxy))
-
-            # Creates a mask to ignore value classified as no data.
-            mask = array != 0
-
-            # Apply coefficients to covert the pixel value to real values and coversion from K to C.
-            array = (array[mask] * scale) + offset + kelvin_to_celsius
+            crs = datasets[0].crs.to_string()
+            if crs not in polygons_reproj:
+                polygons_reproj[crs] = shape(transform_geom("EPSG:4326", crs, polygon))
+            polygon_reproj = polygons_reproj[crs]
+
+            # Merging the scenes of the same date together, restricted to the bounding box of the polygon.
+            array, out_transform = merge(sources=datasets, bounds=polygon_reproj.bounds)
+            for dataset in datasets:
+                dataset.close()
+            array = array[0]
+
+            # Reuse the polygon mask if this grid has already been seen.
+            grid_key = (crs, out_transform, array.shape)
+            if grid_key not in polygon_masks:
+                polygon_masks[grid_key] = calculate_polygon_pixel_mask(polygon_reproj, array.shape, out_transform)
+
+            # Keep pixels inside the polygon and ignore value classified as no data.
+            mask = polygon_masks[grid_key] & (array != 0)
+
+            # Remove cloudy pixels when every scene of the date has a QA band.
+            if all(qa_urls):
+                qa_datasets = [rasterio.open(qa_url) for qa_url in qa_urls]
+                qa_array, _ = merge(sources=qa_datasets, bounds=polygon_reproj.bounds, nodata=1)
+                for dataset in qa_datasets:
+                    dataset.close()
+                if qa_array[0].shape == mask.shape:
+                    mask &= calculate_landsat_clear_mask(qa_array[0])
 
         # Case when only 1 scene is available for a date.
         else:
             with rasterio.open(urls[0]) as src:
 
-                polygon = Polygon([(lon, lat) for lat, lon in polygon_coord.coordinates])
-
-                polygon_reproj = gpd.GeoSeries(polygon).set_crs(4326).to_crs(src.crs).geometry[0]
+                crs = src.crs.to_string()
+                scene_key = (crs, src.transform, src.width, src.height)
+                if scene_key not in scene_windows:
+                    if crs not in polygons_reproj:
+                        polygons_reproj[crs] = shape(transform_geom("EPSG:4326", crs, polygon))
 
-                # Get the bounding box of the polygon
-                minx, miny, maxx, maxy = polygon_reproj.bounds
-
-                # Get the bounding box of the polygon
-                window = from_bounds(minx, miny, maxx, maxy, transform=src.transform)
+                    # Pixel window covering the polygon
+                    window = geometry_window(src, [polygons_reproj[crs]])
+                    scene_windows[scene_key] = (window, src.window_transform(window))
+                window, window_transform = scene_windows[scene_key]
 
                 # Fetch the array from the URL that matches the aoi.
                 array = src.read(1, window=window)
 
-                # Creates a mask to ignore value classified as no data.
-                mask = array != src.nodata
+                # Reuse the polygon mask if this grid has already been seen.
+                grid_key = (crs, window_transform, array.shape)
+                if grid_key not in polygon_masks:
+                    polygon_masks[grid_key] = calculate_polygon_pixel_mask(
+                        polygons_reproj[crs], array.shape, window_transform
+                    )
+
+                # Keep pixels inside the polygon and ignore value classified as no data.
+                mask = polygon_masks[grid_key] & (array != src.nodata)
+
+            # Remove cloudy pixels. The QA band shares the grid of the thermal band.
+            if qa_urls[0] is not None:
+                with rasterio.open(qa_urls[0]) as qa_src:
+                    qa_array = qa_src.read(1, window=window)
+                if qa_array.shape == mask.shape:
+                    mask &= calculate_landsat_clear_mask(qa_array)
+
+        cog_read_seconds.append(time.perf_counter() - read_start)
 
-                # Apply coefficients to covert the pixel value to real values and coversion from K to C.
-                array = (array[mask] * scale) + offset + kelvin_to_celsius
+        valid_pixels = int(np.count_nonzero(mask))
+        if valid_pixels == 0:
+            logger.debug("Skipping %s - no clear pixel inside the polygon", date)
+            continue
+        polygon_pixels = int(np.count_nonzero(polygon_masks[grid_key]))
+
+        tmin, tmax, tmean = reduce_landsat_temperatures(array[mask], percentiles)
 
         # Append the results in a dict
         date_with_daily_temperature["date"].append(date)
-        date_with_daily_temperature["tmin"].append(array.min())
-        date_with_daily_temperature["tmax"].append(array.max())
+        date_with_daily_temperature["tmin"].append(tmin)
+        date_with_daily_temperature["tmax"].append(tmax)
+        date_with_daily_temperature["tmean"].append(tmean)
+        date_with_daily_temperature["valid_pixels"].append(valid_pixels)
+        date_with_daily_temperature["valid_fraction"].append(valid_pixels / polygon_pixels)
+
+    if not date_with_daily_temperature["date"]:
+        logger.info("No clear Landsat pixel inside the polygon in %d scenes", len(stac_items))
+        return None
 
     # Gather the dict to a pd.DataFrame (OUTSIDE the loop - FIXED!)
     df = pd.DataFrame(date_with_daily_temperature)
@@ -1206,172 +1685,1486 @@ def calculate_surface_temperature_landsat(stac_items: pystac.ItemCollection,
     # Forward filling of missing values. That means day without values are filled with the previous closest date
     df['tmin'] = df['tmin'].ffill()
     df['tmax'] = df['tmax'].ffill()
+    df['tmean'] = df['tmean'].ffill()
+    df.attrs["cog_read_seconds"] = cog_read_seconds
 
-    print(f"DEBUG: Building DataFrame with {len(date_with_daily_temperature['date'])} unique dates")
-    print(f"DEBUG: Date range before reindex: {df.index.min()} to {df.index.max()}")
-    print(f"DEBUG: DataFrame shape after forward fill: {df.shape}")
-    print(f"DEBUG: Any NaN values remaining? tmin: {df['tmin'].isna().sum()}, tmax: {df['tmax'].isna().sum()}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Landsat DataFrame built from %d dates, %s to %s, shape %s, NaN remaining tmin: %d, tmax: %d",
+                     len(date_with_daily_temperature["date"]), df.index.min(), df.index.max(), df.shape,
+                     df["tmin"].isna().sum(), df["tmax"].isna().sum())
 
     return df
 
 
-# ============================================================================
-# MAIN RECOMMENDATION ENDPOINT (WITH PARALLEL FETCHING)
-# ============================================================================
+def run_landsat_task(request_id: str, cancel_slot: Optional[int], stac_items: pystac.ItemCollection,
+                     band: str, polygon_coord: PolygonInput) -> Optional[pd.DataFrame]:
+    """
+    Run calculate_surface_temperature_landsat in a worker process.
 
-@app.post("/recommendations/polygon")
-async def get_polygon_crop_recommendations(
-        polygon: PolygonInput,
-        year: int = 2023,
-        min_score: float = 50.0,
-        limit: int = 10,
-        include_monthly_temps: bool = True
-):
+    The request id of the caller is set for the log lines, and the reading stops when the
+    caller raises the cancellation flag of cancel_slot.
     """
-    Get crop recommendations for a specific polygon area based on NASA climate data.
+    request_id_var.set(request_id)
 
-    Parameters:
-    - polygon: Polygon coordinates defining the field area
-    - year: Year to analyze (default: 2023)
-    - min_score: Minimum suitability score (0-100, default: 50)
-    - limit: Maximum number of recommendations to return
-    - include_monthly_temps: Include 3-year average monthly temperatures (default: True)
+    def should_stop() -> bool:
+        return _landsat_cancel_flags[cancel_slot] != 0
+
+    return calculate_surface_temperature_landsat(
+        stac_items, band, polygon_coord, should_stop=should_stop if cancel_slot is not None else None
+    )
+
+
+async def calculate_surface_temperature_landsat_async(stac_items: pystac.ItemCollection,
+                                                      band: str,
+                                                      polygon_coord: PolygonInput,
+                                                      timeout: float = LANDSAT_PROCESSING_TIMEOUT_S) -> Optional[pd.DataFrame]:
     """
+    Async wrapper for calculate_surface_temperature_landsat running it in the Landsat process pool.
 
-    # ========== GEOMETRY CALCULATIONS ==========
-    center_lat, center_lon = calculate_polygon_centroid(polygon.coordinates)
-    area_m2 = calculate_polygon_area_m2(polygon.coordinates)
-    area_hectares = area_m2 / 10000
+    If the caller is cancelled (e.g. the client disconnected) or the timeout expires, the
+    worker stops before reading its next date instead of processing the whole year.
 
-    # ========== AREA VALIDATION ==========
-    MAX_AREA_M2 = 1000000  # 1 km²
-    if area_m2 > MAX_AREA_M2:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Selection area is too large. Maximum allowed: {MAX_AREA_M2} m² ({MAX_AREA_M2/1_000_000:.2f} km²). "
-                   f"Your selection: {area_m2:.2f} m² ({area_m2/1_000_000:.4f} km²). "
-                   f"Please select a smaller area."
-        )
+    Args:
+        stac_items: Items fetched from the STAC api query
+        band: Name of the band to be used to extract the relevant data from the catalog
+        polygon_coord: Geometry of the aoi
+        timeout: Maximum time in seconds to wait for the result
 
-    # ========== SUNSHINE FACTOR CALCULATION ==========
-    if polygon.sunshine_duration is not None and len(polygon.sunshine_duration) > 0:
-        sunshine_factor = statistics.mean(polygon.sunshine_duration)
-    else:
-        sunshine_factor = 0.7  # Default value
-
-    # ========== PARALLEL DATA FETCHING ==========
-    print(f"\n=== STARTING PARALLEL DATA FETCH ===")
-    print(f"Fetching data for year: {year}")
-    print(f"Location: ({center_lat}, {center_lon})")
-
-    # Create time range for Landsat query using the correct year
-    landsat_time_range = f"{year}-01-01/{year}-12-31"
-    print(f"Landsat time range: {landsat_time_range}")
-
-    # Fetch both data sources in parallel
-    nasa_task = fetch_all_climate_data(center_lat, center_lon, year, include_multi_year=include_monthly_temps)
-    landsat_task = query_planetary_stac_async(
-        MICROSOFT_PLANETARY_API_URL,
-        "landsat-c2-l2",
-        polygon,
-        landsat_time_range,
-        10  # max cloud coverage
-    )
+    Returns:
+        Dataframe returned by calculate_surface_temperature_landsat
 
-    # Wait for both to complete
-    climate_data, stac_items_landsat = await asyncio.gather(nasa_task, landsat_task)
+    Raises:
+        TimeoutError: If processing takes longer than the timeout
+    """
+    global _landsat_executor
+    loop = asyncio.get_running_loop()
+    executor = get_landsat_executor()
+    cancel_flags, free_cancel_slots = _landsat_cancel_flags, _landsat_free_cancel_slots
 
-    print(f"DEBUG: NASA data fetched successfully")
+    # Without a free slot (more tasks than slots) the task simply cannot be stopped early.
+    cancel_slot = free_cancel_slots.pop() if free_cancel_slots else None
+    if cancel_slot is not None:
+        cancel_flags[cancel_slot] = 0
 
-    # Check if Landsat data was successfully fetched
-    if stac_items_landsat is None:
-        print(f"WARNING: Landsat data unavailable, continuing with NASA POWER data only")
-    else:
-        print(f"DEBUG: Landsat items found: {len(stac_items_landsat)}")
+    try:
+        future = executor.submit(
+            run_landsat_task, request_id_var.get(), cancel_slot, stac_items, band, polygon_coord
+        )
+    except BaseException:
+        if cancel_slot is not None:
+            free_cancel_slots.append(cancel_slot)
+        raise
+    if cancel_slot is not None:
+        # The slot is reused once the worker is done with it, not when the caller gives up.
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(free_cancel_slots.append, cancel_slot))
 
-    # ========== PROCESS LANDSAT DATA ==========
-    st_landsat_daily_min_max_temp = None
     try:
-        if stac_items_landsat is not None and len(stac_items_landsat) > 0:
-            st_landsat_daily_min_max_temp = calculate_surface_temperature_landsat(
-                stac_items_landsat,
-                "lwir",
-                polygon
-            )
-            print(f"DEBUG: Landsat DataFrame shape: {st_landsat_daily_min_max_temp.shape}")
-            print(f"DEBUG: Landsat date range: {st_landsat_daily_min_max_temp.index.min()} to {st_landsat_daily_min_max_temp.index.max()}")
-            print(f"DEBUG: Landsat sample data:\n{st_landsat_daily_min_max_temp.head()}")
+        return await asyncio.wait_for(asyncio.wrap_future(future), timeout=timeout)
+    except (asyncio.CancelledError, TimeoutError):
+        if cancel_slot is not None:
+            cancel_flags[cancel_slot] = 1
+        raise
+    except BrokenProcessPool:
+        # A worker died (e.g. out of memory). Start a fresh pool for the next requests.
+        _landsat_executor = None
+        raise
 
-            # ========== MERGE DATA SOURCES ==========
-            climate_data["primary_year_data"] = merge_climate_data(
-                climate_data["primary_year_data"],
-                st_landsat_daily_min_max_temp,
-                year
-            )
 
-            # Re-analyze climate data after merge
-            climate_data["climate_analysis"] = analyze_climate_data(climate_data["primary_year_data"])
-        else:
-            print(f"WARNING: No Landsat data found for the specified area and time range")
-    except Exception as e:
-        print(f"WARNING: Landsat processing failed, falling back to NASA POWER only. Error: {e}")
-        st_landsat_daily_min_max_temp = None
+# ============================================================================
+# LATENCY BUDGET
+# ============================================================================
 
-    # ========== CROP PROCESSING ==========
-    crop_results = process_crop_recommendations(
-        climate_data, sunshine_factor, area_m2, min_score
-    )
+# Point of the request budget (share of it, from the start of the request) by which each
+# stage must be done. Scoring is not listed: it is fast and cannot be skipped. The summary
+# leaves the last 5% of the budget for serialization.
+LATENCY_BUDGET_STAGE_ENDS = {
+    "fetch": 0.6,
+    "summary": 0.95
+}
 
-    # ========== RESPONSE CONSTRUCTION ==========
-    climate_analysis = climate_data["climate_analysis"]
+# Below this many seconds left, the LLM summary is not even attempted.
+SUMMARY_MIN_TIME_S = 1.0
 
-    # Calculate a representative sunshine value for display
-    display_sunshine = calculate_growing_season_sunshine(
-        climate_data["primary_year_data"],
-        crop_base_temp=10.0,
-        sunshine_factor=sunshine_factor
-    )
 
-    response = {
-        "location": {
-            "center_latitude": round(center_lat, 6),
-            "center_longitude": round(center_lon, 6),
-            "area_m2": round(area_m2, 2),
-            "area_hectares": round(area_hectares, 4)
-        },
-        "year": year,
-        "sunshine_factor": round(sunshine_factor, 2),
-        "data_sources": {
-            "nasa_power": True,
-            "landsat_surface_temp": st_landsat_daily_min_max_temp is not None,
-            "landsat_dates_available": len(st_landsat_daily_min_max_temp) if st_landsat_daily_min_max_temp is not None else 0
-        },
-        "climate_summary": {
-            "avg_temp_max": round(climate_analysis["temperature_max"]["mean"], 1),
-            "avg_temp_min": round(climate_analysis["temperature_min"]["mean"], 1),
-            "annual_precipitation_mm": round(climate_analysis["precipitation"]["total_annual"], 1),
-            "representative_sun_hours_daily": display_sunshine["adjusted_sun_hours"],
-            "note": "Temperatures merged from NASA POWER (coarse) and Landsat (fine-grained) where available"
-        },
-        "recommendations": crop_results["recommendations"][:limit],
-        "total_suitable_crops": crop_results["total_suitable"],
-        "total_filtered_by_sunlight": crop_results["total_filtered"],
-    }
+class LatencyBudget:
+    """
+    Per-request latency budget split into staged deadlines.
 
-    # Add monthly temperature data if available
-    if climate_data["monthly_averages"]:
-        response["monthly_temperature_averages"] = climate_data["monthly_averages"]
+    Without a budget every stage keeps its own default timeout.
 
-    try:
-        llm_summary = generate_crop_summary(response)
-        response["llm_summary"] = llm_summary
-    except Exception as e:
-        response["llm_summary"] = "The LLM in charge of assembling your summary was asleep. We did not want to wake it."
-        response["llm_err"] = str(e)
+    Attributes:
+        budget_ms: Total budget of the request in milliseconds, or None for no budget
+        start: Monotonic time at which the request started
+        skipped_stages: Stages cancelled or skipped to stay within the budget
+    """
 
-    return response
+    def __init__(self, budget_ms: Optional[float] = None):
+        self.budget_ms = budget_ms
+        self.start = time.monotonic()
+        self.skipped_stages = []
+
+    def stage_timeout(self, stage: str, default: Optional[float] = None) -> Optional[float]:
+        """
+        Time left for a stage in seconds.
+
+        Args:
+            stage: Stage name, a key of LATENCY_BUDGET_STAGE_ENDS
+            default: Timeout of the stage when there is no budget
+
+        Returns:
+            The default timeout capped by the time left until the end of the stage
+        """
+        if self.budget_ms is None:
+            return default
+        stage_end = self.start + self.budget_ms / 1000 * LATENCY_BUDGET_STAGE_ENDS[stage]
+        time_left = max(0.0, stage_end - time.monotonic())
+        return time_left if default is None else min(default, time_left)
+
+    def skip(self, stage: str):
+        """Record a stage skipped to stay within the budget."""
+        self.skipped_stages.append(stage)
+
+    def report(self) -> Dict:
+        """Summary of the budget usage for the response."""
+        return {
+            "budget_ms": self.budget_ms,
+            "elapsed_ms": round((time.monotonic() - self.start) * 1000, 1),
+            "skipped_stages": self.skipped_stages
+        }
+
+
+# ============================================================================
+# CLIMATE SOURCES AND FUSION
+# ============================================================================
+
+# Time budget of each source. A late optional source is dropped from the fusion.
+NASA_POWER_SOURCE_DEADLINE_S = 60.0
+LANDSAT_SOURCE_DEADLINE_S = 60.0
+
+# Grid of the NASA POWER meteorology (MERRA-2). Points in the same cell get the same data.
+NASA_POWER_GRID_LAT_DEG = 0.5
+NASA_POWER_GRID_LON_DEG = 0.625
+
+# Number of source results kept in memory (LRU).
+CLIMATE_SOURCE_CACHE_SIZE = 256
+_climate_source_cache: OrderedDict = OrderedDict()
+
+# Reuse between nearby polygons (see spatial_cache.py). Landsat searches cover the polygon
+# plus STAC_SEARCH_MARGIN_DEG, so the polygons around it reuse the found scenes. Signed
+# scene URLs expire, so searches are only reused for STAC_SEARCH_MAX_AGE_S.
+STAC_SEARCH_MARGIN_DEG = 0.02
+STAC_SEARCH_MAX_AGE_S = 1800
+# Landsat temperatures of a polygon are reused for a polygon whose outline is within one
+# Landsat pixel of it (Hausdorff distance): both read nearly the same pixels.
+LANDSAT_REUSE_MAX_DISTANCE_M = 30.0
+SPATIAL_CACHE_SIZE = 1024
+_stac_search_cache = SpatialCache(SPATIAL_CACHE_SIZE, max_age_s=STAC_SEARCH_MAX_AGE_S)
+_landsat_temperature_cache = SpatialCache(SPATIAL_CACHE_SIZE)
+
+
+def nasa_power_grid_cell(latitude: float, longitude: float) -> Tuple[int, int]:
+    """
+    Get the NASA POWER grid cell containing a point.
+
+    Args:
+        latitude: Latitude in decimal degrees
+        longitude: Longitude in decimal degrees
+
+    Returns:
+        Tuple of (row, col) indices of the cell
+    """
+    return (round((latitude + 90) / NASA_POWER_GRID_LAT_DEG),
+            round((longitude + 180) / NASA_POWER_GRID_LON_DEG))
+
+
+class ClimateSource(ABC):
+    """
+    Base class for a climate data provider of the recommendation pipeline.
+
+    Sources are fetched concurrently by run_climate_sources and fused in increasing
+    priority order: the first one builds the climate data, the next ones refine it.
+
+    Attributes:
+        name: Identifier of the source, used in the response
+        priority: Fusion order, higher priority data overrides lower priority data
+        quality_weight: Weight (0-1) of this source when fused over lower priority data
+        deadline_s: Time budget for fetch
+        required: Whether the request fails without this source
+    """
+    name = "source"
+    priority = 0
+    quality_weight = 1.0
+    deadline_s = 60.0
+    required = False
+
+    def cache_key(self, context: Dict) -> Optional[Tuple]:
+        """Key identifying the fetched data in the source cache, None to disable caching."""
+        return None
+
+    def find_nearby(self, context: Dict):
+        """Data fetched for a similar context that can be reused for this one, None if there is none."""
+        return None
+
+    def remember(self, context: Dict, result):
+        """Record fetched data so that find_nearby can reuse it for similar contexts."""
+
+    @abstractmethod
+    async def fetch(self, context: Dict):
+        """Fetch the source data for the request context. None means no data available."""
+
+    @abstractmethod
+    def fuse(self, climate_data: Optional[Dict], result, context: Dict) -> Dict:
+        """Combine the fetched data with the climate data fused so far and return new climate data."""
+
+
+class NasaPowerSource(ClimateSource):
+    """Daily NASA POWER point data. Complete coverage, coarse resolution."""
+    name = "nasa_power"
+    priority = 0
+    quality_weight = 1.0
+    deadline_s = NASA_POWER_SOURCE_DEADLINE_S
+    required = True
+
+    def cache_key(self, context: Dict) -> Optional[Tuple]:
+        return (self.name, nasa_power_grid_cell(context["latitude"], context["longitude"]),
+                context["year"], context["include_multi_year"])
+
+    async def fetch(self, context: Dict) -> Dict:
+        with timed_stage("nasa_power_fetch"):
+            return await fetch_all_climate_data(context["latitude"], context["longitude"], context["year"],
+                                                include_multi_year=context["include_multi_year"])
+
+    def fuse(self, climate_data: Optional[Dict], result: Dict, context: Dict) -> Dict:
+        return result
+
+
+class LandsatSource(ClimateSource):
+    """Landsat surface temperature over the polygon. Fine resolution, sparse dates."""
+    name = "landsat"
+    priority = 10
+    quality_weight = 1.0
+    deadline_s = LANDSAT_SOURCE_DEADLINE_S
+    required = False
+
+    def cache_key(self, context: Dict) -> Optional[Tuple]:
+        return (self.name, tuple(context["polygon"].coordinates), context["year"])
+
+    def find_nearby(self, context: Dict) -> Optional[pd.DataFrame]:
+        aoi = polygon_geometry(context["polygon"])
+        to_meters = meters_per_degree(aoi.centroid.y)
+        found = _landsat_temperature_cache.find(
+            (self.name, context["year"]),
+            aoi,
+            lambda footprint: outline_distance_m(footprint, aoi, to_meters) <= LANDSAT_REUSE_MAX_DISTANCE_M,
+            margin_deg=LANDSAT_REUSE_MAX_DISTANCE_M / min(to_meters)
+        )
+        return found[1] if found is not None else None
+
+    def remember(self, context: Dict, result: pd.DataFrame):
+        _landsat_temperature_cache.put((self.name, context["year"]), polygon_geometry(context["polygon"]), result)
+
+    async def fetch(self, context: Dict) -> Optional[pd.DataFrame]:
+        stac_items = await search_landsat_items(context["polygon"], context["year"])
+        if stac_items is None:
+            raise RuntimeError("The Landsat STAC search failed")
+        if len(stac_items) == 0:
+            return None
+        logger.debug("Landsat items found: %d", len(stac_items))
+        return await self.read_temperatures(stac_items, context)
+
+    async def read_temperatures(self, stac_items: pystac.ItemCollection, context: Dict) -> Optional[pd.DataFrame]:
+        """Read the daily surface temperatures over the polygon from the found scenes, None if no pixel is clear."""
+        with timed_stage("landsat_read"):
+            try:
+                landsat_df = await calculate_surface_temperature_landsat_async(stac_items, "lwir", context["polygon"])
+            except TimeoutError:
+                raise
+            except Exception:
+                UPSTREAM_ERRORS.inc(("cog_read",))
+                raise
+
+        if landsat_df is None:
+            return None
+        for read_seconds in landsat_df.attrs.get("cog_read_seconds", []):
+            UPSTREAM_DURATION_SECONDS.observe(("cog_read",), read_seconds)
+        return landsat_df
+
+    def fuse(self, climate_data: Optional[Dict], result: pd.DataFrame, context: Dict) -> Dict:
+        with timed_stage("merge"):
+            primary_year_data = merge_climate_data(
+                climate_data["primary_year_data"],
+                result,
+                context["year"],
+                self.quality_weight
+            )
+
+            # Re-analyze climate data after merge
+            return {
+                **climate_data,
+                "primary_year_data": primary_year_data,
+                "climate_analysis": analyze_climate_data(primary_year_data)
+            }
+
+
+async def fetch_climate_source(source: ClimateSource, context: Dict, timeout: Optional[float] = None):
+    """
+    Fetch a source within its deadline, using the source cache when possible.
+
+    Args:
+        source: Source to fetch
+        context: Request context (polygon, latitude, longitude, year, include_multi_year)
+        timeout: Deadline in seconds, defaults to the source deadline
+
+    Returns:
+        The fetched data, or None if the source has no data for the context
+
+    Raises:
+        TimeoutError: If the source does not answer within its deadline
+    """
+    key = source.cache_key(context)
+    if key is not None:
+        if key in _climate_source_cache:
+            CACHE_REQUESTS.inc((source.name, "hit"))
+            _climate_source_cache.move_to_end(key)
+            return _climate_source_cache[key]
+        result = source.find_nearby(context)
+        if result is not None:
+            CACHE_REQUESTS.inc((source.name, "nearby"))
+            return result
+        CACHE_REQUESTS.inc((source.name, "miss"))
+
+    if timeout is None:
+        timeout = source.deadline_s
+    result = await asyncio.wait_for(source.fetch(context), timeout=timeout)
+
+    if key is not None and result is not None:
+        _climate_source_cache[key] = result
+        if len(_climate_source_cache) > CLIMATE_SOURCE_CACHE_SIZE:
+            _climate_source_cache.popitem(last=False)
+        source.remember(context, result)
+    return result
+
+
+def climate_source_cached(source: ClimateSource, context: Dict) -> bool:
+    """Whether fetch_climate_source would return the source data for the context from the cache."""
+    key = source.cache_key(context)
+    return key is not None and key in _climate_source_cache
+
+
+def fetch_status(task: asyncio.Task) -> str:
+    """Status of a finished source fetch task: "ok", "unavailable", "timeout" or "failed"."""
+    error = task.exception()
+    if isinstance(error, TimeoutError):
+        return "timeout"
+    if error is not None:
+        return "failed"
+    if task.result() is None:
+        return "unavailable"
+    return "ok"
+
+
+async def run_climate_sources(sources: List[ClimateSource], context: Dict,
+                              budget: Optional[LatencyBudget] = None,
+                              on_fetched: Optional[Callable] = None) -> Tuple[Dict, Dict, Dict]:
+    """
+    Fetch all sources concurrently and fuse the ones that finished in time.
+
+    Args:
+        sources: Sources to use, at least one of them required
+        context: Request context (polygon, latitude, longitude, year, include_multi_year)
+        budget: Request latency budget. Source deadlines are capped by its fetch stage
+                and sources that time out are recorded as skipped.
+        on_fetched: Called as on_fetched(source, status, result) as soon as each source fetch
+                    finishes, before the fusion. result is None unless status is "ok".
+
+    Returns:
+        Tuple of (fused climate data, fetched data by source name, status by source name).
+        Status is one of "ok", "unavailable", "timeout" or "failed".
+
+    Raises:
+        HTTPException: If a required source fails (propagated from the source) or times out
+    """
+    if budget is None:
+        budget = LatencyBudget()
+
+    tasks = {
+        source.name: asyncio.create_task(
+            fetch_climate_source(source, context, budget.stage_timeout("fetch", source.deadline_s))
+        )
+        for source in sources
+    }
+    def notify_fetched(source: ClimateSource, task: asyncio.Task):
+        if not task.cancelled():
+            fetched_status = fetch_status(task)
+            on_fetched(source, fetched_status, task.result() if fetched_status == "ok" else None)
+
+    if on_fetched is not None:
+        for source in sources:
+            tasks[source.name].add_done_callback(lambda task, source=source: notify_fetched(source, task))
+    try:
+        # A required source failing makes the others useless, so wait for those first.
+        for source in sources:
+            if source.required:
+                try:
+                    await tasks[source.name]
+                except TimeoutError:
+                    raise HTTPException(
+                        status_code=504,
+                        detail=f"{source.name} did not answer within the time available. Please try again later."
+                    )
+        await asyncio.wait(tasks.values())
+    except BaseException:
+        for task in tasks.values():
+            task.cancel()
+        raise
+
+    climate_data = None
+    results = {}
+    status = {}
+    for source in sorted(sources, key=lambda s: s.priority):
+        task = tasks[source.name]
+        status[source.name] = fetch_status(task)
+        if status[source.name] == "timeout":
+            logger.warning("%s exceeded its deadline, skipping it", source.name)
+            budget.skip(source.name)
+            continue
+        if status[source.name] == "failed":
+            logger.warning("%s failed, skipping it. Error: %s", source.name, task.exception())
+            continue
+        if status[source.name] == "unavailable":
+            logger.info("No %s data found for the specified area and time range", source.name)
+            continue
+
+        try:
+            climate_data = source.fuse(climate_data, task.result(), context)
+        except Exception as e:
+            if source.required:
+                raise
+            logger.warning("%s fusion failed, skipping it. Error: %s", source.name, e)
+            status[source.name] = "failed"
+            continue
+        results[source.name] = task.result()
+        status[source.name] = "ok"
+
+    return climate_data, results, status
+
+
+# ============================================================================
+# CLIENT DISCONNECTION
+# ============================================================================
+
+# How often a request waiting for its analysis checks that the client is still connected
+DISCONNECT_POLL_INTERVAL_S = 0.5
+
+# Status recorded for requests abandoned by their client (nginx convention). The client never sees it.
+CLIENT_CLOSED_REQUEST = 499
+
+
+async def run_until_disconnected(request: Request, coroutine):
+    """
+    Run a request handler coroutine as a task, cancelling it if the client disconnects first.
+
+    Cancelling the task cancels what it is waiting for: upstream fetches, Landsat reads
+    (the worker stops before its next date) and the summary call.
+
+    Args:
+        request: Request being answered
+        coroutine: Coroutine producing the response
+
+    Returns:
+        The result of the coroutine, or an empty 499 response if the client disconnected
+    """
+    task = asyncio.create_task(coroutine)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL_S)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                logger.info("Client disconnected, cancelling the analysis")
+                return Response(status_code=CLIENT_CLOSED_REQUEST)
+    finally:
+        task.cancel()
+
+
+# ============================================================================
+# MAIN RECOMMENDATION ENDPOINT (WITH PARALLEL FETCHING)
+# ============================================================================
+
+# Largest polygon accepted for recommendations
+MAX_AREA_M2 = 1000000  # 1 km²
+
+
+def validate_polygon_area(area_m2: float):
+    """
+    Check that a polygon is small enough to be analyzed.
+
+    Raises:
+        HTTPException: If the area exceeds MAX_AREA_M2
+    """
+    if area_m2 > MAX_AREA_M2:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Selection area is too large. Maximum allowed: {MAX_AREA_M2} m² ({MAX_AREA_M2/1_000_000:.2f} km²). "
+                   f"Your selection: {area_m2:.2f} m² ({area_m2/1_000_000:.4f} km²). "
+                   f"Please select a smaller area."
+        )
+
+
+# Sunshine factor ranges the plot is split into to find the area where each crop is suitable
+SHADE_LEVELS = 10
+
+
+def calculate_shade_samples(polygon: PolygonInput) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Area-weighted samples of the sunshine factor over a polygon (see shade.py).
+
+    The per-point factors are interpolated over the polygon. Without one factor per point,
+    or for a polygon that cannot be triangulated, the plot is uniform at the mean factor
+    (0.7 if not provided).
+
+    Returns:
+        Tuple of (factors, weights) arrays, weights sum to 1
+    """
+    factors = polygon.sunshine_duration
+    if factors is not None and len(factors) == len(polygon.coordinates):
+        try:
+            return shade_samples(polygon.coordinates, factors)
+        except ValueError as e:
+            logger.debug("Using the mean sunshine factor: %s", e)
+    factor = statistics.mean(factors) if factors else 0.7  # Default value
+    return np.array([factor]), np.array([1.0])
+
+
+def calculate_sunshine_factor(polygon: PolygonInput, samples: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> float:
+    """Sunshine factor of a polygon: area-weighted mean of its shade field, from calculate_shade_samples."""
+    factors, weights = samples if samples is not None else calculate_shade_samples(polygon)
+    return float(np.average(factors, weights=weights))
+
+
+def calculate_suitable_area_fractions(climate_data: Dict, crop_climate: Dict, samples: Tuple[np.ndarray, np.ndarray],
+                                      min_score: float, plot_results: Optional[Dict] = None) -> Dict[str, float]:
+    """
+    Share of the plot area where each crop is suitable, given its shade field.
+
+    The samples are grouped in SHADE_LEVELS sunshine factor ranges, and the crops are scored
+    once per range present at its area-weighted mean factor. A plot within one range (e.g.
+    uniform) is not scored again: that range's factor is the plot's, so plot_results is used.
+
+    Args:
+        climate_data: Fused climate data
+        crop_climate: Per-crop metrics from precompute_crop_climate for climate_data
+        samples: Shade field samples from calculate_shade_samples
+        min_score: Score from which a crop is suitable
+        plot_results: process_crop_recommendations result of the plot, at its sunshine factor
+                      and min_score, if already computed
+
+    Returns:
+        Dictionary mapping crop ids to the suitable area fraction (0-1)
+    """
+    factors, weights = samples
+    levels = np.clip((factors * SHADE_LEVELS).astype(int), 0, SHADE_LEVELS - 1)
+    level_weights = np.bincount(levels, weights=weights, minlength=SHADE_LEVELS)
+    level_factors = np.bincount(levels, weights=weights * factors, minlength=SHADE_LEVELS)
+
+    present = np.flatnonzero(level_weights > 0)
+    fractions = dict.fromkeys(CROP_DATABASE, 0.0)
+    for level in present:
+        if len(present) == 1 and plot_results is not None:
+            crop_results = plot_results
+        else:
+            crop_results = process_crop_recommendations(
+                climate_data, float(level_factors[level] / level_weights[level]), None, min_score, crop_climate
+            )
+        for recommendation in crop_results["recommendations"]:
+            fractions[recommendation["crop_id"]] += float(level_weights[level])
+    return {crop_id: round(fraction, 3) for crop_id, fraction in fractions.items()}
+
+
+def add_shade_analysis(response: Dict, samples: Tuple[np.ndarray, np.ndarray], climate_data: Dict,
+                       crop_climate: Dict, min_score: float, crop_results: Optional[Dict] = None):
+    """
+    Add the shade distribution of the plot and the suitable area fraction of each recommended crop.
+
+    crop_results is the process_crop_recommendations result the response was built from.
+    """
+    response["shade_distribution"] = shade_distribution(*samples)
+    fractions = calculate_suitable_area_fractions(climate_data, crop_climate, samples, min_score, crop_results)
+    for recommendation in response["recommendations"]:
+        recommendation["suitable_area_fraction"] = fractions[recommendation["crop_id"]]
+
+
+def build_climate_summary(climate_data: Dict, sunshine_factor: float) -> Dict:
+    """Climate summary of the response: yearly temperatures, precipitation and representative sunshine."""
+    climate_analysis = climate_data["climate_analysis"]
+
+    # Calculate a representative sunshine value for display
+    display_sunshine = calculate_growing_season_sunshine(
+        climate_data["primary_year_data"],
+        crop_base_temp=10.0,
+        sunshine_factor=sunshine_factor
+    )
+
+    return {
+        "avg_temp_max": round(climate_analysis["temperature_max"]["mean"], 1),
+        "avg_temp_min": round(climate_analysis["temperature_min"]["mean"], 1),
+        "annual_precipitation_mm": round(climate_analysis["precipitation"]["total_annual"], 1),
+        "representative_sun_hours_daily": display_sunshine["adjusted_sun_hours"],
+        "note": "Temperatures merged from NASA POWER (coarse) and Landsat (fine-grained) where available"
+    }
+
+
+def build_location(center_lat: float, center_lon: float, area_m2: float) -> Dict:
+    """Location of the response: polygon centroid and area."""
+    return {
+        "center_latitude": round(center_lat, 6),
+        "center_longitude": round(center_lon, 6),
+        "area_m2": round(area_m2, 2),
+        "area_hectares": round(area_m2 / 10000, 4)
+    }
+
+
+def build_recommendation_response(center_lat: float, center_lon: float, area_m2: float, year: int,
+                                  sunshine_factor: float, climate_data: Dict, source_results: Dict,
+                                  source_status: Dict, crop_results: Dict, limit: int) -> Dict:
+    """
+    Assemble the recommendations of one polygon into the response layout.
+
+    Args:
+        center_lat: Latitude of the polygon centroid
+        center_lon: Longitude of the polygon centroid
+        area_m2: Polygon area in square meters
+        year: Analyzed year
+        sunshine_factor: Sunshine factor used for scoring
+        climate_data: Fused climate data from run_climate_sources
+        source_results: Fetched data by source name from run_climate_sources
+        source_status: Status by source name from run_climate_sources
+        crop_results: Result of process_crop_recommendations
+        limit: Maximum number of recommendations to include
+
+    Returns:
+        Dictionary with location, data sources, climate summary and recommendations
+    """
+    st_landsat_daily_min_max_temp = source_results.get("landsat")
+
+    return {
+        "location": build_location(center_lat, center_lon, area_m2),
+        "year": year,
+        "sunshine_factor": round(sunshine_factor, 2),
+        "data_sources": {
+            "nasa_power": True,
+            "landsat_surface_temp": st_landsat_daily_min_max_temp is not None,
+            "landsat_dates_available": len(st_landsat_daily_min_max_temp) if st_landsat_daily_min_max_temp is not None else 0,
+            "status": source_status
+        },
+        "climate_summary": build_climate_summary(climate_data, sunshine_factor),
+        "recommendations": crop_results["recommendations"][:limit],
+        "total_suitable_crops": crop_results["total_suitable"],
+        "total_filtered_by_sunlight": crop_results["total_filtered"],
+    }
+
+
+async def add_llm_summary(response: Dict, budget: LatencyBudget):
+    """
+    Add the LLM summary of the recommendations to the response (llm_summary, and llm_err on failure).
+
+    Skipped when the latency budget leaves less than SUMMARY_MIN_TIME_S for it.
+    """
+    summary_timeout = budget.stage_timeout("summary")
+    if summary_timeout is not None and summary_timeout < SUMMARY_MIN_TIME_S:
+        budget.skip("summary")
+        response["llm_summary"] = "The summary was skipped to answer within the requested time."
+        return
+
+    try:
+        with timed_stage("llm_summary"), timed_upstream("mistral"):
+            llm_summary = await asyncio.wait_for(generate_crop_summary_async(dict(response)), timeout=summary_timeout)
+        response["llm_summary"] = llm_summary
+    except TimeoutError:
+        budget.skip("summary")
+        response["llm_summary"] = "The summary was skipped to answer within the requested time."
+    except Exception as e:
+        response["llm_summary"] = "The LLM in charge of assembling your summary was asleep. We did not want to wake it."
+        response["llm_err"] = str(e)
+
+
+@app.post("/recommendations/polygon")
+async def get_polygon_crop_recommendations(
+        request: Request,
+        polygon: PolygonInput,
+        year: int = 2023,
+        min_score: float = 50.0,
+        limit: int = 10,
+        include_monthly_temps: bool = True,
+        budget_ms: Optional[float] = Query(None, gt=0)
+):
+    """
+    Get crop recommendations for a specific polygon area based on NASA climate data.
+
+    Parameters:
+    - polygon: Polygon coordinates defining the field area
+    - year: Year to analyze (default: 2023)
+    - min_score: Minimum suitability score (0-100, default: 50)
+    - limit: Maximum number of recommendations to return
+    - include_monthly_temps: Include 3-year average monthly temperatures (default: True)
+    - budget_ms: Latency budget of the request in milliseconds. Slow optional stages (Landsat,
+      LLM summary) are skipped to stay within it and reported under latency_budget.
+
+    The analysis is cancelled if the client disconnects before the answer (e.g. the polygon
+    was redrawn).
+    """
+    return await run_until_disconnected(
+        request, recommend_polygon(polygon, year, min_score, limit, include_monthly_temps, budget_ms)
+    )
+
+
+async def recommend_polygon(polygon: PolygonInput, year: int, min_score: float, limit: int,
+                            include_monthly_temps: bool, budget_ms: Optional[float],
+                            source: Optional[str] = None) -> JSONResponse:
+    """
+    Run the /recommendations/polygon analysis and build its response.
+
+    source, when given, is added to the response as "source" (see the precomputed endpoints).
+    """
+    budget = LatencyBudget(budget_ms)
+    timings = start_request_timing()
+
+    # ========== GEOMETRY CALCULATIONS ==========
+    with timed_stage("geometry"):
+        center_lat, center_lon = calculate_polygon_centroid(polygon.coordinates)
+        area_m2 = calculate_polygon_area_m2(polygon.coordinates)
+
+    # ========== AREA VALIDATION ==========
+    validate_polygon_area(area_m2)
+
+    # ========== SUNSHINE FACTOR CALCULATION ==========
+    shade = calculate_shade_samples(polygon)
+    sunshine_factor = calculate_sunshine_factor(polygon, shade)
+
+    # ========== PARALLEL DATA FETCHING AND FUSION ==========
+    logger.info("Fetching data for year %s at (%s, %s)", year, center_lat, center_lon)
+
+    context = {
+        "polygon": polygon,
+        "latitude": center_lat,
+        "longitude": center_lon,
+        "year": year,
+        "include_multi_year": include_monthly_temps
+    }
+    climate_data, source_results, source_status = await run_climate_sources(
+        [NasaPowerSource(), LandsatSource()], context, budget
+    )
+
+    # ========== CROP PROCESSING ==========
+    with timed_stage("scoring"):
+        crop_climate = precompute_crop_climate(climate_data["primary_year_data"])
+        crop_results = process_crop_recommendations(
+            climate_data, sunshine_factor, area_m2, min_score, crop_climate
+        )
+
+    # ========== RESPONSE CONSTRUCTION ==========
+    response = build_recommendation_response(
+        center_lat, center_lon, area_m2, year, sunshine_factor,
+        climate_data, source_results, source_status, crop_results, limit
+    )
+    add_shade_analysis(response, shade, climate_data, crop_climate, min_score, crop_results)
+    response["result_token"] = store_scoring_inputs(
+        polygon, year, climate_data, crop_climate, response["data_sources"], include_monthly_temps
+    )
+
+    # Add monthly temperature data if available
+    if climate_data["monthly_averages"]:
+        response["monthly_temperature_averages"] = climate_data["monthly_averages"]
+
+    # ========== LLM SUMMARY ==========
+    await add_llm_summary(response, budget)
+
+    if budget_ms is not None:
+        response["latency_budget"] = budget.report()
+    if source is not None:
+        response["source"] = source
+
+    with timed_stage("serialization"):
+        json_response = JSONResponse(content=jsonable_encoder(response))
+    json_response.headers["Server-Timing"] = server_timing_header(timings)
+
+    return json_response
+
+
+
+# ============================================================================
+# STREAMING RECOMMENDATION ENDPOINT (SERVER-SENT EVENTS)
+# ============================================================================
+
+def format_sse(event: str, data: Dict) -> str:
+    """Format a server-sent event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+
+@app.post("/recommendations/polygon/stream")
+async def stream_polygon_crop_recommendations(
+        request: Request,
+        polygon: PolygonInput,
+        year: int = 2023,
+        min_score: float = 50.0,
+        limit: int = 10,
+        include_monthly_temps: bool = True,
+        budget_ms: Optional[float] = Query(None, gt=0)
+):
+    """
+    Same analysis as /recommendations/polygon, streamed as server-sent events (text/event-stream)
+    as each stage finishes, so partial results can be shown before the analysis is complete.
+
+    Events, in order:
+    - geometry: location (centroid and area) and sunshine_factor
+    - climate: NASA POWER climate_summary, and monthly_temperature_averages if requested
+    - landsat: status of the Landsat source and landsat_dates_available
+    - recommendations: the /recommendations/polygon response without the LLM summary
+    - summary: llm_summary (and llm_err if the summary failed)
+    - done: latency_budget when budget_ms is given
+    An error event with status_code and detail ends the stream if the analysis fails.
+
+    The analysis stops as soon as the client disconnects. Parameters are the same as
+    /recommendations/polygon.
+    """
+    # ========== GEOMETRY AND VALIDATION (before streaming, errors are plain HTTP errors) ==========
+    with timed_stage("geometry"):
+        center_lat, center_lon = calculate_polygon_centroid(polygon.coordinates)
+        area_m2 = calculate_polygon_area_m2(polygon.coordinates)
+    validate_polygon_area(area_m2)
+    shade = calculate_shade_samples(polygon)
+    sunshine_factor = calculate_sunshine_factor(polygon, shade)
+
+    budget = LatencyBudget(budget_ms)
+    events = asyncio.Queue()
+
+    def emit(event: str, data: Dict):
+        events.put_nowait((event, data))
+
+    async def analyze():
+        try:
+            emit("geometry", {
+                "location": build_location(center_lat, center_lon, area_m2),
+                "sunshine_factor": round(sunshine_factor, 2)
+            })
+
+            # Landsat may answer first (e.g. cached): its event then waits for the climate event
+            climate_sent = False
+            held_landsat_event = None
+
+            def on_fetched(source: ClimateSource, status: str, result):
+                nonlocal climate_sent, held_landsat_event
+                if source.name == NasaPowerSource.name and result is not None:
+                    climate_event = {"climate_summary": build_climate_summary(result, sunshine_factor)}
+                    if result["monthly_averages"]:
+                        climate_event["monthly_temperature_averages"] = result["monthly_averages"]
+                    emit("climate", climate_event)
+                    climate_sent = True
+                    if held_landsat_event is not None:
+                        emit("landsat", held_landsat_event)
+                elif source.name == LandsatSource.name:
+                    landsat_event = {
+                        "status": status,
+                        "landsat_dates_available": len(result) if result is not None else 0
+                    }
+                    if climate_sent:
+                        emit("landsat", landsat_event)
+                    else:
+                        held_landsat_event = landsat_event
+
+            context = {
+                "polygon": polygon,
+                "latitude": center_lat,
+                "longitude": center_lon,
+                "year": year,
+                "include_multi_year": include_monthly_temps
+            }
+            climate_data, source_results, source_status = await run_climate_sources(
+                [NasaPowerSource(), LandsatSource()], context, budget, on_fetched
+            )
+
+            with timed_stage("scoring"):
+                crop_climate = precompute_crop_climate(climate_data["primary_year_data"])
+                crop_results = process_crop_recommendations(
+                    climate_data, sunshine_factor, area_m2, min_score, crop_climate
+                )
+            response = build_recommendation_response(
+                center_lat, center_lon, area_m2, year, sunshine_factor,
+                climate_data, source_results, source_status, crop_results, limit
+            )
+            add_shade_analysis(response, shade, climate_data, crop_climate, min_score, crop_results)
+            response["result_token"] = store_scoring_inputs(
+                polygon, year, climate_data, crop_climate, response["data_sources"], include_monthly_temps
+            )
+            if climate_data["monthly_averages"]:
+                response["monthly_temperature_averages"] = climate_data["monthly_averages"]
+            emit("recommendations", dict(response))
+
+            await add_llm_summary(response, budget)
+            emit("summary", {key: response[key] for key in ("llm_summary", "llm_err") if key in response})
+            emit("done", {"latency_budget": budget.report()} if budget_ms is not None else {})
+        except HTTPException as e:
+            emit("error", {"status_code": e.status_code, "detail": e.detail})
+        except Exception as e:
+            logger.exception("Streamed analysis failed")
+            emit("error", {"status_code": 500, "detail": str(e)})
+        finally:
+            events.put_nowait(None)
+
+    async def event_stream():
+        analysis = asyncio.create_task(analyze())
+        try:
+            while True:
+                try:
+                    item = await asyncio.wait_for(events.get(), timeout=DISCONNECT_POLL_INTERVAL_S)
+                except TimeoutError:
+                    if await request.is_disconnected():
+                        logger.info("Client disconnected, stopping the analysis")
+                        return
+                    continue
+                if item is None:
+                    return
+                yield format_sse(*item)
+        finally:
+            analysis.cancel()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+async def gather_bounded(arguments: Iterable[Tuple], function: Callable, slots: asyncio.Semaphore):
+    """
+    Run a coroutine function on each argument tuple, as many at a time as slots allows.
+
+    A task is only created once a slot is free, so a long input does not create all its
+    tasks up front. The slot is released when the task is done.
+
+    Args:
+        arguments: Argument tuples, one call of function per tuple
+        function: Coroutine function
+        slots: Limit on the calls running at the same time, can be shared between callers
+    """
+    running = set()
+    try:
+        for args in arguments:
+            await slots.acquire()
+            task = asyncio.create_task(function(*args))
+            task.add_done_callback(lambda _: slots.release())
+            task.add_done_callback(running.discard)
+            running.add(task)
+        await asyncio.gather(*running)
+    finally:
+        for task in running:
+            task.cancel()
+
+
+# ============================================================================
+# INCREMENTAL RE-SCORING
+# ============================================================================
+
+# Inputs of the recent analyses kept for re-scoring (LRU), and how long a result token stays valid
+SCORING_INPUTS_CACHE_SIZE = 512
+SCORING_INPUTS_TTL_S = 3600
+_scoring_inputs: OrderedDict = OrderedDict()
+
+
+def store_scoring_inputs(polygon: PolygonInput, year: int, climate_data: Dict, crop_climate: Dict,
+                         data_sources: Dict, include_monthly_temps: bool) -> str:
+    """
+    Keep the inputs of an analysis that do not depend on sunshine or thresholds.
+
+    Only what scoring reads is kept, not the data fetched by each source.
+
+    Args:
+        polygon: Analyzed polygon
+        year: Analyzed year
+        climate_data: Fused climate data from run_climate_sources
+        crop_climate: Per-crop metrics from precompute_crop_climate for climate_data
+        data_sources: data_sources of the analysis response (sources used and their status)
+        include_monthly_temps: Whether the analysis response had the monthly temperatures
+
+    Returns:
+        Result token to re-score the analysis with /recommendations/rescore/{result_token}
+    """
+    token = secrets.token_urlsafe(16)
+    _scoring_inputs[token] = {
+        "polygon": polygon,
+        "year": year,
+        "climate_data": climate_data,
+        "crop_climate": crop_climate,
+        "data_sources": data_sources,
+        "include_monthly_temps": include_monthly_temps,
+        "stored_at": time.monotonic()
+    }
+    if len(_scoring_inputs) > SCORING_INPUTS_CACHE_SIZE:
+        _scoring_inputs.popitem(last=False)
+    return token
+
+
+def get_scoring_inputs(result_token: str) -> Dict:
+    """
+    Inputs stored by store_scoring_inputs.
+
+    Raises:
+        HTTPException: If the token is unknown or expired
+    """
+    inputs = _scoring_inputs.get(result_token)
+    if inputs is None or time.monotonic() - inputs["stored_at"] > SCORING_INPUTS_TTL_S:
+        _scoring_inputs.pop(result_token, None)
+        raise HTTPException(
+            status_code=404,
+            detail="Unknown or expired result token. Please run the analysis again."
+        )
+    _scoring_inputs.move_to_end(result_token)
+    return inputs
+
+
+# The re-scoring endpoint is in routers/rescore.py
+app.include_router(rescore.router)
+
+
+# ============================================================================
+# BATCH RECOMMENDATIONS
+# ============================================================================
+
+# The batch endpoint is in routers/batch.py. What it shares with the analysis jobs stays here.
+
+class LandsatGroupSource(LandsatSource):
+    """
+    Landsat source of the polygons of a batch group.
+
+    The group runs one STAC search over the bounding box of its polygons, then each
+    polygon only reads the scenes whose footprint intersects it. If the search failed
+    (stac_items is None) every polygon reports Landsat as failed, as a single polygon does.
+    """
+
+    def __init__(self, stac_items: Optional[pystac.ItemCollection]):
+        self.search_failed = stac_items is None
+        self.footprints = scene_footprints(stac_items)
+
+    async def fetch(self, context: Dict) -> Optional[pd.DataFrame]:
+        if self.search_failed:
+            raise RuntimeError("The Landsat STAC search failed")
+        stac_items = scenes_intersecting(self.footprints, polygon_geometry(context["polygon"]))
+        if len(stac_items) == 0:
+            return None
+        return await self.read_temperatures(stac_items, context)
+
+
+async def search_landsat_group(polygons: List[PolygonInput], year: int) -> pystac.ItemCollection | None:
+    """
+    Search the Landsat scenes of several polygons with one STAC query over their bounding box.
+
+    Args:
+        polygons: Polygons of the group
+        year: Year of the acquisitions
+
+    Returns:
+        Search results as item_collection, or None if the search failed
+    """
+    latitudes = [lat for polygon in polygons for lat, _ in polygon.coordinates]
+    longitudes = [lon for polygon in polygons for _, lon in polygon.coordinates]
+    stac_items, _ = await search_landsat_area(min(latitudes), min(longitudes), max(latitudes), max(longitudes), year)
+    return stac_items
+
+
+def batch_error(index: int, error: Exception) -> Dict:
+    """Result line of a batch polygon that could not be scored."""
+    if isinstance(error, HTTPException):
+        return {"index": index, "error": error.detail, "status_code": error.status_code}
+    if isinstance(error, TimeoutError):
+        return {"index": index, "error": "Climate data did not arrive in time. Please try again later.",
+                "status_code": 504}
+    return {"index": index, "error": str(error), "status_code": 500}
+
+
+app.include_router(batch.router)
+
+
+# ============================================================================
+# ANALYSIS JOBS
+# ============================================================================
+
+# Limits of one job
+JOB_MAX_POLYGONS = 5000
+JOB_MAX_YEARS = 10
+
+# Units (one polygon for one year) of a job computed at the same time
+JOB_CONCURRENT_UNITS = int(os.getenv("JOB_CONCURRENT_UNITS", "4"))
+
+
+class AnalysisJobInput(BaseModel):
+    """Analysis of many polygons over one or more years, run in the background"""
+    polygons: List[PolygonInput] = Field(..., min_length=1, max_length=JOB_MAX_POLYGONS)
+    years: List[int] = Field([2023], min_length=1, max_length=JOB_MAX_YEARS)
+    min_score: float = 50.0
+    limit: int = 10
+    include_landsat: bool = True
+
+
+async def run_analysis_job(job: Dict, completed_units: Set[int], save_unit):
+    """
+    Run an analysis job: score every polygon of the job for every year.
+
+    Unit n is polygon n // len(years) for year years[n % len(years)]. Completed units
+    are skipped, so an interrupted job resumes where it stopped. Each unit result has
+    the layout of a /recommendations/batch line and is stored as soon as it is ready.
+
+    Args:
+        job: Job from the JobStore, with the AnalysisJobInput as params
+        completed_units: Units whose result is already stored
+        save_unit: Async callback storing the result of a unit (unit, result, failed)
+    """
+    params = AnalysisJobInput(**job["params"])
+    years = params.years
+    sources = [NasaPowerSource()]
+    if params.include_landsat:
+        sources.append(LandsatSource())
+
+    # Per-crop metrics of the POWER-only climate, shared by the polygons of a cell
+    power_crop_climate = {}
+
+    async def run_unit(unit: int):
+        polygon_index, year_index = divmod(unit, len(years))
+        polygon = params.polygons[polygon_index]
+        year = years[year_index]
+        try:
+            center_lat, center_lon = calculate_polygon_centroid(polygon.coordinates)
+            area_m2 = calculate_polygon_area_m2(polygon.coordinates)
+            validate_polygon_area(area_m2)
+
+            context = {
+                "polygon": polygon,
+                "latitude": center_lat,
+                "longitude": center_lon,
+                "year": year,
+                "include_multi_year": False
+            }
+            climate_data, source_results, source_status = await run_climate_sources(sources, context)
+
+            crop_climate = None
+            if "landsat" not in source_results:
+                cell_year = (nasa_power_grid_cell(center_lat, center_lon), year)
+                if cell_year not in power_crop_climate:
+                    power_crop_climate[cell_year] = precompute_crop_climate(climate_data["primary_year_data"])
+                crop_climate = power_crop_climate[cell_year]
+
+            sunshine_factor = calculate_sunshine_factor(polygon)
+            crop_results = process_crop_recommendations(
+                climate_data, sunshine_factor, area_m2, params.min_score, crop_climate
+            )
+            result = {
+                "index": polygon_index,
+                **build_recommendation_response(
+                    center_lat, center_lon, area_m2, year, sunshine_factor,
+                    climate_data, source_results, source_status, crop_results, params.limit
+                )
+            }
+            failed = False
+        except Exception as e:
+            logger.warning("Job %s polygon %d year %d failed: %s", job["id"], polygon_index, year, e)
+            result = {**batch_error(polygon_index, e), "year": year}
+            failed = True
+        await save_unit(unit, jsonable_encoder(result), failed)
+
+    pending_units = (
+        (unit,) for unit in range(len(params.polygons) * len(years)) if unit not in completed_units
+    )
+    await gather_bounded(pending_units, run_unit, asyncio.Semaphore(JOB_CONCURRENT_UNITS))
+
+
+def format_timestamp(timestamp: Optional[float]) -> Optional[str]:
+    """ISO 8601 UTC representation of a Unix timestamp, None if not set."""
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
+
+
+def job_status(job: Dict) -> Dict:
+    """Status and progress of a job for the API responses."""
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "progress": {
+            "units_total": job["units_total"],
+            "units_done": job["units_done"],
+            "units_failed": job["units_failed"],
+            "fraction": round(job["units_done"] / job["units_total"], 4) if job["units_total"] else 1.0
+        },
+        "created_at": format_timestamp(job["created_at"]),
+        "started_at": format_timestamp(job["started_at"]),
+        "finished_at": format_timestamp(job["finished_at"]),
+        "error": job["error"],
+        "results_url": f"/jobs/{job['id']}/results"
+    }
+
+
+async def get_job_or_404(job_id: str) -> Dict:
+    """Job from the store, raising a 404 HTTPException if it does not exist."""
+    job = await asyncio.to_thread(get_job_queue().store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job {job_id}")
+    return job
+
+
+@app.post("/jobs", status_code=202)
+async def submit_analysis_job(job_input: AnalysisJobInput):
+    """
+    Submit a long-running analysis of many polygons over one or more years.
+
+    Returns the job id and status right away. Submitting the same analysis again returns
+    the existing job (deduplicated: true) instead of running it twice, and retries the
+    failed units of a failed or done job. Poll GET /jobs/{job_id} for the progress, then download
+    the results from GET /jobs/{job_id}/results.
+
+    Parameters:
+    - polygons: List of polygons (at most JOB_MAX_POLYGONS)
+    - years: Years to analyze (default: [2023])
+    - min_score: Minimum suitability score (0-100, default: 50)
+    - limit: Maximum number of recommendations per polygon and year
+    - include_landsat: Refine temperatures with Landsat where available (default: True)
+    """
+    queue = get_job_queue()
+    units_total = len(job_input.polygons) * len(job_input.years)
+    job, created = await asyncio.to_thread(queue.store.submit, job_input.model_dump(), units_total)
+    queue.notify()
+    return {**job_status(job), "deduplicated": not created}
+
+
+@app.get("/jobs/{job_id}")
+async def get_analysis_job(job_id: str):
+    """Status and progress of an analysis job (queued, running, done or failed)."""
+    return job_status(await get_job_or_404(job_id))
+
+
+@app.get("/jobs/{job_id}/results")
+async def get_analysis_job_results(job_id: str):
+    """
+    Download the results of a finished analysis job.
+
+    Streamed as JSON lines (application/x-ndjson), one line per polygon and year in input
+    order, with the layout of the /recommendations/batch lines plus the year of failed units.
+    """
+    job = await get_job_or_404(job_id)
+    if job["status"] != JOB_DONE:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Job {job_id} is {job['status']} ({job['units_done']}/{job['units_total']} units done)."
+        )
+
+    # Synchronous generator, iterated in a worker thread by StreamingResponse
+    lines = (result + "\n" for result in get_job_queue().store.iter_results(job_id))
+    return StreamingResponse(lines, media_type="application/x-ndjson")
+
+
+# ============================================================================
+# PRECOMPUTED SUITABILITY GRIDS
+# ============================================================================
+
+# Directory of the grids built by suitability/build_grid.py, loaded on first use. It is
+# checked again every SUITABILITY_GRIDS_CHECK_INTERVAL_S: grids added or rebuilt since are
+# loaded without restarting the server.
+SUITABILITY_GRIDS_DIR = os.getenv("SUITABILITY_GRIDS_DIR", "suitability_grids")
+SUITABILITY_GRIDS_CHECK_INTERVAL_S = 30.0
+_suitability_grids: Optional[List[SuitabilityGrid]] = None
+_suitability_grids_signature = None
+_suitability_grids_checked_at = 0.0
+
+# Side of the square analyzed by the live pipeline for point queries outside the grids
+POINT_FALLBACK_SIZE_M = 20.0
+
+
+def get_suitability_grids() -> List[SuitabilityGrid]:
+    """Grids available for precomputed recommendations, reloaded when the grid files change."""
+    global _suitability_grids, _suitability_grids_signature, _suitability_grids_checked_at
+    now = time.monotonic()
+    if _suitability_grids is not None and now - _suitability_grids_checked_at < SUITABILITY_GRIDS_CHECK_INTERVAL_S:
+        return _suitability_grids
+    _suitability_grids_checked_at = now
+
+    signature = grids_signature(SUITABILITY_GRIDS_DIR)
+    if _suitability_grids is None or signature != _suitability_grids_signature:
+        _suitability_grids = load_grids(SUITABILITY_GRIDS_DIR)
+        _suitability_grids_signature = signature
+        # Tiles rendered from the previous grids are stale
+        map_tiles.clear_tile_cache()
+        logger.info("Loaded %d suitability grids from %s", len(_suitability_grids), SUITABILITY_GRIDS_DIR)
+    return _suitability_grids
+
+
+def point_square(latitude: float, longitude: float, size_m: float, sunshine_factor: float) -> PolygonInput:
+    """Square polygon of size_m meters centered on a point, with a uniform sunshine factor."""
+    half_lat = size_m / 2 / 111_320
+    half_lon = size_m / 2 / (111_320 * math.cos(math.radians(latitude)))
+    coordinates = [
+        (latitude - half_lat, longitude - half_lon),
+        (latitude - half_lat, longitude + half_lon),
+        (latitude + half_lat, longitude + half_lon),
+        (latitude + half_lat, longitude - half_lon),
+        (latitude - half_lat, longitude - half_lon)
+    ]
+    return PolygonInput(coordinates=coordinates, sunshine_duration=[sunshine_factor] * len(coordinates))
+
+
+def build_precomputed_response(grid: SuitabilityGrid, cell_scores: np.ndarray, min_score: float,
+                               limit: int) -> Dict:
+    """
+    Rank the crops from the grid scores of some cells.
+
+    Args:
+        grid: Grid the scores come from
+        cell_scores: Array of shape (crops, cells) of the covered cells
+        min_score: Minimum mean score of a recommended crop
+        limit: Maximum number of recommendations to include
+
+    Returns:
+        Dictionary with the grid description and the recommendations, each with the mean,
+        min and max score over the cells and the fraction of cells where it is suitable
+    """
+    stats = summarize_cell_scores(cell_scores, min_score)
+
+    recommendations = []
+    total_filtered = 0
+    for i, crop_id in enumerate(grid.crops):
+        crop_data = CROP_DATABASE.get(crop_id)
+        if crop_data is None:
+            continue
+        if np.isnan(stats["mean_score"][i]):
+            total_filtered += int(stats["filtered_fraction"][i] > 0)
+            continue
+        if stats["mean_score"][i] >= min_score:
+            recommendations.append({
+                "crop_id": crop_id,
+                "crop_name": crop_data["name"],
+                "season": crop_data["season"],
+                "score": round(float(stats["mean_score"][i]), 1),
+                "min_score": int(stats["min_score"][i]),
+                "max_score": int(stats["max_score"][i]),
+                "suitable_fraction": round(float(stats["suitable_fraction"][i]), 3),
+                "filtered_fraction": round(float(stats["filtered_fraction"][i]), 3)
+            })
+    recommendations.sort(key=lambda x: x["score"], reverse=True)
+
+    return {
+        "source": "precomputed",
+        "grid": {
+            "name": grid.name,
+            "year": grid.year,
+            "sunshine_factor": grid.sunshine_factor,
+            "resolution_deg": grid.resolution_deg,
+            "landsat": grid.metadata.get("landsat", False),
+            "cells": int(stats["cells"].max(initial=0))
+        },
+        "recommendations": recommendations[:limit],
+        "total_suitable_crops": len(recommendations),
+        "total_filtered_by_sunlight": total_filtered
+    }
+
+
+def precomputed_json_response(response: Dict) -> JSONResponse:
+    """JSON response of a query answered from a grid."""
+    json_response = JSONResponse(content=response)
+    json_response.headers["X-Recommendation-Source"] = "precomputed"
+    return json_response
+
+
+async def live_fallback(request: Request, polygon: PolygonInput, year: int, min_score: float, limit: int) -> Response:
+    """Answer a query outside the precomputed grids with the live /recommendations/polygon analysis."""
+    response = await run_until_disconnected(
+        request, recommend_polygon(polygon, year, min_score, limit, include_monthly_temps=False, budget_ms=None,
+                                   source="live")
+    )
+    response.headers["X-Recommendation-Source"] = "live"
+    return response
+
+
+@app.post("/recommendations/precomputed")
+async def get_precomputed_polygon_recommendations(
+        request: Request,
+        polygon: PolygonInput,
+        year: int = 2023,
+        min_score: float = 50.0,
+        limit: int = 10
+):
+    """
+    Get crop recommendations for a polygon from the precomputed suitability grids.
+
+    Scores are the mean over the grid cells whose centre is inside the polygon. Answered
+    from the grid of that year covering the polygon whose sunshine factor matches the
+    polygon's (within 0.05). Otherwise, falls back to the live analysis of
+    /recommendations/polygon.
+
+    The response has one of two shapes, told apart by its "source" field (also in the
+    X-Recommendation-Source header):
+    - "precomputed": grid, location, recommendations (score is the mean over the cells,
+      with min_score, max_score, suitable_fraction and filtered_fraction), total_suitable_crops
+      and total_filtered_by_sunlight
+    - "live": the /recommendations/polygon response, without the monthly temperatures
+
+    Parameters:
+    - polygon: Polygon coordinates defining the field area
+    - year: Year to analyze (default: 2023)
+    - min_score: Minimum suitability score (0-100, default: 50)
+    - limit: Maximum number of recommendations to return
+    """
+    sunshine_factor = calculate_sunshine_factor(polygon)
+    center_lat, center_lon = calculate_polygon_centroid(polygon.coordinates)
+
+    grid = find_grid(get_suitability_grids(), center_lat, center_lon, year, sunshine_factor)
+    cell_scores = grid.polygon_cells(polygon.coordinates) if grid is not None else None
+    if cell_scores is None:
+        return await live_fallback(request, polygon, year, min_score, limit)
+
+    response = build_precomputed_response(grid, cell_scores, min_score, limit)
+    response["location"] = build_location(center_lat, center_lon, calculate_polygon_area_m2(polygon.coordinates))
+    return precomputed_json_response(response)
+
+
+@app.get("/recommendations/precomputed/point")
+async def get_precomputed_point_recommendations(
+        request: Request,
+        latitude: float = Query(..., ge=-90, le=90),
+        longitude: float = Query(..., ge=-180, le=180),
+        year: int = 2023,
+        sunshine_factor: float = Query(0.7, ge=0, le=1),
+        min_score: float = 50.0,
+        limit: int = 10
+):
+    """
+    Get crop recommendations at a point from the precomputed suitability grids.
+
+    Outside the grids, falls back to the live analysis of a small square around the point.
+    The two response shapes are those of /recommendations/precomputed, told apart by "source".
+
+    Parameters:
+    - latitude, longitude: Point in decimal degrees
+    - year: Year to analyze (default: 2023)
+    - sunshine_factor: Sunshine factor of the point (0-1, default: 0.7)
+    - min_score: Minimum suitability score (0-100, default: 50)
+    - limit: Maximum number of recommendations to return
+    """
+    grid = find_grid(get_suitability_grids(), latitude, longitude, year, sunshine_factor)
+    if grid is None:
+        polygon = point_square(latitude, longitude, POINT_FALLBACK_SIZE_M, sunshine_factor)
+        return await live_fallback(request, polygon, year, min_score, limit)
+
+    response = build_precomputed_response(grid, grid.point_scores(latitude, longitude)[:, None], min_score, limit)
+    response["location"] = {"latitude": latitude, "longitude": longitude}
+    return precomputed_json_response(response)
+
+
+# ============================================================================
+# SUITABILITY MAP TILES
+# ============================================================================
+
+# The tile endpoint is in routers/map_tiles.py
+app.include_router(map_tiles.router)
 
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    # By import string, so the routers (which import main) and the server share one module
+    uvicorn.run("main:app", host="0.0.0.0", port=8000)
\ No newline at end of file
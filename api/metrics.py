@@ -0,0 +1,291 @@
+"""In-process timing and metrics for the recommendation pipeline.
+
+Metrics are plain Python counters updated from the event loop thread, so recording a
+value takes no lock and, once a label combination has been seen, allocates nothing.
+They are exposed in the Prometheus text format by render_prometheus.
+"""
+
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+# Upper bounds (seconds) of the histogram buckets, from cache hits to slow upstream calls.
+DEFAULT_BUCKETS_S = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Every metric created, in creation order, for render_prometheus.
+_REGISTRY = []
+
+
+def _escape_label_value(value: str) -> str:
+    """Escape a label value for the Prometheus text format."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(label_names: Tuple[str, ...], label_values: Tuple[str, ...], extra: str = "") -> str:
+    """Format label pairs as {name="value",...} for the Prometheus text format."""
+    pairs = [f'{name}="{_escape_label_value(value)}"' for name, value in zip(label_names, label_values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """
+    Monotonic counter, one series per combination of label values.
+
+    Attributes:
+        name: Metric name, should end with _total
+        description: Human readable description of the metric
+        labels: Names of the labels distinguishing the series
+    """
+
+    def __init__(self, name: str, description: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self._values: Dict[Tuple[str, ...], float] = {}
+        _REGISTRY.append(self)
+
+    def inc(self, label_values: Tuple[str, ...] = (), amount: float = 1):
+        """Increase the series of the label values by amount."""
+        self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        for label_values, value in list(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    """Value that goes up and down, one series per combination of label values."""
+
+    def dec(self, label_values: Tuple[str, ...] = (), amount: float = 1):
+        """Decrease the series of the label values by amount."""
+        self._values[label_values] = self._values.get(label_values, 0) - amount
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+
+class Histogram:
+    """
+    Histogram of observed values with fixed buckets, one series per combination of label values.
+
+    Attributes:
+        name: Metric name
+        description: Human readable description of the metric
+        labels: Names of the labels distinguishing the series (e.g. ("stage",))
+        buckets: Sorted upper bounds of the buckets
+    """
+
+    def __init__(self, name: str, description: str, labels: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS_S):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.buckets = buckets
+        # label values -> [count per bucket (+inf last), total count, sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        _REGISTRY.append(self)
+
+    def observe(self, label_values: Tuple[str, ...], value: float):
+        """Record one value for the series of the label values."""
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series.setdefault(label_values, [[0] * (len(self.buckets) + 1), 0, 0.0])
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += 1
+        series[2] += value
+
+    def snapshot(self) -> Dict[Tuple[str, ...], Dict]:
+        """
+        Current state of every series.
+
+        Returns:
+            Dictionary mapping the label values of each series to its cumulative bucket
+            counts (list of (upper bound, count) with float("inf") last), count and sum
+        """
+        result = {}
+        for label_values, (bucket_counts, count, total) in list(self._series.items()):
+            cumulative = []
+            running = 0
+            for upper_bound, bucket_count in zip(self.buckets + (float("inf"),), bucket_counts):
+                running += bucket_count
+                cumulative.append((upper_bound, running))
+            result[label_values] = {"buckets": cumulative, "count": count, "sum": total}
+        return result
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        for label_values, series in self.snapshot().items():
+            for upper_bound, count in series["buckets"]:
+                le = "+Inf" if upper_bound == float("inf") else repr(upper_bound)
+                bucket_labels = _format_labels(self.labels, label_values, 'le="' + le + '"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {count}")
+            label_text = _format_labels(self.labels, label_values)
+            lines.append(f"{self.name}_sum{label_text} {series['sum']}")
+            lines.append(f"{self.name}_count{label_text} {series['count']}")
+        return lines
+
+
+STAGE_DURATION_SECONDS = Histogram(
+    "homegrown_stage_duration_seconds",
+    "Duration of the recommendation pipeline stages",
+    ("stage",)
+)
+
+HTTP_REQUESTS = Counter(
+    "homegrown_http_requests_total",
+    "HTTP requests handled, by route and status code",
+    ("route", "method", "status")
+)
+
+HTTP_REQUEST_DURATION_SECONDS = Histogram(
+    "homegrown_http_request_duration_seconds",
+    "HTTP request latency, by route",
+    ("route", "method")
+)
+
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "homegrown_http_requests_in_flight",
+    "HTTP requests currently being handled"
+)
+
+UPSTREAM_DURATION_SECONDS = Histogram(
+    "homegrown_upstream_duration_seconds",
+    "Latency of calls to upstream services (nasa_power, stac, cog_read, mistral)",
+    ("upstream",)
+)
+
+UPSTREAM_ERRORS = Counter(
+    "homegrown_upstream_errors_total",
+    "Failed calls to upstream services (nasa_power, stac, cog_read, mistral)",
+    ("upstream",)
+)
+
+CACHE_REQUESTS = Counter(
+    "homegrown_cache_requests_total",
+    "Cache lookups, by cache and result (hit, nearby for reuse of a nearby polygon, or miss)",
+    ("cache", "result")
+)
+
+# Stage timings of the request being handled, shared with the tasks it spawns.
+_request_timings: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("request_timings", default=None)
+
+
+def start_request_timing() -> List[Tuple[str, float]]:
+    """
+    Start collecting stage timings for the current request.
+
+    Returns:
+        List that timed_stage fills with (stage, duration in seconds) tuples
+    """
+    timings = []
+    _request_timings.set(timings)
+    return timings
+
+
+@contextmanager
+def timed_stage(stage: str):
+    """
+    Time a pipeline stage.
+
+    The duration is recorded in STAGE_DURATION_SECONDS and, when the request collects
+    timings (see start_request_timing), in the timings of the request.
+
+    Args:
+        stage: Stage name, used as Server-Timing metric name and histogram label
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        STAGE_DURATION_SECONDS.observe((stage,), duration)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((stage, duration))
+
+
+@contextmanager
+def timed_upstream(upstream: str):
+    """
+    Time a call to an upstream service and count it as an error if it raises.
+
+    A cancelled call (client disconnect, exhausted time budget) is timed but not counted as an
+    error, since the upstream did not fail.
+
+    Args:
+        upstream: Upstream name (nasa_power, stac, cog_read, mistral)
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        UPSTREAM_ERRORS.inc((upstream,))
+        raise
+    finally:
+        UPSTREAM_DURATION_SECONDS.observe((upstream,), time.perf_counter() - start)
+
+
+def server_timing_header(timings: List[Tuple[str, float]]) -> str:
+    """
+    Format stage timings as a Server-Timing header value.
+
+    Args:
+        timings: List of (stage, duration in seconds) tuples
+
+    Returns:
+        Header value, e.g. "geometry;dur=0.2, nasa_power_fetch;dur=812.4"
+    """
+    return ", ".join(f"{stage};dur={duration * 1000:.1f}" for stage, duration in timings)
+
+
+def render_prometheus() -> str:
+    """Render every metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in _REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware counting requests, their latency and the requests in flight.
+
+    Requests are labelled with the route path template (e.g. /tiles/{crop}/...) rather
+    than the raw path, so the number of series stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duration = time.perf_counter() - start
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            route = scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            HTTP_REQUESTS.inc((route_path, scope["method"], str(status)))
+            HTTP_REQUEST_DURATION_SECONDS.observe((route_path, scope["method"]), duration)
@@ -0,0 +1,13 @@
+"""Request bodies shared by main.py and the routers."""
+
+from typing import List, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+
+class PolygonInput(BaseModel):
+    """Polygon with coordinate points [(lat, lon), ...]"""
+    coordinates: List[Tuple[float, float]] = Field(..., min_length=3,
+                                                   description="List of (latitude, longitude) tuples")
+    sunshine_duration: Optional[List[float]] = Field(None,
+                                                     description="List of sunshine duration factors (0-1) for each point, interpolated over the polygon. If not provided, defaults to 0.7")
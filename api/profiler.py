@@ -0,0 +1,120 @@
+"""Low-overhead statistical profiler of the running server.
+
+A background thread samples the Python stacks of every other thread of the process at a
+fixed interval. Samples are aggregated as collapsed stacks ("outer;inner;leaf count" per
+line), the input format of flamegraph.pl, speedscope and similar tools.
+
+Worker processes (the Landsat process pool) run their own sampler thread, started and
+stopped through a shared session number. Their stacks are sent back through a queue and
+merged with those of the main process, under a label naming the pool.
+"""
+
+import os
+import queue
+import sys
+import threading
+import time
+from collections import Counter
+from types import FrameType
+from typing import Callable, Dict, Optional
+
+
+def _frame_label(frame: FrameType) -> str:
+    """Label of a frame in a collapsed stack: function (file:first line)."""
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def sample_stacks(duration_s: float, interval_s: float = 0.005,
+                  should_stop: Optional[Callable[[], bool]] = None) -> Dict[str, int]:
+    """
+    Sample the stacks of all the other threads of the process.
+
+    Blocks for duration_s, call it from a worker thread.
+
+    Args:
+        duration_s: Sampling duration in seconds
+        interval_s: Time between two samples in seconds
+        should_stop: Called between samples, sampling stops early when it returns True
+
+    Returns:
+        Dictionary mapping collapsed stacks (root first, frames separated by ";", prefixed
+        by the thread name) to the number of samples they were seen in
+    """
+    own_thread_id = threading.get_ident()
+    thread_names = {}
+    stacks = Counter()
+
+    deadline = time.monotonic() + duration_s
+    while time.monotonic() < deadline and not (should_stop is not None and should_stop()):
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_thread_id:
+                continue
+            if thread_id not in thread_names:
+                thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            labels.append(thread_names.get(thread_id, str(thread_id)))
+            stacks[";".join(reversed(labels))] += 1
+        time.sleep(interval_s)
+
+    return stacks
+
+
+def format_collapsed(stacks: Dict[str, int]) -> str:
+    """Format sampled stacks in the collapsed stack format, most frequent first."""
+    return "".join(f"{stack} {count}\n" for stack, count in sorted(stacks.items(), key=lambda item: -item[1]))
+
+
+def serve_worker_profiling(session, interval, results, label: str, poll_s: float = 0.05):
+    """
+    Sampler loop of a worker process, run in a daemon thread.
+
+    Samples the stacks of the worker while session.value is a non-zero session number, then
+    puts (session number, stacks) on the results queue.
+
+    Args:
+        session: Shared integer (multiprocessing.RawValue), the running session number or 0
+        interval: Shared float, time between two samples in seconds
+        results: multiprocessing queue read by collect_worker_stacks
+        label: Prefix of the collapsed stacks of this process
+    """
+    while True:
+        current = session.value
+        if current == 0:
+            time.sleep(poll_s)
+            continue
+        stacks = sample_stacks(float("inf"), interval.value, should_stop=lambda: session.value != current)
+        results.put((current, {f"{label};{stack}": count for stack, count in stacks.items()}))
+        while session.value == current:
+            time.sleep(poll_s)
+
+
+def collect_worker_stacks(results, session: int, workers: int, timeout_s: float = 2.0) -> Dict[str, int]:
+    """
+    Merge the stacks sent by the worker processes for a session, once it has been stopped.
+
+    Blocks until every worker answered or for timeout_s (workers not started yet never answer).
+
+    Args:
+        results: Queue the workers put their stacks on
+        session: Session number
+        workers: Number of worker processes
+        timeout_s: Longest wait for the workers
+    """
+    stacks = Counter()
+    answers = 0
+    deadline = time.monotonic() + timeout_s
+    while answers < workers and time.monotonic() < deadline:
+        try:
+            answer_session, worker_stacks = results.get(timeout=max(deadline - time.monotonic(), 0.001))
+        except queue.Empty:
+            break
+        # Late answers of an earlier session are dropped
+        if answer_session == session:
+            stacks.update(worker_stacks)
+            answers += 1
+    return stacks
@@ -0,0 +1 @@
+"""Endpoints of the larger features, one APIRouter per module, included by main.py."""
@@ -0,0 +1,254 @@
+"""
+Batch recommendations: many polygons in one request, streamed as JSON lines.
+
+The scoring pipeline lives in main.py, which includes this router. main is imported
+inside the functions, once it is fully loaded, so that importing main does not import
+it again through this module.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import defaultdict
+from typing import AsyncIterator, Dict, List, Tuple
+
+import pystac
+from fastapi import APIRouter, HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+
+from metrics import timed_stage
+from models import PolygonInput
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# Maximum number of polygons in one batch request
+BATCH_MAX_POLYGONS = 1000
+
+# Polygons of a batch scored at the same time, POWER cells worked on at the same time and
+# results waiting to be sent. They bound the memory used by a batch whatever its size:
+# when the client reads slowly the queue fills up and scoring pauses until it catches up.
+BATCH_MAX_CONCURRENT_POLYGONS = int(os.getenv("BATCH_MAX_CONCURRENT_POLYGONS", "16"))
+BATCH_MAX_CONCURRENT_CELLS = int(os.getenv("BATCH_MAX_CONCURRENT_CELLS", "4"))
+BATCH_RESULT_QUEUE_SIZE = 32
+
+
+async def score_batch_group(members: List[Tuple], year: int, min_score: float, limit: int,
+                            include_landsat: bool, polygon_slots: asyncio.Semaphore, results: asyncio.Queue):
+    """
+    Score the polygons of one NASA POWER grid cell, sharing the fetched inputs between them.
+
+    The POWER data of the cell is fetched once and the Landsat scenes of the group are
+    searched once, then the polygons are scored concurrently, as many at a time as
+    polygon_slots allows. A polygon keeps its slot until its result is in the queue.
+
+    Args:
+        members: (index, polygon, center latitude, center longitude, area in m²) of each polygon
+        year: Year to analyze
+        min_score: Minimum suitability score
+        limit: Maximum number of recommendations per polygon
+        include_landsat: Whether to refine the temperatures with Landsat
+        polygon_slots: Limit on the polygons scored at the same time, shared by the groups of a batch
+        results: Queue receiving one result per polygon
+    """
+    from main import (LandsatGroupSource, LandsatSource, NasaPowerSource, batch_error, build_recommendation_response,
+                      calculate_sunshine_factor, climate_source_cached, fetch_climate_source, gather_bounded,
+                      precompute_crop_climate, process_crop_recommendations, run_climate_sources,
+                      search_landsat_group)
+
+    _, first_polygon, first_lat, first_lon, _ = members[0]
+    cell_context = {
+        "polygon": first_polygon,
+        "latitude": first_lat,
+        "longitude": first_lon,
+        "year": year,
+        "include_multi_year": False
+    }
+
+    # Landsat scenes of the polygons without a cached Landsat result
+    search_task = None
+    if include_landsat:
+        uncached = [
+            polygon for _, polygon, _, _, _ in members
+            if not climate_source_cached(LandsatSource(), {"polygon": polygon, "year": year})
+        ]
+        if uncached:
+            search_task = asyncio.create_task(search_landsat_group(uncached, year))
+
+    try:
+        power_data = await fetch_climate_source(NasaPowerSource(), cell_context)
+        stac_items = await search_task if search_task is not None else pystac.ItemCollection([])
+    except Exception as e:
+        if search_task is not None:
+            search_task.cancel()
+        for index, *_ in members:
+            await results.put(batch_error(index, e))
+        return
+
+    sources = [NasaPowerSource()]
+    if include_landsat:
+        sources.append(LandsatGroupSource(stac_items))
+
+    # Polygons without Landsat data all score on the POWER data of the cell
+    power_crop_climate = precompute_crop_climate(power_data["primary_year_data"])
+
+    async def score_polygon(index: int, polygon: PolygonInput, center_lat: float, center_lon: float,
+                            area_m2: float):
+        context = {**cell_context, "polygon": polygon, "latitude": center_lat, "longitude": center_lon}
+        try:
+            climate_data, source_results, source_status = await run_climate_sources(sources, context)
+            sunshine_factor = calculate_sunshine_factor(polygon)
+            crop_climate = None if "landsat" in source_results else power_crop_climate
+            with timed_stage("scoring"):
+                crop_results = process_crop_recommendations(
+                    climate_data, sunshine_factor, area_m2, min_score, crop_climate
+                )
+            result = {
+                "index": index,
+                **build_recommendation_response(
+                    center_lat, center_lon, area_m2, year, sunshine_factor,
+                    climate_data, source_results, source_status, crop_results, limit
+                )
+            }
+        except Exception as e:
+            logger.warning("Batch polygon %d failed: %s", index, e)
+            result = batch_error(index, e)
+        await results.put(result)
+
+    await gather_bounded(members, score_polygon, polygon_slots)
+
+
+async def iter_batch_recommendations(polygons: List[PolygonInput], year: int, min_score: float,
+                                     limit: int, include_landsat: bool) -> AsyncIterator[Dict]:
+    """
+    Score many polygons, yielding each result as soon as it is ready, then a summary.
+
+    Polygons are grouped by NASA POWER grid cell (see score_batch_group). Results come
+    in completion order, each with the index of its polygon in the input list.
+
+    Work is pulled by the consumer: at most BATCH_MAX_CONCURRENT_CELLS cells and
+    BATCH_MAX_CONCURRENT_POLYGONS polygons are in progress and at most
+    BATCH_RESULT_QUEUE_SIZE results wait to be consumed, so memory does not grow
+    with the batch size and a slow consumer slows the scoring down.
+
+    Args:
+        polygons: Polygons to score
+        year: Year to analyze
+        min_score: Minimum suitability score
+        limit: Maximum number of recommendations per polygon
+        include_landsat: Whether to refine the temperatures with Landsat
+
+    Yields:
+        One dictionary per polygon: the recommendation response with its index, or
+        index, error and status_code if it could not be scored. Then a last dictionary
+        with a "summary" of the batch.
+    """
+    from main import (batch_error, calculate_polygon_area_m2, calculate_polygon_centroid, nasa_power_grid_cell,
+                      validate_polygon_area)
+
+    start = time.monotonic()
+    summary = {"polygons": len(polygons), "scored": 0, "failed": 0, "with_landsat": 0}
+
+    groups = defaultdict(list)
+    for index, polygon in enumerate(polygons):
+        center_lat, center_lon = calculate_polygon_centroid(polygon.coordinates)
+        area_m2 = calculate_polygon_area_m2(polygon.coordinates)
+        try:
+            validate_polygon_area(area_m2)
+        except HTTPException as e:
+            summary["failed"] += 1
+            yield batch_error(index, e)
+            continue
+        groups[nasa_power_grid_cell(center_lat, center_lon)].append(
+            (index, polygon, center_lat, center_lon, area_m2)
+        )
+    summary["power_cells"] = len(groups)
+    logger.info("Scoring a batch of %d polygons in %d POWER grid cells",
+                sum(len(members) for members in groups.values()), len(groups))
+
+    results = asyncio.Queue(maxsize=BATCH_RESULT_QUEUE_SIZE)
+    polygon_slots = asyncio.Semaphore(BATCH_MAX_CONCURRENT_POLYGONS)
+    pending_groups = iter(groups.values())
+
+    async def cell_worker():
+        for members in pending_groups:
+            try:
+                await score_batch_group(members, year, min_score, limit, include_landsat, polygon_slots, results)
+            except Exception as e:
+                logger.exception("Batch group of %d polygons failed", len(members))
+                # Every polygon gets a line; those already reported are skipped by the consumer
+                for index, *_ in members:
+                    await results.put(batch_error(index, e))
+        # End of this worker's share of the batch
+        await results.put(None)
+
+    workers = [asyncio.create_task(cell_worker()) for _ in range(min(BATCH_MAX_CONCURRENT_CELLS, len(groups)))]
+    reported = set()
+    try:
+        running = len(workers)
+        while running:
+            result = await results.get()
+            if result is None:
+                running -= 1
+                continue
+            if result["index"] in reported:
+                continue
+            reported.add(result["index"])
+            if "error" in result:
+                summary["failed"] += 1
+            else:
+                summary["scored"] += 1
+                summary["with_landsat"] += result["data_sources"]["landsat_surface_temp"]
+            yield result
+    finally:
+        for worker in workers:
+            worker.cancel()
+
+    summary["elapsed_ms"] = round((time.monotonic() - start) * 1000, 1)
+    yield {"summary": summary}
+
+
+@router.post("/recommendations/batch")
+async def get_batch_crop_recommendations(
+        polygons: List[PolygonInput],
+        year: int = 2023,
+        min_score: float = 50.0,
+        limit: int = 10,
+        include_landsat: bool = True
+):
+    """
+    Get crop recommendations for many polygons in one request.
+
+    Polygons in the same NASA POWER grid cell share one POWER fetch and one Landsat scene
+    search. The response is streamed as JSON lines (application/x-ndjson), one line per
+    polygon as soon as it is scored, in completion order. Each line has the index of its
+    polygon in the request and the same fields as /recommendations/polygon, without the
+    monthly temperatures and the LLM summary. A polygon that cannot be scored gets a line
+    with index, error and status_code instead. The last line is a "summary" of the batch
+    (polygons, scored, failed, with_landsat, power_cells, elapsed_ms).
+
+    Scoring runs only as fast as the client reads the response, so the server does not
+    buffer the results of large batches.
+
+    Parameters:
+    - polygons: List of polygons (at most BATCH_MAX_POLYGONS)
+    - year: Year to analyze (default: 2023)
+    - min_score: Minimum suitability score (0-100, default: 50)
+    - limit: Maximum number of recommendations per polygon
+    - include_landsat: Refine temperatures with Landsat where available (default: True)
+    """
+    if not polygons or len(polygons) > BATCH_MAX_POLYGONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"A batch must contain between 1 and {BATCH_MAX_POLYGONS} polygons. Received: {len(polygons)}."
+        )
+
+    async def ndjson_lines():
+        async for result in iter_batch_recommendations(polygons, year, min_score, limit, include_landsat):
+            yield json.dumps(jsonable_encoder(result)) + "\n"
+
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
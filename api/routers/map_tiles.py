@@ -0,0 +1,188 @@
+"""
+Suitability map tiles: XYZ PNG tiles of the crop scores, for a Mapbox raster source.
+
+Tiles are rendered from the precomputed grids and, outside them, scored live with the
+pipeline of main.py, which includes this router. main is imported inside the functions,
+once it is fully loaded, so that importing main does not import it again through this module.
+"""
+
+import asyncio
+import logging
+import os
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import numpy as np
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import Response
+
+from crop_database import CROP_DATABASE
+from metrics import CACHE_REQUESTS
+from suitability.grid import SCORE_NODATA, encode_crop_scores
+from suitability.tiles import grid_tile_codes, power_tile_codes, render_tile_png, tile_power_cells, tiles_covering
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# Rendered tiles kept in memory (LRU)
+TILE_CACHE_SIZE = int(os.getenv("TILE_CACHE_SIZE", "4096"))
+_tile_cache: OrderedDict = OrderedDict()
+
+# Tiles of lower zooms span too many NASA POWER cells to be scored live: outside the
+# precomputed grids, they are left transparent.
+TILE_LIVE_MIN_ZOOM = 9
+TILE_MAX_ZOOM = 22
+TILE_MAX_AGE_S = 86400
+
+# Zooms whose tiles over the precomputed grids are rendered at startup, e.g. "10,11,12"
+TILE_SEED_ZOOMS = [int(z) for z in os.getenv("TILE_SEED_ZOOMS", "").split(",") if z.strip()]
+TILE_SEED_MAX_TILES = TILE_CACHE_SIZE // 2
+
+# Scores of all crops by NASA POWER cell, year and sunshine factor (LRU). An entry is a
+# few dozen bytes, so many more are kept than climate source results.
+POWER_CELL_SCORES_CACHE_SIZE = int(os.getenv("POWER_CELL_SCORES_CACHE_SIZE", "8192"))
+_power_cell_scores_cache: OrderedDict = OrderedDict()
+
+
+async def power_cell_scores(power_cell: Tuple[int, int], year: int, sunshine_factor: float) -> Optional[np.ndarray]:
+    """
+    Scores of all crops (CROP_DATABASE order) over a NASA POWER cell, encoded as in the grids.
+
+    Returns:
+        uint8 array of shape (crops,), None if the POWER data could not be fetched
+    """
+    from main import (NASA_POWER_GRID_LAT_DEG, NASA_POWER_GRID_LON_DEG, NasaPowerSource, fetch_climate_source,
+                      process_crop_recommendations)
+
+    key = (power_cell, year, sunshine_factor)
+    if key in _power_cell_scores_cache:
+        _power_cell_scores_cache.move_to_end(key)
+        return _power_cell_scores_cache[key]
+
+    power_row, power_col = power_cell
+    context = {
+        "polygon": None,
+        "latitude": power_row * NASA_POWER_GRID_LAT_DEG - 90,
+        "longitude": power_col * NASA_POWER_GRID_LON_DEG - 180,
+        "year": year,
+        "include_multi_year": False
+    }
+    try:
+        climate_data = await fetch_climate_source(NasaPowerSource(), context)
+    except Exception as e:
+        logger.warning("No NASA POWER data for tile cell %s: %s", power_cell, e)
+        return None
+
+    crop_results = process_crop_recommendations(climate_data, sunshine_factor, area_m2=None, min_score=0.0)
+    scores = encode_crop_scores(crop_results, list(CROP_DATABASE))
+    _power_cell_scores_cache[key] = scores
+    if len(_power_cell_scores_cache) > POWER_CELL_SCORES_CACHE_SIZE:
+        _power_cell_scores_cache.popitem(last=False)
+    return scores
+
+
+async def render_suitability_tile(crop_id: str, z: int, x: int, y: int, year: int,
+                                  sunshine_factor: float) -> Tuple[bytes, bool]:
+    """
+    Render the suitability tile of a crop.
+
+    Pixels covered by a precomputed grid show its scores. From TILE_LIVE_MIN_ZOOM, the other
+    pixels show the NASA POWER score of their cell, scored live.
+
+    Returns:
+        Tuple of (PNG, complete). complete is False when the POWER data of a live cell could
+        not be fetched: its pixels are transparent and the tile must not be cached.
+    """
+    from main import NASA_POWER_GRID_LAT_DEG, NASA_POWER_GRID_LON_DEG, get_suitability_grids
+
+    codes = grid_tile_codes(get_suitability_grids(), crop_id, z, x, y, year, sunshine_factor)
+
+    complete = True
+    if z >= TILE_LIVE_MIN_ZOOM and (codes is None or (codes == SCORE_NODATA).any()):
+        crop_index = list(CROP_DATABASE).index(crop_id)
+        power_cells = sorted(tile_power_cells(z, x, y, NASA_POWER_GRID_LAT_DEG, NASA_POWER_GRID_LON_DEG))
+        cell_scores = await asyncio.gather(*(power_cell_scores(cell, year, sunshine_factor) for cell in power_cells))
+        cell_codes = {
+            cell: int(scores[crop_index]) for cell, scores in zip(power_cells, cell_scores) if scores is not None
+        }
+        complete = len(cell_codes) == len(power_cells)
+        live_codes = power_tile_codes(z, x, y, cell_codes, NASA_POWER_GRID_LAT_DEG, NASA_POWER_GRID_LON_DEG)
+        codes = live_codes if codes is None else np.where(codes == SCORE_NODATA, live_codes, codes)
+
+    return render_tile_png(codes), complete
+
+
+async def get_suitability_tile_png(crop_id: str, z: int, x: int, y: int, year: int,
+                                   sunshine_factor: float) -> Tuple[bytes, bool]:
+    """Suitability tile of a crop and whether it is complete, from the tile cache when possible."""
+    key = (crop_id, z, x, y, year, sunshine_factor)
+    if key in _tile_cache:
+        CACHE_REQUESTS.inc(("tiles", "hit"))
+        _tile_cache.move_to_end(key)
+        return _tile_cache[key], True
+    CACHE_REQUESTS.inc(("tiles", "miss"))
+
+    png, complete = await render_suitability_tile(crop_id, z, x, y, year, sunshine_factor)
+    if complete:
+        _tile_cache[key] = png
+        if len(_tile_cache) > TILE_CACHE_SIZE:
+            _tile_cache.popitem(last=False)
+    return png, complete
+
+
+def clear_tile_cache():
+    """Forget the rendered tiles, e.g. when the precomputed grids change."""
+    _tile_cache.clear()
+
+
+async def seed_tile_cache():
+    """Render the tiles of TILE_SEED_ZOOMS over the precomputed grids, at most TILE_SEED_MAX_TILES."""
+    from main import get_suitability_grids
+
+    seeded = 0
+    for grid in get_suitability_grids():
+        for z in TILE_SEED_ZOOMS:
+            for x, y in tiles_covering(grid.south, grid.west, grid.north, grid.east, z):
+                for crop_id in grid.crops:
+                    if crop_id not in CROP_DATABASE:
+                        continue
+                    if seeded >= TILE_SEED_MAX_TILES:
+                        logger.info("Tile cache seeding stopped after %d tiles", seeded)
+                        return
+                    await get_suitability_tile_png(crop_id, z, x, y, grid.year, round(grid.sunshine_factor, 2))
+                    seeded += 1
+    logger.info("Seeded the tile cache with %d tiles", seeded)
+
+
+@router.get("/tiles/{crop_id}/{z}/{x}/{y}.png")
+async def get_suitability_tile(
+        crop_id: str,
+        z: int,
+        x: int,
+        y: int,
+        year: int = 2023,
+        sunshine_factor: float = Query(0.7, ge=0, le=1)
+):
+    """
+    XYZ map tile (256x256 PNG) of the suitability of a crop, for a Mapbox raster source.
+
+    Scores go from red (0) through yellow (50) to green (100). Crops without enough
+    sunlight are grey, areas without scores transparent. Rendered from the precomputed
+    grids, and from zoom 9 scored live from NASA POWER outside them.
+
+    Parameters:
+    - crop_id: Crop id, as listed by /crops
+    - z, x, y: Tile coordinates (Web Mercator)
+    - year: Year of the climate data (default: 2023)
+    - sunshine_factor: Sunshine factor (0-1, default: 0.7)
+    """
+    if crop_id not in CROP_DATABASE:
+        raise HTTPException(status_code=404, detail=f"Unknown crop: {crop_id}")
+    if not (0 <= z <= TILE_MAX_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise HTTPException(status_code=400, detail=f"Invalid tile: {z}/{x}/{y}")
+
+    png, complete = await get_suitability_tile_png(crop_id, z, x, y, year, round(sunshine_factor, 2))
+    # A tile missing live cells is retried on the next request instead of being cached by the browser
+    cache_control = f"public, max-age={TILE_MAX_AGE_S}" if complete else "no-store"
+    return Response(content=png, media_type="image/png", headers={"Cache-Control": cache_control})
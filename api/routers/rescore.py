@@ -0,0 +1,88 @@
+"""
+Incremental re-scoring: score an earlier analysis again without fetching anything.
+
+The analysis inputs are stored by main.py (store_scoring_inputs), which includes this
+router. main is imported inside the endpoint, once it is fully loaded, so that importing
+main does not import it again through this module.
+"""
+
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, Field
+
+from metrics import server_timing_header, start_request_timing, timed_stage
+
+router = APIRouter()
+
+
+class RescoreInput(BaseModel):
+    """Inputs changed for a re-scoring. Inputs not given keep their value from the analysis."""
+    sunshine_duration: Optional[List[float]] = Field(None,
+                                                     description="List of sunshine duration factors (0-1) for each point")
+
+
+@router.post("/recommendations/rescore/{result_token}")
+async def rescore_crop_recommendations(
+        result_token: str,
+        rescore: Optional[RescoreInput] = None,
+        min_score: float = 50.0,
+        limit: int = 10
+):
+    """
+    Score an earlier analysis again with new sunshine factors or thresholds, without fetching anything.
+
+    Reuses the fused climate data and the per-crop growing season metrics of the analysis
+    the token was returned with, and only recomputes the sunshine-dependent scores, the
+    filtering and the ranking. The response has the /recommendations/polygon layout,
+    without the LLM summary, and has the monthly temperatures if the analysis had them.
+    Tokens expire after an hour.
+
+    Parameters:
+    - result_token: result_token of a /recommendations/polygon (or stream) response
+    - rescore: New sunshine_duration of the polygon points, one per point (default: unchanged)
+    - min_score: Minimum suitability score (0-100, default: 50)
+    - limit: Maximum number of recommendations to return
+    """
+    from main import (add_shade_analysis, build_recommendation_response, calculate_polygon_area_m2,
+                      calculate_polygon_centroid, calculate_shade_samples, calculate_sunshine_factor,
+                      get_scoring_inputs, process_crop_recommendations)
+
+    timings = start_request_timing()
+    inputs = get_scoring_inputs(result_token)
+
+    polygon = inputs["polygon"]
+    if rescore is not None and rescore.sunshine_duration is not None:
+        if len(rescore.sunshine_duration) != len(polygon.coordinates):
+            raise HTTPException(
+                status_code=422,
+                detail=f"sunshine_duration has {len(rescore.sunshine_duration)} values, the polygon has "
+                       f"{len(polygon.coordinates)} points."
+            )
+        polygon = polygon.model_copy(update={"sunshine_duration": rescore.sunshine_duration})
+    center_lat, center_lon = calculate_polygon_centroid(polygon.coordinates)
+    area_m2 = calculate_polygon_area_m2(polygon.coordinates)
+    shade = calculate_shade_samples(polygon)
+    sunshine_factor = calculate_sunshine_factor(polygon, shade)
+    climate_data = inputs["climate_data"]
+
+    with timed_stage("scoring"):
+        crop_results = process_crop_recommendations(
+            climate_data, sunshine_factor, area_m2, min_score, inputs["crop_climate"]
+        )
+    response = build_recommendation_response(
+        center_lat, center_lon, area_m2, inputs["year"], sunshine_factor, climate_data,
+        {}, inputs["data_sources"]["status"], crop_results, limit
+    )
+    # The sources used are those of the analysis
+    response["data_sources"] = inputs["data_sources"]
+    add_shade_analysis(response, shade, climate_data, inputs["crop_climate"], min_score, crop_results)
+    if inputs["include_monthly_temps"] and climate_data["monthly_averages"]:
+        response["monthly_temperature_averages"] = climate_data["monthly_averages"]
+    response["result_token"] = result_token
+
+    json_response = JSONResponse(content=jsonable_encoder(response))
+    json_response.headers["Server-Timing"] = server_timing_header(timings)
+    return json_response
@@ -0,0 +1,104 @@
+"""Shade field of a plot from the sunshine factors of its vertices.
+
+The sunshine_duration factors sent with a polygon are samples of a shade field at its
+vertices (e.g. traced from building shadows). The polygon is triangulated (constrained
+Delaunay, so concave plots work) and the factors are interpolated linearly inside each
+triangle. Samples of the field are then weighted by the area they stand for, so a sunny
+corner counts for its share of the plot only.
+
+Everything is computed on arrays, so polygons with thousands of vertices stay fast.
+"""
+
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+import shapely
+
+# Each triangle is sampled at the centroids of its subdivision into SUBDIVISIONS² equal triangles
+SUBDIVISIONS = 4
+
+
+def _barycentric_samples(subdivisions: int) -> np.ndarray:
+    """Barycentric coordinates (n, 3) of the centroids of the sub-triangles of a subdivided triangle."""
+    samples = []
+    for i in range(subdivisions):
+        for j in range(subdivisions - i):
+            samples.append(((i + 1 / 3) / subdivisions, (j + 1 / 3) / subdivisions))
+            if i + j <= subdivisions - 2:
+                samples.append(((i + 2 / 3) / subdivisions, (j + 2 / 3) / subdivisions))
+    u, v = np.array(samples).T
+    return np.stack([u, v, 1 - u - v], axis=1)
+
+
+_BARYCENTRIC_SAMPLES = _barycentric_samples(SUBDIVISIONS)
+
+
+def shade_samples(coordinates: Sequence[Tuple[float, float]], factors: Sequence[float]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Sample the interpolated sunshine factor field of a polygon.
+
+    Args:
+        coordinates: List of (latitude, longitude) tuples, optionally closed
+        factors: Sunshine factor (0-1) of each coordinate
+
+    Returns:
+        Tuple of (factors, weights) arrays: the sampled factors and the share of the polygon
+        area each of them stands for (weights sum to 1)
+
+    Raises:
+        ValueError: If the polygon cannot be triangulated (self-intersecting or degenerate)
+    """
+    points = np.array([(lon, lat) for lat, lon in coordinates], dtype=float)
+    factors = np.asarray(factors, dtype=float)
+    if len(points) > 3 and np.array_equal(points[0], points[-1]):
+        points, factors = points[:-1], factors[:-1]
+
+    polygon = shapely.Polygon(points)
+    if len(points) < 3 or not polygon.is_valid or polygon.area == 0:
+        raise ValueError("Polygon cannot be triangulated")
+
+    triangles = shapely.get_parts(shapely.constrained_delaunay_triangles(polygon))
+    corners = shapely.get_coordinates(triangles).reshape(len(triangles), 4, 2)[:, :3]
+
+    # Factors of the triangle corners: look the corners up among the vertices
+    vertex_keys = points[:, 0] + 1j * points[:, 1]
+    order = np.argsort(vertex_keys)
+    sorted_keys = vertex_keys[order]
+    corner_keys = corners[..., 0] + 1j * corners[..., 1]
+    positions = np.clip(np.searchsorted(sorted_keys, corner_keys), 0, len(sorted_keys) - 1)
+    if not np.array_equal(sorted_keys[positions], corner_keys):
+        raise ValueError("Triangulation added vertices")
+    corner_factors = factors[order[positions]]
+
+    edges_a = corners[:, 1] - corners[:, 0]
+    edges_b = corners[:, 2] - corners[:, 0]
+    areas = np.abs(edges_a[:, 0] * edges_b[:, 1] - edges_a[:, 1] * edges_b[:, 0]) / 2
+
+    # Linear interpolation at the sample points, each standing for an equal share of its triangle
+    sampled = corner_factors @ _BARYCENTRIC_SAMPLES.T
+    weights = np.repeat(areas / areas.sum() / len(_BARYCENTRIC_SAMPLES), len(_BARYCENTRIC_SAMPLES))
+    return sampled.ravel(), weights
+
+
+def shade_distribution(factors: np.ndarray, weights: np.ndarray, bins: int = 5) -> List[Dict]:
+    """
+    Share of the plot area by sunshine factor range.
+
+    Args:
+        factors: Sampled factors from shade_samples
+        weights: Area weights from shade_samples
+        bins: Number of equal ranges between 0 and 1
+
+    Returns:
+        List of {sunshine_factor_min, sunshine_factor_max, area_fraction}, from the most shaded range
+    """
+    edges = np.linspace(0, 1, bins + 1)
+    area_fractions, _ = np.histogram(np.clip(factors, 0, 1), bins=edges, weights=weights)
+    return [
+        {
+            "sunshine_factor_min": round(float(low), 2),
+            "sunshine_factor_max": round(float(high), 2),
+            "area_fraction": round(float(area_fraction), 3)
+        }
+        for low, high, area_fraction in zip(edges[:-1], edges[1:], area_fractions)
+    ]
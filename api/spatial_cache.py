@@ -0,0 +1,144 @@
+"""In-memory cache of values attached to footprints, looked up by spatial relation.
+
+Exact-match caching misses most of the reuse between plots: a redrawn polygon or a
+neighbouring plot has different coordinates, but the same STAC scenes and nearly the same
+Landsat pixels. Here entries are found by a predicate on their footprint (for example
+"contains the new polygon"), among the entries whose bounding box is near the query.
+
+Footprints are indexed in a grid hash: each entry is registered in the cells its bounding
+box overlaps, so a lookup only tests the entries of the cells around the query. Cells are
+cell_deg degrees at level 0 and LEVEL_FACTOR times larger at each level above. An entry is
+registered at the finest level where it spans at most MAX_CELLS_PER_ENTRY cells, so large
+footprints (such as a batch search area) take a few cells of a coarse level instead of
+thousands of fine ones. A lookup checks the cells around the query at each level in use.
+
+Entries are evicted in least recently used order, or once older than max_age_s.
+"""
+
+import math
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+from shapely.geometry.base import BaseGeometry
+
+LEVEL_FACTOR = 8
+MAX_CELLS_PER_ENTRY = 64
+
+
+class SpatialCache:
+    """
+    LRU cache of values keyed by a group (e.g. source and year) and a footprint.
+
+    Attributes:
+        max_entries: Number of entries kept
+        cell_deg: Size of the grid hash cells in decimal degrees
+        max_age_s: Entries older than this are not returned anymore, None to keep them
+    """
+
+    def __init__(self, max_entries: int, cell_deg: float = 0.01, max_age_s: Optional[float] = None):
+        self.max_entries = max_entries
+        self.cell_deg = cell_deg
+        self.max_age_s = max_age_s
+        # entry id -> (footprint, value, cells, creation time), least recently used first
+        self._entries: OrderedDict = OrderedDict()
+        self._cells: Dict[Tuple[Hashable, int, int, int], Set[int]] = {}
+        self._last_used: Dict[int, int] = {}
+        self._clock = 0
+        # Number of entries registered at each level
+        self._levels: Counter = Counter()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _cell_ranges(self, bounds: Tuple[float, float, float, float], level: int) -> Tuple[range, range]:
+        size = self.cell_deg * LEVEL_FACTOR ** level
+        min_x, min_y, max_x, max_y = bounds
+        return (range(math.floor(min_x / size), math.floor(max_x / size) + 1),
+                range(math.floor(min_y / size), math.floor(max_y / size) + 1))
+
+    def _cells_of(self, group: Hashable, bounds: Tuple[float, float, float, float], level: int) -> List[Tuple]:
+        columns, rows = self._cell_ranges(bounds, level)
+        return [(group, level, i, j) for i in columns for j in rows]
+
+    def _level_of(self, bounds: Tuple[float, float, float, float]) -> int:
+        """Finest level at which a bounding box spans at most MAX_CELLS_PER_ENTRY cells."""
+        level = 0
+        while True:
+            columns, rows = self._cell_ranges(bounds, level)
+            if len(columns) * len(rows) <= MAX_CELLS_PER_ENTRY:
+                return level
+            level += 1
+
+    def _touch(self, entry_id: int):
+        self._clock += 1
+        self._last_used[entry_id] = self._clock
+        self._entries.move_to_end(entry_id)
+
+    def put(self, group: Hashable, footprint: BaseGeometry, value: Any):
+        """
+        Add an entry.
+
+        Args:
+            group: Entries are only matched against queries of the same group
+            footprint: Area the value is valid for, in (longitude, latitude)
+            value: Cached value
+        """
+        self._clock += 1
+        entry_id = self._clock
+        level = self._level_of(footprint.bounds)
+        cells = self._cells_of(group, footprint.bounds, level)
+        self._entries[entry_id] = (footprint, value, cells, time.monotonic())
+        self._last_used[entry_id] = entry_id
+        self._levels[level] += 1
+        for cell in cells:
+            self._cells.setdefault(cell, set()).add(entry_id)
+
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, entry_id: int):
+        _, _, cells, _ = self._entries.pop(entry_id)
+        del self._last_used[entry_id]
+        level = cells[0][1]
+        self._levels[level] -= 1
+        if not self._levels[level]:
+            del self._levels[level]
+        for cell in cells:
+            entry_ids = self._cells[cell]
+            entry_ids.discard(entry_id)
+            if not entry_ids:
+                del self._cells[cell]
+
+    def find(self, group: Hashable, geometry: BaseGeometry, predicate: Callable[[BaseGeometry], bool],
+             margin_deg: float = 0.0) -> Optional[Tuple[BaseGeometry, Any]]:
+        """
+        Find the most recently used entry whose footprint matches a predicate.
+
+        Args:
+            group: Group of the query
+            geometry: Query geometry, in (longitude, latitude)
+            predicate: Called with the footprint of each candidate entry
+            margin_deg: Candidates are the entries whose bounding box comes within this
+                        distance of the query bounding box
+
+        Returns:
+            Tuple of (footprint, value) of the matching entry, None if there is none
+        """
+        min_x, min_y, max_x, max_y = geometry.bounds
+        bounds = (min_x - margin_deg, min_y - margin_deg, max_x + margin_deg, max_y + margin_deg)
+        candidates: Set[int] = set()
+        for level in list(self._levels):
+            for cell in self._cells_of(group, bounds, level):
+                candidates |= self._cells.get(cell, set())
+
+        now = time.monotonic()
+        for entry_id in sorted(candidates, key=self._last_used.__getitem__, reverse=True):
+            footprint, value, _, created_at = self._entries[entry_id]
+            if self.max_age_s is not None and now - created_at > self.max_age_s:
+                self._remove(entry_id)
+                continue
+            if predicate(footprint):
+                self._touch(entry_id)
+                return footprint, value
+        return None
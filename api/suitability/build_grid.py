@@ -0,0 +1,184 @@
+"""Offline builder of precomputed crop suitability grids.
+
+Scores every crop of CROP_DATABASE over a regular lat/lon grid of a region for one year
+and one sunshine factor, and writes the result as a memory-mappable grid (see grid.py)
+that /recommendations/precomputed answers from.
+
+Each cell gets the scores of its NASA POWER grid cell, computed once per POWER cell. With
+--landsat, every cell is refined with the Landsat surface temperature over the cell, like
+a /recommendations/polygon request on the cell square. This needs one Landsat read per
+cell, so it is much slower.
+
+Usage (from the api directory):
+    uv run python -m suitability.build_grid --bounds 48.0 11.3 48.3 11.8 --resolution 0.005 \\
+        --year 2023 --output suitability_grids/munich_2023
+    uv run python -m suitability.build_grid --bounds 48.10 11.50 48.16 11.62 --resolution 0.002 \\
+        --year 2023 --landsat --output suitability_grids/munich_center_2023_landsat
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from suitability.grid import (GRID_DATA_SUFFIX, GRID_METADATA_SUFFIX, SCORE_FILTERED, SCORE_NODATA,
+                              encode_crop_scores)
+
+
+def crop_scores(main, crops: List[str], climate_data: Dict, sunshine_factor: float, area_m2: float) -> np.ndarray:
+    """Scores of all crops for some climate data, encoded for the grid (see encode_crop_scores)."""
+    return encode_crop_scores(main.process_crop_recommendations(climate_data, sunshine_factor, area_m2, 0.0), crops)
+
+
+def cell_polygon(main, south: float, west: float, resolution_deg: float):
+    """Square polygon of a grid cell from its south-west corner."""
+    north, east = south + resolution_deg, west + resolution_deg
+    return main.PolygonInput(coordinates=[(south, west), (south, east), (north, east), (north, west), (south, west)])
+
+
+async def build_grid(bounds: Tuple[float, float, float, float], resolution_deg: float, year: int,
+                     sunshine_factor: float, use_landsat: bool, output: str, concurrency: int) -> Dict:
+    """
+    Build a suitability grid.
+
+    Args:
+        bounds: (south, west, north, east) of the region in decimal degrees
+        resolution_deg: Cell size in decimal degrees
+        year: Year of the climate data
+        sunshine_factor: Sunshine factor applied to every cell
+        use_landsat: Refine every cell with Landsat surface temperature
+        output: Path of the grid files without suffix
+        concurrency: Number of cells or POWER cells processed at the same time
+
+    Returns:
+        Metadata of the grid, as written to <output>.json
+    """
+    import main
+
+    crops = list(main.CROP_DATABASE)
+    south, west, north, east = bounds
+    rows = math.ceil((north - south) / resolution_deg)
+    cols = math.ceil((east - west) / resolution_deg)
+    # Snap the north-east corner to whole cells
+    north, east = south + rows * resolution_deg, west + cols * resolution_deg
+    cell_area_m2 = main.calculate_polygon_area_m2(cell_polygon(main, south, west, resolution_deg).coordinates)
+
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    data_path = output + GRID_DATA_SUFFIX
+    scores = np.memmap(data_path + ".tmp", dtype=np.uint8, mode="w+", shape=(len(crops), rows, cols))
+    scores[:] = SCORE_NODATA
+
+    # Cell centres and the POWER cell each of them falls in
+    center_lats = north - (np.arange(rows) + 0.5) * resolution_deg
+    center_lons = west + (np.arange(cols) + 0.5) * resolution_deg
+    power_rows = np.round((center_lats + 90) / main.NASA_POWER_GRID_LAT_DEG).astype(int)
+    power_cols = np.round((center_lons + 180) / main.NASA_POWER_GRID_LON_DEG).astype(int)
+    power_cells = sorted({(power_row, power_col) for power_row in power_rows for power_col in power_cols})
+    print(f"{rows}x{cols} cells over {len(power_cells)} NASA POWER cells")
+
+    slots = asyncio.Semaphore(concurrency)
+
+    # NASA POWER scores, one computation per POWER cell
+    async def score_power_cell(power_row: int, power_col: int):
+        row_mask = power_rows == power_row
+        col_mask = power_cols == power_col
+        row = int(np.argmax(row_mask))
+        col = int(np.argmax(col_mask))
+        context = {
+            "polygon": cell_polygon(main, north - (row + 1) * resolution_deg, west + col * resolution_deg, resolution_deg),
+            "latitude": float(center_lats[row]),
+            "longitude": float(center_lons[col]),
+            "year": year,
+            "include_multi_year": False
+        }
+        try:
+            climate_data = await main.fetch_climate_source(main.NasaPowerSource(), context)
+        except Exception as e:
+            print(f"POWER cell {power_row},{power_col}: no data ({e})")
+            return
+        power_scores = crop_scores(main, crops, climate_data, sunshine_factor, cell_area_m2)
+        scores[:, row_mask[:, None] & col_mask[None, :]] = power_scores[:, None]
+
+    await main.gather_bounded(power_cells, score_power_cell, slots)
+
+    # Landsat refinement, one polygon per cell
+    cells_with_landsat = 0
+    if use_landsat:
+        sources = [main.NasaPowerSource(), main.LandsatSource()]
+        done = 0
+
+        async def score_cell(row: int, col: int):
+            nonlocal cells_with_landsat, done
+            context = {
+                "polygon": cell_polygon(main, north - (row + 1) * resolution_deg, west + col * resolution_deg, resolution_deg),
+                "latitude": float(center_lats[row]),
+                "longitude": float(center_lons[col]),
+                "year": year,
+                "include_multi_year": False
+            }
+            try:
+                climate_data, source_results, _ = await main.run_climate_sources(sources, context)
+                if "landsat" in source_results:
+                    scores[:, row, col] = crop_scores(main, crops, climate_data, sunshine_factor, cell_area_m2)
+                    cells_with_landsat += 1
+            except Exception as e:
+                print(f"Cell {row},{col}: Landsat refinement failed ({e})")
+            done += 1
+            if done % 100 == 0:
+                print(f"{done}/{rows * cols} cells refined")
+
+        await main.gather_bounded(((row, col) for row in range(rows) for col in range(cols)), score_cell, slots)
+
+    scores.flush()
+    del scores
+    os.replace(data_path + ".tmp", data_path)
+
+    metadata = {
+        "bounds": [south, west, north, east],
+        "resolution_deg": resolution_deg,
+        "rows": rows,
+        "cols": cols,
+        "year": year,
+        "sunshine_factor": sunshine_factor,
+        "crops": crops,
+        "landsat": use_landsat,
+        "cells_with_landsat": cells_with_landsat,
+        "score_codes": {"filtered": SCORE_FILTERED, "nodata": SCORE_NODATA},
+        "created_at": datetime.now(timezone.utc).isoformat()
+    }
+    # Metadata last: a grid is only loaded once both files exist
+    with open(output + GRID_METADATA_SUFFIX, "w") as f:
+        json.dump(metadata, f, indent=2)
+    return metadata
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bounds", type=float, nargs=4, required=True, metavar=("SOUTH", "WEST", "NORTH", "EAST"),
+                        help="Region in decimal degrees")
+    parser.add_argument("--resolution", type=float, default=0.005, help="Cell size in decimal degrees")
+    parser.add_argument("--year", type=int, default=2023)
+    parser.add_argument("--sunshine-factor", type=float, default=0.7,
+                        help="Sunshine factor of every cell (default of /recommendations/polygon)")
+    parser.add_argument("--landsat", action="store_true", help="Refine every cell with Landsat (slow)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Cells processed at the same time")
+    parser.add_argument("--output", required=True, help="Path of the grid without suffix, e.g. suitability_grids/munich_2023")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    metadata = asyncio.run(build_grid(
+        tuple(args.bounds), args.resolution, args.year, args.sunshine_factor, args.landsat, args.output,
+        args.concurrency
+    ))
+    print(f"Wrote {args.output}{GRID_DATA_SUFFIX} ({len(metadata['crops'])} crops x {metadata['rows']} x "
+          f"{metadata['cols']}) in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""Precomputed crop suitability grids.
+
+A grid holds the suitability score of every crop over a regular lat/lon grid of a region,
+for one year and one sunshine factor. It is stored as two files:
+- <name>.json: metadata (bounds, resolution, shape, crop order, year, sunshine factor)
+- <name>.u8: raw uint8 array of shape (crops, rows, cols), row 0 at the north edge
+
+Scores are rounded to integers 0-100. SCORE_FILTERED marks crops without enough sunlight
+and SCORE_NODATA cells that could not be computed. The array is memory-mapped, so a query
+only reads the pages it touches.
+
+Grids are built offline by suitability/build_grid.py.
+"""
+
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import shapely
+from shapely import Polygon
+
+# Codes above the 0-100 score range
+SCORE_FILTERED = 254
+SCORE_NODATA = 255
+
+GRID_METADATA_SUFFIX = ".json"
+GRID_DATA_SUFFIX = ".u8"
+
+
+class SuitabilityGrid:
+    """
+    Read access to a precomputed suitability grid.
+
+    Attributes:
+        name: Name of the grid (file name without suffix)
+        south, west, north, east: Bounds of the grid in decimal degrees
+        resolution_deg: Size of a cell in decimal degrees (same in latitude and longitude)
+        year: Year of the climate data
+        sunshine_factor: Sunshine factor the scores were computed with
+        crops: Crop ids, in the order of the first axis of scores
+        scores: Memory-mapped uint8 array of shape (crops, rows, cols)
+    """
+
+    def __init__(self, path: str):
+        """
+        Open a grid.
+
+        Args:
+            path: Path of the grid without suffix
+        """
+        with open(path + GRID_METADATA_SUFFIX) as f:
+            metadata = json.load(f)
+
+        self.name = os.path.basename(path)
+        self.metadata = metadata
+        self.south, self.west, self.north, self.east = metadata["bounds"]
+        self.resolution_deg = metadata["resolution_deg"]
+        self.year = metadata["year"]
+        self.sunshine_factor = metadata["sunshine_factor"]
+        self.crops = metadata["crops"]
+        self.crop_index = {crop_id: i for i, crop_id in enumerate(self.crops)}
+        self.scores = np.memmap(path + GRID_DATA_SUFFIX, dtype=np.uint8, mode="r",
+                                shape=(len(self.crops), metadata["rows"], metadata["cols"]))
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        """Number of (rows, cols) of the grid."""
+        return self.scores.shape[1], self.scores.shape[2]
+
+    def covers(self, latitude: float, longitude: float) -> bool:
+        """Whether a point is inside the grid."""
+        return self.south <= latitude < self.north and self.west <= longitude < self.east
+
+    def cell_index(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        """(row, col) of the cell containing a point inside the grid."""
+        rows, cols = self.shape
+        row = min(int((self.north - latitude) / self.resolution_deg), rows - 1)
+        col = min(int((longitude - self.west) / self.resolution_deg), cols - 1)
+        return row, col
+
+    def point_scores(self, latitude: float, longitude: float) -> Optional[np.ndarray]:
+        """Scores of all crops at a point, None outside the grid."""
+        if not self.covers(latitude, longitude):
+            return None
+        row, col = self.cell_index(latitude, longitude)
+        return np.asarray(self.scores[:, row, col])
+
+    def polygon_cells(self, coordinates: List[Tuple[float, float]]) -> Optional[np.ndarray]:
+        """
+        Scores of the cells covered by a polygon.
+
+        A cell is covered when its centre is inside the polygon. A polygon smaller than a
+        cell covers the cell containing its centroid.
+
+        Args:
+            coordinates: List of (latitude, longitude) tuples
+
+        Returns:
+            Array of shape (crops, covered cells), None if the polygon is not entirely inside the grid
+        """
+        latitudes = np.array([lat for lat, _ in coordinates])
+        longitudes = np.array([lon for _, lon in coordinates])
+        if not (self.covers(latitudes.min(), longitudes.min()) and self.covers(latitudes.max(), longitudes.max())):
+            return None
+
+        # Window of cells around the polygon bounding box
+        row_start, col_start = self.cell_index(latitudes.max(), longitudes.min())
+        row_stop, col_stop = self.cell_index(latitudes.min(), longitudes.max())
+        row_stop, col_stop = row_stop + 1, col_stop + 1
+
+        cell_lats = self.north - (np.arange(row_start, row_stop) + 0.5) * self.resolution_deg
+        cell_lons = self.west + (np.arange(col_start, col_stop) + 0.5) * self.resolution_deg
+        grid_lons, grid_lats = np.meshgrid(cell_lons, cell_lats)
+
+        polygon = Polygon(zip(longitudes, latitudes))
+        inside = shapely.contains_xy(polygon, grid_lons, grid_lats)
+        window = np.asarray(self.scores[:, row_start:row_stop, col_start:col_stop])
+
+        if not inside.any():
+            centroid = polygon.centroid
+            row, col = self.cell_index(centroid.y, centroid.x)
+            return window[:, row - row_start, col - col_start][:, None]
+        return window[:, inside]
+
+
+def encode_crop_scores(crop_results: Dict, crops: List[str]) -> np.ndarray:
+    """
+    Encode the result of process_crop_recommendations (with min_score 0) as grid scores.
+
+    Args:
+        crop_results: Result of process_crop_recommendations
+        crops: Crop ids in grid order
+
+    Returns:
+        uint8 array of shape (crops,): rounded scores, SCORE_FILTERED for crops without
+        enough sunlight, SCORE_NODATA for crops missing from the results
+    """
+    scores = np.full(len(crops), SCORE_NODATA, dtype=np.uint8)
+    crop_index = {crop_id: i for i, crop_id in enumerate(crops)}
+    for recommendation in crop_results["recommendations"]:
+        if recommendation["crop_id"] in crop_index:
+            scores[crop_index[recommendation["crop_id"]]] = round(recommendation["suitability"]["overall_score"])
+    for filtered in crop_results["filtered_crops"]:
+        if filtered["crop_id"] in crop_index:
+            scores[crop_index[filtered["crop_id"]]] = SCORE_FILTERED
+    return scores
+
+
+def summarize_cell_scores(cell_scores: np.ndarray, min_score: float) -> Dict[str, np.ndarray]:
+    """
+    Per-crop statistics of the scores of some grid cells.
+
+    Args:
+        cell_scores: Array of shape (crops, cells) from SuitabilityGrid.polygon_cells
+        min_score: Score from which a cell counts as suitable
+
+    Returns:
+        Dictionary of arrays of shape (crops,): mean_score, min_score and max_score over
+        the scored cells (NaN if none), suitable_fraction and filtered_fraction of the
+        cells with data, and cells (number of cells with data)
+    """
+    has_data = cell_scores != SCORE_NODATA
+    scored = has_data & (cell_scores != SCORE_FILTERED)
+    values = np.where(scored, cell_scores, 0).astype(float)
+
+    scored_count = scored.sum(axis=1)
+    data_count = has_data.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return {
+            "mean_score": np.where(scored_count > 0, values.sum(axis=1) / scored_count, np.nan),
+            "min_score": np.where(scored_count > 0, np.where(scored, values, np.inf).min(axis=1), np.nan),
+            "max_score": np.where(scored_count > 0, values.max(axis=1), np.nan),
+            "suitable_fraction": np.where(data_count > 0, (scored & (values >= min_score)).sum(axis=1) / data_count, 0.0),
+            "filtered_fraction": np.where(data_count > 0, (cell_scores == SCORE_FILTERED).sum(axis=1) / data_count, 0.0),
+            "cells": data_count
+        }
+
+
+def load_grids(directory: str) -> List[SuitabilityGrid]:
+    """Open every grid of a directory, an empty list if the directory does not exist."""
+    if not os.path.isdir(directory):
+        return []
+    return [
+        SuitabilityGrid(os.path.join(directory, file_name[:-len(GRID_METADATA_SUFFIX)]))
+        for file_name in sorted(os.listdir(directory))
+        if file_name.endswith(GRID_METADATA_SUFFIX)
+        and os.path.exists(os.path.join(directory, file_name[:-len(GRID_METADATA_SUFFIX)] + GRID_DATA_SUFFIX))
+    ]
+
+
+def grids_signature(directory: str) -> Tuple[Tuple[str, int], ...]:
+    """(file name, modification time) of the grid files of a directory, changes when a grid is added or rebuilt."""
+    if not os.path.isdir(directory):
+        return ()
+    return tuple(
+        (entry.name, entry.stat().st_mtime_ns)
+        for entry in sorted(os.scandir(directory), key=lambda entry: entry.name)
+        if entry.name.endswith((GRID_METADATA_SUFFIX, GRID_DATA_SUFFIX))
+    )
+
+
+def find_grid(grids: List[SuitabilityGrid], latitude: float, longitude: float, year: int,
+              sunshine_factor: float, tolerance: float = 0.05) -> Optional[SuitabilityGrid]:
+    """
+    Pick the grid to answer a query from.
+
+    Args:
+        grids: Available grids
+        latitude: Latitude of the query
+        longitude: Longitude of the query
+        year: Year of the query
+        sunshine_factor: Sunshine factor of the query
+        tolerance: Largest accepted difference between the query and grid sunshine factors
+
+    Returns:
+        The covering grid of that year with the closest sunshine factor, None if there is none
+    """
+    candidates = [
+        grid for grid in grids
+        if grid.year == year and grid.covers(latitude, longitude)
+        and abs(grid.sunshine_factor - sunshine_factor) <= tolerance
+    ]
+    if not candidates:
+        return None
+    return min(candidates, key=lambda grid: (abs(grid.sunshine_factor - sunshine_factor), grid.resolution_deg))
@@ -0,0 +1,187 @@
+"""Rendering of crop suitability scores as XYZ map tiles.
+
+Tiles are 256x256 PNG images in the Web Mercator tiling scheme used by Mapbox and most
+web maps. Scores are sampled at the pixel centres: in Web Mercator the latitude of a
+pixel only depends on its row and the longitude on its column, so a tile is sampled by
+indexing the score array with one row vector and one column vector.
+
+PNG files are written with zlib, without an imaging library.
+"""
+
+import math
+import struct
+import zlib
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+from suitability.grid import SCORE_FILTERED, SCORE_NODATA, SuitabilityGrid
+
+TILE_SIZE = 256
+
+# Score colors: red (0) to yellow (50) to green (100), semi-transparent over the basemap.
+# Crops without enough sunlight are grey, cells without data transparent.
+_SCORE_STOPS = np.array([0, 50, 100])
+_STOP_COLORS = np.array([[215, 48, 39], [254, 224, 139], [26, 152, 80]])
+SCORE_ALPHA = 170
+
+SCORE_COLORS = np.zeros((256, 4), dtype=np.uint8)
+for _channel in range(3):
+    SCORE_COLORS[:101, _channel] = np.round(np.interp(np.arange(101), _SCORE_STOPS, _STOP_COLORS[:, _channel]))
+SCORE_COLORS[:101, 3] = SCORE_ALPHA
+SCORE_COLORS[SCORE_FILTERED] = (120, 120, 120, 110)
+SCORE_COLORS[SCORE_NODATA] = (0, 0, 0, 0)
+
+
+def tile_bounds(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """(south, west, north, east) of a tile in decimal degrees."""
+    n = 2 ** z
+    north = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    south = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return south, x / n * 360 - 180, north, (x + 1) / n * 360 - 180
+
+
+def tile_pixel_centers(z: int, x: int, y: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Latitudes of the pixel rows (north first) and longitudes of the pixel columns of a tile."""
+    n = 2 ** z
+    offsets = (np.arange(TILE_SIZE) + 0.5) / TILE_SIZE
+    latitudes = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * (y + offsets) / n))))
+    longitudes = (x + offsets) / n * 360 - 180
+    return latitudes, longitudes
+
+
+def tile_at(latitude: float, longitude: float, z: int) -> Tuple[int, int]:
+    """(x, y) of the tile of zoom z containing a point."""
+    n = 2 ** z
+    latitude = max(min(latitude, 85.0511), -85.0511)
+    x = int((longitude + 180) / 360 * n)
+    y = int((1 - math.asinh(math.tan(math.radians(latitude))) / math.pi) / 2 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def tiles_covering(south: float, west: float, north: float, east: float, z: int) -> Iterator[Tuple[int, int]]:
+    """(x, y) of the tiles of zoom z intersecting a lat/lon box."""
+    x_min, y_min = tile_at(north, west, z)
+    x_max, y_max = tile_at(south, east, z)
+    for x in range(x_min, x_max + 1):
+        for y in range(y_min, y_max + 1):
+            yield x, y
+
+
+def grid_tile_codes(grids: List[SuitabilityGrid], crop_id: str, z: int, x: int, y: int, year: int,
+                    sunshine_factor: float, tolerance: float = 0.05) -> Optional[np.ndarray]:
+    """
+    Sample the grid scores of a crop over a tile.
+
+    Where several grids overlap, the finest one wins, except for its cells without data.
+
+    Args:
+        grids: Available grids
+        crop_id: Crop to render
+        z, x, y: Tile
+        year: Year of the grids to use
+        sunshine_factor: Sunshine factor of the grids to use
+        tolerance: Largest accepted difference between the requested and grid sunshine factors
+
+    Returns:
+        uint8 array of shape (TILE_SIZE, TILE_SIZE) of scores or codes, None if no grid
+        intersects the tile
+    """
+    south, west, north, east = tile_bounds(z, x, y)
+    candidates = sorted(
+        (
+            grid for grid in grids
+            if grid.year == year and abs(grid.sunshine_factor - sunshine_factor) <= tolerance
+            and crop_id in grid.crop_index
+            and grid.south < north and grid.north > south and grid.west < east and grid.east > west
+        ),
+        key=lambda grid: -grid.resolution_deg
+    )
+    if not candidates:
+        return None
+
+    latitudes, longitudes = tile_pixel_centers(z, x, y)
+    codes = np.full((TILE_SIZE, TILE_SIZE), SCORE_NODATA, dtype=np.uint8)
+    for grid in candidates:
+        rows_total, cols_total = grid.shape
+        rows = np.floor((grid.north - latitudes) / grid.resolution_deg).astype(np.intp)
+        cols = np.floor((longitudes - grid.west) / grid.resolution_deg).astype(np.intp)
+        pixel_rows = np.flatnonzero((rows >= 0) & (rows < rows_total))
+        pixel_cols = np.flatnonzero((cols >= 0) & (cols < cols_total))
+        if len(pixel_rows) == 0 or len(pixel_cols) == 0:
+            continue
+
+        # Read only the window of the memory-mapped grid under the tile
+        rows, cols = rows[pixel_rows], cols[pixel_cols]
+        window = np.asarray(grid.scores[grid.crop_index[crop_id], rows.min():rows.max() + 1, cols.min():cols.max() + 1])
+        sampled = window[(rows - rows.min())[:, None], (cols - cols.min())[None, :]]
+
+        target = np.ix_(pixel_rows, pixel_cols)
+        codes[target] = np.where(sampled != SCORE_NODATA, sampled, codes[target])
+    return codes
+
+
+def tile_power_cells(z: int, x: int, y: int, lat_deg: float, lon_deg: float) -> Set[Tuple[int, int]]:
+    """NASA POWER grid cells (row, col) under the pixels of a tile."""
+    latitudes, longitudes = tile_pixel_centers(z, x, y)
+    power_rows = np.unique(np.round((latitudes + 90) / lat_deg).astype(int))
+    power_cols = np.unique(np.round((longitudes + 180) / lon_deg).astype(int))
+    return {(int(row), int(col)) for row in power_rows for col in power_cols}
+
+
+def power_tile_codes(z: int, x: int, y: int, cell_codes: Dict[Tuple[int, int], int], lat_deg: float,
+                     lon_deg: float) -> np.ndarray:
+    """
+    Paint a tile with one score per NASA POWER grid cell.
+
+    Args:
+        z, x, y: Tile
+        cell_codes: Score or code of the crop by POWER cell (row, col), cells missing have no data
+        lat_deg, lon_deg: Size of a POWER cell
+
+    Returns:
+        uint8 array of shape (TILE_SIZE, TILE_SIZE)
+    """
+    latitudes, longitudes = tile_pixel_centers(z, x, y)
+    power_rows, pixel_rows = np.unique(np.round((latitudes + 90) / lat_deg).astype(int), return_inverse=True)
+    power_cols, pixel_cols = np.unique(np.round((longitudes + 180) / lon_deg).astype(int), return_inverse=True)
+
+    cells = np.full((len(power_rows), len(power_cols)), SCORE_NODATA, dtype=np.uint8)
+    for i, row in enumerate(power_rows):
+        for j, col in enumerate(power_cols):
+            cells[i, j] = cell_codes.get((int(row), int(col)), SCORE_NODATA)
+    return cells[pixel_rows[:, None], pixel_cols[None, :]]
+
+
+def _png_chunk(tag: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data))
+
+
+def encode_png(rgba: np.ndarray, compression: int = 6) -> bytes:
+    """
+    Encode an image as PNG.
+
+    Args:
+        rgba: uint8 array of shape (height, width, 4)
+        compression: zlib compression level
+
+    Returns:
+        PNG file content
+    """
+    height, width, _ = rgba.shape
+    # Each scanline starts with its filter type, 0 (none)
+    scanlines = np.zeros((height, width * 4 + 1), dtype=np.uint8)
+    scanlines[:, 1:] = rgba.reshape(height, width * 4)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + _png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0))
+        + _png_chunk(b"IDAT", zlib.compress(scanlines.tobytes(), compression))
+        + _png_chunk(b"IEND", b"")
+    )
+
+
+def render_tile_png(codes: Optional[np.ndarray]) -> bytes:
+    """PNG tile of scores or codes, fully transparent if codes is None."""
+    if codes is None:
+        codes = np.full((TILE_SIZE, TILE_SIZE), SCORE_NODATA, dtype=np.uint8)
+    return encode_png(SCORE_COLORS[codes])
@@ -5,28 +5,22 @@ from mistralai import Mistral
 
 api_key = os.getenv("MISTRAL_API_KEY")
 
-def generate_crop_summary(api_response: dict, api_key: str = None) -> str:
+# Model and generation settings of the summaries
+MODEL = "mistral-large-latest"
+TEMPERATURE = 0.7  # Balanced creativity and consistency
+MAX_TOKENS = 400   # Approximately 150-200 words for concise output
+
+
+def build_summary_messages(api_response: dict) -> list:
     """
-    Generate a natural language summary of crop recommendations using Mistral AI.
+    Build the chat messages asking for a summary of crop recommendations.
 
     Args:
         api_response: The JSON response from /recommendations/polygon endpoint
-        api_key: Mistral API key (defaults to MISTRAL_API_KEY env variable)
 
     Returns:
-        String containing ~300 word summary of recommendations
+        List of system and user messages for the Mistral chat API
     """
-
-    # Get API key
-    if api_key is None:
-        api_key = os.environ.get("MISTRAL_API_KEY")
-        if not api_key:
-            raise ValueError("MISTRAL_API_KEY not found in environment variables")
-
-    # Initialize Mistral client
-    client = Mistral(api_key=api_key)
-    model = "mistral-large-latest"
-
     # System prompt - defines the assistant's role and constraints
     system_prompt = """You are an expert urban agriculture advisor providing data-driven crop recommendations.
 
@@ -122,23 +116,71 @@ End with a brief practical recommendation.
 
 Be concise, data-driven, and encouraging. Only use emojis for crops, not for other elements."""
 
+    return [
+        {
+            "role": "system",
+            "content": system_prompt
+        },
+        {
+            "role": "user",
+            "content": user_prompt
+        }
+    ]
+
+
+def get_mistral_client(api_key: str = None) -> Mistral:
+    """Create a Mistral client (api_key defaults to MISTRAL_API_KEY env variable)."""
+    if api_key is None:
+        api_key = os.environ.get("MISTRAL_API_KEY")
+        if not api_key:
+            raise ValueError("MISTRAL_API_KEY not found in environment variables")
+    return Mistral(api_key=api_key)
+
+
+def generate_crop_summary(api_response: dict, api_key: str = None) -> str:
+    """
+    Generate a natural language summary of crop recommendations using Mistral AI.
+
+    Args:
+        api_response: The JSON response from /recommendations/polygon endpoint
+        api_key: Mistral API key (defaults to MISTRAL_API_KEY env variable)
+
+    Returns:
+        String containing ~300 word summary of recommendations
+    """
+    client = get_mistral_client(api_key)
+
     # Make API call to Mistral
     chat_response = client.chat.complete(
-        model=model,
-        messages=[
-            {
-                "role": "system",
-                "content": system_prompt
-            },
-            {
-                "role": "user",
-                "content": user_prompt
-            }
-        ],
-        temperature=0.7,  # Balanced creativity and consistency
-        max_tokens=400    # Approximately 150-200 words for concise output
+        model=MODEL,
+        messages=build_summary_messages(api_response),
+        temperature=TEMPERATURE,
+        max_tokens=MAX_TOKENS
     )
 
     # Extract and return the summary
     summary = chat_response.choices[0].message.content
-    return summary
\ No newline at end of file
+    return summary
+
+
+async def generate_crop_summary_async(api_response: dict, api_key: str = None) -> str:
+    """
+    Async variant of generate_crop_summary. Cancelling it aborts the request to Mistral.
+
+    Args:
+        api_response: The JSON response from /recommendations/polygon endpoint
+        api_key: Mistral API key (defaults to MISTRAL_API_KEY env variable)
+
+    Returns:
+        String containing ~300 word summary of recommendations
+    """
+    client = get_mistral_client(api_key)
+
+    chat_response = await client.chat.complete_async(
+        model=MODEL,
+        messages=build_summary_messages(api_response),
+        temperature=TEMPERATURE,
+        max_tokens=MAX_TOKENS
+    )
+
+    return chat_response.choices[0].message.content
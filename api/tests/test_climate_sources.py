@@ -0,0 +1,53 @@
+import asyncio
+
+import pystac
+import pytest
+
+import main
+from main import ClimateSource, LandsatGroupSource, LandsatSource, NasaPowerSource, PolygonInput, fetch_status
+
+CONTEXT = {
+    "polygon": PolygonInput(coordinates=[(48.0, 11.0), (48.0, 11.001), (48.001, 11.001), (48.0, 11.0)]),
+    "year": 2023
+}
+
+
+def landsat_status(source):
+    async def run():
+        task = asyncio.create_task(source.fetch(CONTEXT))
+        await asyncio.wait([task])
+        return fetch_status(task)
+
+    return asyncio.run(run())
+
+
+def test_source_without_fetch_fails_at_instantiation():
+    class IncompleteSource(ClimateSource):
+        name = "incomplete"
+
+        def fuse(self, climate_data, result, context):
+            return climate_data
+
+    with pytest.raises(TypeError):
+        IncompleteSource()
+
+
+def test_builtin_sources_are_complete():
+    NasaPowerSource()
+    LandsatSource()
+
+
+def test_failed_stac_search_is_reported_as_failed(monkeypatch):
+    async def failed_search(polygon, year):
+        return None
+
+    monkeypatch.setattr(main, "search_landsat_items", failed_search)
+    assert landsat_status(LandsatSource()) == "failed"
+
+
+def test_failed_batch_stac_search_is_reported_as_failed_like_a_single_polygon():
+    assert landsat_status(LandsatGroupSource(None)) == "failed"
+
+
+def test_batch_polygon_without_scenes_is_unavailable():
+    assert landsat_status(LandsatGroupSource(pystac.ItemCollection([]))) == "unavailable"
@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+from jobs import JOB_DONE, JOB_FAILED, JOB_QUEUED, JOB_RUNNING, JobQueue, JobStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.sqlite3"))
+
+
+def run_next_job(store, runner):
+    """Claim the next queued job and run it with a JobQueue, as a worker would."""
+    async def run():
+        job = store.claim_next()
+        await JobQueue(store, runner, workers=0)._run(job)
+
+    asyncio.run(run())
+
+
+def test_identical_submissions_are_deduplicated(store):
+    job, created = store.submit({"polygons": [1, 2]}, 2)
+    same_job, created_again = store.submit({"polygons": [1, 2]}, 2)
+    other_job, _ = store.submit({"polygons": [3]}, 1)
+
+    assert created and not created_again
+    assert same_job["id"] == job["id"]
+    assert other_job["id"] != job["id"]
+    assert job["status"] == JOB_QUEUED
+
+
+def test_save_unit_counts_each_unit_once(store):
+    job, _ = store.submit({"polygons": [1, 2]}, 2)
+    store.save_unit(job["id"], 0, {"unit": 0})
+    store.save_unit(job["id"], 0, {"unit": 0})
+    store.save_unit(job["id"], 1, {"error": "boom"}, failed=True)
+
+    job = store.get(job["id"])
+    assert (job["units_done"], job["units_failed"]) == (2, 1)
+    assert store.completed_units(job["id"]) == {0, 1}
+    assert list(store.iter_results(job["id"], page_size=1)) == ['{"unit": 0}', '{"error": "boom"}']
+
+
+def test_interrupted_jobs_are_queued_again(store):
+    job, _ = store.submit({"polygons": [1]}, 1)
+    assert store.claim_next()["status"] == JOB_RUNNING
+    assert store.claim_next() is None
+
+    assert store.requeue_running() == 1
+    assert store.get(job["id"])["status"] == JOB_QUEUED
+
+
+def test_failed_units_are_retried_on_resubmission(store):
+    attempts = {0: 0, 1: 0}
+
+    async def runner(job, completed, save_unit):
+        for unit in range(job["units_total"]):
+            if unit in completed:
+                continue
+            attempts[unit] += 1
+            # Unit 1 fails transiently on its first attempt
+            if unit == 1 and attempts[unit] == 1:
+                await save_unit(unit, {"error": "upstream timeout"}, True)
+            else:
+                await save_unit(unit, {"unit": unit})
+
+    job, _ = store.submit({"polygons": [1, 2]}, 2)
+    run_next_job(store, runner)
+    job = store.get(job["id"])
+    assert (job["status"], job["units_done"], job["units_failed"]) == (JOB_DONE, 2, 1)
+
+    job, created = store.submit({"polygons": [1, 2]}, 2)
+    assert not created
+    assert (job["status"], job["units_done"], job["units_failed"]) == (JOB_QUEUED, 1, 0)
+
+    run_next_job(store, runner)
+    job = store.get(job["id"])
+    assert (job["status"], job["units_done"], job["units_failed"]) == (JOB_DONE, 2, 0)
+    assert attempts == {0: 1, 1: 2}
+    assert list(store.iter_results(job["id"])) == ['{"unit": 0}', '{"unit": 1}']
+
+
+def test_failed_job_is_queued_again_and_complete_job_is_not(store):
+    async def failing_runner(job, completed, save_unit):
+        await save_unit(0, {"unit": 0})
+        raise RuntimeError("worker crashed")
+
+    job, _ = store.submit({"polygons": [1, 2]}, 2)
+    run_next_job(store, failing_runner)
+    job = store.get(job["id"])
+    assert (job["status"], job["error"]) == (JOB_FAILED, "worker crashed")
+
+    job, _ = store.submit({"polygons": [1, 2]}, 2)
+    assert (job["status"], job["error"], job["units_done"]) == (JOB_QUEUED, None, 1)
+
+    async def runner(job, completed, save_unit):
+        assert completed == {0}
+        await save_unit(1, {"unit": 1})
+
+    run_next_job(store, runner)
+    assert store.get(job["id"])["status"] == JOB_DONE
+    job, _ = store.submit({"polygons": [1, 2]}, 2)
+    assert job["status"] == JOB_DONE
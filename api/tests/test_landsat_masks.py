@@ -0,0 +1,49 @@
+import numpy as np
+from rasterio.transform import from_origin
+from shapely import Polygon
+
+from main import calculate_landsat_clear_mask, calculate_polygon_pixel_mask
+
+# 10x10 grid of 30 m pixels, top-left corner at (0, 300)
+TRANSFORM = from_origin(0, 300, 30, 30)
+SHAPE = (10, 10)
+
+
+def test_polygon_mask_keeps_pixels_whose_centre_is_inside():
+    # Triangle over the lower-left half of the grid. Its hypotenuse x + y = 290 passes between
+    # pixel centres (x + y is a multiple of 30 at every centre), so no centre is on an edge.
+    triangle = Polygon([(0, 0), (290, 0), (0, 290)])
+    mask = calculate_polygon_pixel_mask(triangle, SHAPE, TRANSFORM)
+
+    rows, cols = np.indices(SHAPE)
+    center_x = (cols + 0.5) * 30
+    center_y = 300 - (rows + 0.5) * 30
+    assert np.array_equal(mask, center_x + center_y < 290)
+
+
+def test_polygon_mask_is_not_the_bounding_box():
+    triangle = Polygon([(0, 0), (300, 0), (0, 300)])
+    mask = calculate_polygon_pixel_mask(triangle, SHAPE, TRANSFORM)
+    assert 0 < mask.sum() < mask.size
+
+
+def test_polygon_smaller_than_a_pixel_keeps_the_touched_pixel():
+    # 10 m square inside pixel (row 2, col 3), away from its centre
+    square = Polygon([(91, 211), (101, 211), (101, 221), (91, 221)])
+    mask = calculate_polygon_pixel_mask(square, SHAPE, TRANSFORM)
+    assert mask.sum() == 1
+    assert mask[2, 3]
+
+
+def test_clear_mask_rejects_fill_cloud_cirrus_and_shadow_bits():
+    qa = np.array([
+        0b0000_0000,   # clear
+        0b0100_0000,   # clear bit only (bit 6)
+        0b0000_0001,   # fill
+        0b0000_0010,   # dilated cloud
+        0b0000_0100,   # cirrus
+        0b0000_1000,   # cloud
+        0b0001_0000,   # cloud shadow
+        0b0010_0000,   # snow: not rejected
+    ], dtype=np.uint16)
+    assert calculate_landsat_clear_mask(qa).tolist() == [True, True, False, False, False, False, False, True]
@@ -0,0 +1,71 @@
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+import rasterio
+
+from benchmarks.fixtures import POLYGON_COORDINATES, QA_CLOUD, build_stac_items, write_landsat_scenes
+from main import (KELVIN_TO_CELSIUS, LANDSAT_ST_OFFSET, LANDSAT_ST_SCALE, PolygonInput,
+                  calculate_surface_temperature_landsat, reduce_landsat_temperatures)
+
+
+def to_celsius(raw):
+    return raw * LANDSAT_ST_SCALE + LANDSAT_ST_OFFSET + KELVIN_TO_CELSIUS
+
+
+def raw_value(celsius):
+    return (celsius - KELVIN_TO_CELSIUS - LANDSAT_ST_OFFSET) / LANDSAT_ST_SCALE
+
+
+def test_uniform_pixels_give_their_temperature():
+    values = np.full(50, round(raw_value(20.0)), dtype=np.uint16)
+    tmin, tmax, tmean = reduce_landsat_temperatures(values, (5, 95))
+    assert tmin == pytest.approx(tmax) == pytest.approx(tmean) == pytest.approx(20.0, abs=0.01)
+
+
+def test_percentiles_ignore_outlier_pixels():
+    # 98 pixels from 10 to 30 °C, plus one cold and one hot outlier (unmasked cloud edge, roof)
+    temperatures = np.concatenate([np.linspace(10, 30, 98), [-30.0, 70.0]])
+    values = np.round(raw_value(temperatures)).astype(np.uint16)
+
+    tmin, tmax, _ = reduce_landsat_temperatures(values, (5, 95))
+    assert 10 < tmin < 12
+    assert 28 < tmax < 30
+
+
+def test_statistics_on_raw_values_match_statistics_in_celsius():
+    rng = np.random.default_rng(0)
+    values = rng.integers(40000, 50000, size=1000).astype(np.uint16)
+
+    tmin, tmax, tmean = reduce_landsat_temperatures(values, (5, 95))
+    celsius = to_celsius(values.astype(np.float64))
+    assert tmin == pytest.approx(np.percentile(celsius, 5))
+    assert tmax == pytest.approx(np.percentile(celsius, 95))
+    assert tmean == pytest.approx(celsius.mean())
+
+
+def landsat_scenes(directory, cloudy):
+    scenes = write_landsat_scenes(str(directory), count=2, size=16)
+    if cloudy:
+        for _, qa_path in scenes:
+            with rasterio.open(qa_path, "r+") as dataset:
+                dataset.write(np.full((16, 16), QA_CLOUD, dtype=np.uint16), 1)
+    acquisitions = [datetime(2023, 6, day, 10, 30, tzinfo=timezone.utc) for day in (1, 17)]
+    return build_stac_items(scenes, acquisitions)
+
+
+def test_scenes_give_daily_temperatures(tmp_path):
+    df = calculate_surface_temperature_landsat(
+        landsat_scenes(tmp_path, cloudy=False), "lwir", PolygonInput(coordinates=POLYGON_COORDINATES)
+    )
+
+    assert len(df) == 17
+    assert df["tmin"].notna().all()
+
+
+def test_scenes_without_clear_pixels_give_no_result(tmp_path):
+    df = calculate_surface_temperature_landsat(
+        landsat_scenes(tmp_path, cloudy=True), "lwir", PolygonInput(coordinates=POLYGON_COORDINATES)
+    )
+
+    assert df is None
@@ -0,0 +1,68 @@
+import copy
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from main import merge_climate_data
+
+
+def nasa_power(tmax, tmin):
+    return {
+        "type": "Feature",
+        "properties": {
+            "parameter": {
+                "T2M_MAX": dict(tmax),
+                "T2M_MIN": dict(tmin),
+                "PRECTOTCORR": {date: 1.0 for date in tmax}
+            }
+        }
+    }
+
+
+NASA = nasa_power(
+    {"20230601": 20.0, "20230602": 21.0, "20230603": 22.0},
+    {"20230601": 10.0, "20230602": 11.0, "20230603": 12.0}
+)
+
+
+def landsat(rows):
+    df = pd.DataFrame(rows, columns=["date", "tmin", "tmax"])
+    return df.set_index(pd.to_datetime(df.pop("date")))
+
+
+def test_landsat_replaces_nasa_temperatures_on_its_dates():
+    merged = merge_climate_data(NASA, landsat([("2023-06-02", 15.0, 30.0)]), 2023)
+    parameters = merged["properties"]["parameter"]
+    assert parameters["T2M_MAX"] == {"20230601": 20.0, "20230602": 30.0, "20230603": 22.0}
+    assert parameters["T2M_MIN"] == {"20230601": 10.0, "20230602": 15.0, "20230603": 12.0}
+    assert parameters["PRECTOTCORR"] == NASA["properties"]["parameter"]["PRECTOTCORR"]
+
+
+def test_missing_and_out_of_range_landsat_dates_are_ignored():
+    merged = merge_climate_data(
+        NASA, landsat([("2023-06-01", np.nan, np.nan), ("2023-07-01", 0.0, 40.0)]), 2023
+    )
+    assert merged["properties"]["parameter"]["T2M_MAX"] == NASA["properties"]["parameter"]["T2M_MAX"]
+
+
+def test_weight_blends_landsat_and_nasa():
+    merged = merge_climate_data(NASA, landsat([("2023-06-03", 16.0, 32.0)]), 2023, weight=0.5)
+    parameters = merged["properties"]["parameter"]
+    assert parameters["T2M_MAX"]["20230603"] == pytest.approx(27.0)
+    assert parameters["T2M_MIN"]["20230603"] == pytest.approx(14.0)
+
+
+def test_input_is_not_mutated():
+    original = copy.deepcopy(NASA)
+    merge_climate_data(NASA, landsat([("2023-06-02", 15.0, 30.0)]), 2023)
+    assert NASA == original
+
+
+def test_last_landsat_row_of_a_date_wins():
+    merged = merge_climate_data(
+        NASA, landsat([("2023-06-02", 15.0, 30.0), ("2023-06-02", 16.0, 31.0)]), 2023
+    )
+    parameters = merged["properties"]["parameter"]
+    assert parameters["T2M_MAX"]["20230602"] == 31.0
+    assert parameters["T2M_MIN"]["20230602"] == 16.0
@@ -0,0 +1,25 @@
+import asyncio
+
+import pytest
+
+from metrics import UPSTREAM_ERRORS, timed_upstream
+
+
+def upstream_errors(upstream):
+    return UPSTREAM_ERRORS._values.get((upstream,), 0)
+
+
+def test_timed_upstream_counts_failed_calls():
+    before = upstream_errors("stac")
+    with pytest.raises(RuntimeError):
+        with timed_upstream("stac"):
+            raise RuntimeError("search failed")
+    assert upstream_errors("stac") == before + 1
+
+
+def test_timed_upstream_does_not_count_cancelled_calls():
+    before = upstream_errors("stac")
+    with pytest.raises(asyncio.CancelledError):
+        with timed_upstream("stac"):
+            raise asyncio.CancelledError()
+    assert upstream_errors("stac") == before
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from shade import SUBDIVISIONS, shade_distribution, shade_samples
+
+# Three unit squares side by side, as (lat, lon): longitudes 0 to 3, latitudes 0 to 1
+STRIP = [(0, 0), (0, 1), (0, 2), (0, 3), (1, 3), (1, 2), (1, 1), (1, 0)]
+
+
+def test_uniform_factor():
+    factors, weights = shade_samples(STRIP, [0.7] * len(STRIP))
+
+    np.testing.assert_allclose(factors, 0.7)
+    assert weights.sum() == pytest.approx(1.0)
+    # 6 triangles, SUBDIVISIONS² samples each
+    assert len(factors) == 6 * SUBDIVISIONS ** 2
+
+    distribution = shade_distribution(factors, weights)
+    assert [level["area_fraction"] for level in distribution] == [0.0, 0.0, 0.0, 1.0, 0.0]
+
+
+def test_two_levels_with_known_areas():
+    # Left square at 0.3, right square at 0.9, linear between them in the middle square
+    by_longitude = {0: 0.3, 1: 0.3, 2: 0.9, 3: 0.9}
+    factors, weights = shade_samples(STRIP, [by_longitude[lon] for _, lon in STRIP])
+
+    assert weights[np.isclose(factors, 0.3)].sum() == pytest.approx(1 / 3)
+    assert weights[np.isclose(factors, 0.9)].sum() == pytest.approx(1 / 3)
+    assert np.average(factors, weights=weights) == pytest.approx(0.6)
+
+    distribution = shade_distribution(factors, weights)
+    assert sum(level["area_fraction"] for level in distribution) == pytest.approx(1.0, abs=0.003)
+    assert distribution[1]["area_fraction"] > 1 / 3
+    assert distribution[4]["area_fraction"] > 1 / 3
+
+
+def test_closed_polygon_and_weights_follow_triangle_areas():
+    # 2 x 1 box: two triangles of the same area, factor linear in longitude
+    coordinates = [(0, 0), (0, 2), (1, 2), (1, 0), (0, 0)]
+    factors, weights = shade_samples(coordinates, [0.0, 1.0, 1.0, 0.0, 0.0])
+
+    assert weights.sum() == pytest.approx(1.0)
+    np.testing.assert_allclose(weights, weights[0])
+    assert np.average(factors, weights=weights) == pytest.approx(0.5)
+
+
+def test_self_intersecting_polygon_is_rejected():
+    bowtie = [(0, 0), (1, 1), (1, 0), (0, 1)]
+
+    with pytest.raises(ValueError):
+        shade_samples(bowtie, [0.5] * 4)
@@ -0,0 +1,105 @@
+from types import SimpleNamespace
+
+import pytest
+from shapely import box
+
+import spatial_cache
+from main import LandsatSource, PolygonInput
+from spatial_cache import MAX_CELLS_PER_ENTRY, SpatialCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = SimpleNamespace(value=1000.0)
+    monkeypatch.setattr(spatial_cache, "time", SimpleNamespace(monotonic=lambda: now.value))
+    return now
+
+
+def contains(query):
+    return lambda footprint: footprint.contains(query)
+
+
+def test_find_matches_predicate_within_group():
+    cache = SpatialCache(10)
+    cache.put("a", box(11.0, 48.0, 11.1, 48.1), "area")
+
+    assert cache.find("a", box(11.05, 48.05, 11.06, 48.06), contains(box(11.05, 48.05, 11.06, 48.06)))[1] == "area"
+    assert cache.find("b", box(11.05, 48.05, 11.06, 48.06), contains(box(11.05, 48.05, 11.06, 48.06))) is None
+    assert cache.find("a", box(12.05, 48.05, 12.06, 48.06), lambda footprint: True) is None
+
+
+def test_most_recently_used_match_wins():
+    cache = SpatialCache(10)
+    query = box(11.05, 48.05, 11.06, 48.06)
+    cache.put("a", box(11.0, 48.0, 11.1, 48.1), "first")
+    cache.put("a", box(11.0, 48.0, 11.2, 48.2), "second")
+    assert cache.find("a", query, contains(query))[1] == "second"
+
+    cache.find("a", query, lambda footprint: footprint.bounds[2] < 11.15)
+    assert cache.find("a", query, contains(query))[1] == "first"
+
+
+def test_large_footprints_are_indexed_at_a_coarser_level():
+    cache = SpatialCache(10, cell_deg=0.01)
+    # About a batch search area: 0.5 x 0.625 degrees, ~3,000 cells at the finest level
+    cache.put("a", box(11.0, 48.0, 11.625, 48.5), "batch")
+    cache.put("a", box(11.3, 48.2, 11.301, 48.201), "plot")
+
+    assert len(cache._cells) <= MAX_CELLS_PER_ENTRY + 4
+    corner = box(11.6, 48.45, 11.61, 48.46)
+    assert cache.find("a", corner, contains(corner))[1] == "batch"
+    plot = box(11.3002, 48.2002, 11.3008, 48.2008)
+    assert cache.find("a", plot, lambda footprint: footprint.area < 1e-5)[1] == "plot"
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = SpatialCache(2)
+    query = box(11.05, 48.05, 11.06, 48.06)
+    cache.put("a", box(11.0, 48.0, 11.1, 48.1), "first")
+    cache.put("b", box(11.0, 48.0, 11.1, 48.1), "second")
+    cache.find("a", query, contains(query))
+    cache.put("c", box(11.0, 48.0, 11.1, 48.1), "third")
+
+    assert len(cache) == 2
+    assert cache.find("a", query, contains(query))[1] == "first"
+    assert cache.find("b", query, contains(query)) is None
+    assert cache.find("c", query, contains(query))[1] == "third"
+
+
+def test_removed_entries_leave_no_cells():
+    cache = SpatialCache(1)
+    cache.put("a", box(11.0, 48.0, 11.05, 48.05), "first")
+    cache.put("a", box(11.0, 48.0, 11.625, 48.5), "second")
+
+    assert {cell for cell, entry_ids in cache._cells.items() if entry_ids} == set(cache._entries[2][2])
+    assert set(cache._levels) == {cache._entries[2][2][0][1]}
+
+
+def test_entries_expire_after_max_age(clock):
+    cache = SpatialCache(10, max_age_s=60)
+    query = box(11.05, 48.05, 11.06, 48.06)
+    cache.put("a", box(11.0, 48.0, 11.1, 48.1), "area")
+
+    clock.value += 59
+    assert cache.find("a", query, contains(query))[1] == "area"
+    clock.value += 2
+    assert cache.find("a", query, contains(query)) is None
+    assert len(cache) == 0
+
+
+def square(lat, lon, side_deg=0.001):
+    return PolygonInput(coordinates=[
+        (lat, lon), (lat, lon + side_deg), (lat + side_deg, lon + side_deg), (lat + side_deg, lon), (lat, lon)
+    ])
+
+
+@pytest.mark.parametrize("shift_m, reused", [(0.0, True), (10.0, True), (25.0, True), (60.0, False)])
+def test_landsat_result_is_reused_for_nearby_outlines(shift_m, reused):
+    source = LandsatSource()
+    year = 1990 + int(shift_m)
+    source.remember({"polygon": square(48.1, 11.5), "year": year}, "temperatures")
+
+    shifted = square(48.1 + shift_m / 111_320, 11.5)
+    found = source.find_nearby({"polygon": shifted, "year": year})
+
+    assert (found == "temperatures") is reused
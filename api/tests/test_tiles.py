@@ -0,0 +1,160 @@
+import asyncio
+import struct
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+import pytest
+
+import main
+from crop_database import CROP_DATABASE
+from routers import map_tiles
+from suitability.grid import SCORE_NODATA
+from suitability.tiles import (SCORE_COLORS, TILE_SIZE, encode_png, power_tile_codes, render_tile_png, tile_at,
+                               tile_bounds, tile_pixel_centers, tile_power_cells, tiles_covering)
+
+
+def read_png(data):
+    """Check the chunk CRCs of a PNG and return its IHDR fields and decoded RGBA pixels."""
+    assert data[:8] == b"\x89PNG\r\n\x1a\n"
+    chunks, offset = {}, 8
+    while offset < len(data):
+        (length,) = struct.unpack(">I", data[offset:offset + 4])
+        tag = data[offset + 4:offset + 8]
+        body = data[offset + 8:offset + 8 + length]
+        (crc,) = struct.unpack(">I", data[offset + 8 + length:offset + 12 + length])
+        assert crc == zlib.crc32(tag + body)
+        chunks[tag] = body
+        offset += 12 + length
+    assert list(chunks) == [b"IHDR", b"IDAT", b"IEND"]
+
+    width, height, bit_depth, color_type, *_ = struct.unpack(">IIBBBBB", chunks[b"IHDR"])
+    scanlines = np.frombuffer(zlib.decompress(chunks[b"IDAT"]), dtype=np.uint8).reshape(height, width * 4 + 1)
+    assert (scanlines[:, 0] == 0).all()
+    return (width, height, bit_depth, color_type), scanlines[:, 1:].reshape(height, width, 4)
+
+
+def test_encode_png_round_trip():
+    rgba = np.random.default_rng(0).integers(0, 256, size=(3, 5, 4), dtype=np.uint8)
+
+    header, pixels = read_png(encode_png(rgba))
+
+    assert header == (5, 3, 8, 6)
+    np.testing.assert_array_equal(pixels, rgba)
+
+
+def test_render_tile_png_colors_codes():
+    codes = np.full((TILE_SIZE, TILE_SIZE), 100, dtype=np.uint8)
+    codes[0, 0] = 0
+
+    _, pixels = read_png(render_tile_png(codes))
+
+    np.testing.assert_array_equal(pixels[0, 0], SCORE_COLORS[0])
+    np.testing.assert_array_equal(pixels[1, 1], SCORE_COLORS[100])
+
+
+def test_render_tile_png_without_codes_is_transparent():
+    _, pixels = read_png(render_tile_png(None))
+
+    assert pixels.shape == (TILE_SIZE, TILE_SIZE, 4)
+    assert (pixels[..., 3] == 0).all()
+
+
+def test_tile_bounds_of_the_world_tile():
+    south, west, north, east = tile_bounds(0, 0, 0)
+
+    assert (west, east) == (-180, 180)
+    assert north == pytest.approx(85.0511, abs=1e-4)
+    assert south == pytest.approx(-85.0511, abs=1e-4)
+
+
+@pytest.mark.parametrize("z, x, y", [(1, 1, 0), (12, 2183, 1420), (18, 139452, 90914)])
+def test_tile_at_finds_the_tile_of_its_pixels(z, x, y):
+    south, west, north, east = tile_bounds(z, x, y)
+    latitudes, longitudes = tile_pixel_centers(z, x, y)
+
+    assert tile_at((south + north) / 2, (west + east) / 2, z) == (x, y)
+    assert (np.diff(latitudes) < 0).all()
+    assert south < latitudes.min() and latitudes.max() < north
+    assert west < longitudes.min() and longitudes.max() < east
+
+
+def test_tiles_covering_a_box_across_a_tile_edge():
+    south, west, north, east = tile_bounds(12, 2183, 1420)
+    edge = east
+
+    tiles = set(tiles_covering(south + 0.001, edge - 0.001, north - 0.001, edge + 0.001, 12))
+
+    assert tiles == {(2183, 1420), (2184, 1420)}
+
+
+def test_power_tile_codes_paints_each_pixel_with_its_cell():
+    z, x, y = 9, 272, 175
+    lat_deg, lon_deg = 0.5, 0.625
+    cells = sorted(tile_power_cells(z, x, y, lat_deg, lon_deg))
+    cell_codes = {cell: code for code, cell in enumerate(cells[:-1])}
+
+    codes = power_tile_codes(z, x, y, cell_codes, lat_deg, lon_deg)
+
+    latitudes, longitudes = tile_pixel_centers(z, x, y)
+    rows = np.round((latitudes + 90) / lat_deg).astype(int)
+    cols = np.round((longitudes + 180) / lon_deg).astype(int)
+    expected = np.array([[cell_codes.get((row, col), SCORE_NODATA) for col in cols] for row in rows])
+    np.testing.assert_array_equal(codes, expected)
+    assert (codes == SCORE_NODATA).any()
+
+
+# Zoom 9 tile over several NASA POWER cells, scored live
+LIVE_TILE = (9, 272, 175)
+CROP_ID = next(iter(CROP_DATABASE))
+
+
+@pytest.fixture
+def live_tiles(monkeypatch):
+    """No precomputed grid, an empty tile cache, and POWER cell scores counted by cell."""
+    monkeypatch.setattr(main, "get_suitability_grids", lambda: [])
+    monkeypatch.setattr(map_tiles, "_tile_cache", OrderedDict())
+    calls = []
+
+    def fail_cells(failing):
+        async def power_cell_scores(power_cell, year, sunshine_factor):
+            calls.append(power_cell)
+            if power_cell in failing:
+                return None
+            return np.full(len(CROP_DATABASE), 80, dtype=np.uint8)
+
+        monkeypatch.setattr(map_tiles, "power_cell_scores", power_cell_scores)
+        return calls
+
+    return fail_cells
+
+
+def get_tile():
+    return asyncio.run(map_tiles.get_suitability_tile(CROP_ID, *LIVE_TILE, year=2023, sunshine_factor=0.7))
+
+
+def test_tile_missing_live_cells_is_returned_but_not_cached(live_tiles):
+    failing = sorted(tile_power_cells(*LIVE_TILE, main.NASA_POWER_GRID_LAT_DEG, main.NASA_POWER_GRID_LON_DEG))[:1]
+    live_tiles(set(failing))
+
+    response = get_tile()
+
+    (width, height, *_), rgba = read_png(response.body)
+    assert (width, height) == (TILE_SIZE, TILE_SIZE)
+    assert (rgba[..., 3] == 0).any() and (rgba[..., 3] > 0).any()
+    assert response.headers["cache-control"] == "no-store"
+    assert len(map_tiles._tile_cache) == 0
+
+
+def test_complete_tile_is_cached(live_tiles):
+    calls = live_tiles(set())
+
+    first = get_tile()
+    cells_scored = len(calls)
+    second = get_tile()
+
+    assert first.headers["cache-control"] == f"public, max-age={map_tiles.TILE_MAX_AGE_S}"
+    assert len(map_tiles._tile_cache) == 1
+    assert second.body == first.body
+    assert len(calls) == cells_scored
+